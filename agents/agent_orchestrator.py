@@ -6,12 +6,13 @@ Manages the multi-agent system and coordinates agent execution
 
 import os
 import json
+import time
 import logging
 import asyncio
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, wait
 
 from langgraph.graph import StateGraph, END
 from langchain_core.tools import tool
@@ -21,9 +22,29 @@ from agents.security_agent import SecurityAgent
 from agents.quality_agent import QualityAgent
 from agents.documentation_agent import DocumentationAgent
 from agents.cursor_chat_agent import CursorChatAgent
+from agents.llm_batch import BATCHABLE_AGENTS, LLMBatch
+from agents.parsed_diff import ParsedDiff
+from agents.tracing import Span, current_span, get_tracer
 
 logger = logging.getLogger(__name__)
 
+# Per-agent timeout when no deadline applies
+AGENT_TIMEOUT_SECONDS = 30
+# How long all agents that missed the pipelined deadline get, together, to finish
+LATE_AGENT_GRACE_SECONDS = 30
+
+
+class PendingAnalysis:
+    """Agents submitted by start_analysis() that have not been collected yet"""
+    
+    def __init__(self, state: AgentState, futures: List[Tuple[str, Future]], start_time: datetime):
+        self.state = state
+        self.futures = futures
+        self.start_time = start_time
+        self.started_at = time.monotonic()
+        # Agents that missed the deadline and were left out of the results
+        self.late: List[str] = []
+
 
 class AgentOrchestrator:
     """Orchestrates multiple specialized agents for comprehensive code analysis"""
@@ -35,16 +56,32 @@ class AgentOrchestrator:
         # Initialize agents
         self.agents = self._initialize_agents()
         
-        # Thread pool for parallel execution
-        self.executor = ThreadPoolExecutor(max_workers=4)  # Increased for cursor chat agent
+        # Thread pool for parallel execution: one thread per agent for each
+        # commit analyzed at the same time (see set_concurrency)
+        self.pool_size = len(self.agents)
+        self.executor = ThreadPoolExecutor(max_workers=self.pool_size)
+        
+        # Metrics of the most recent analysis; each analysis counts its own
+        # in state["metrics"] so concurrent or successive commits don't add up
+        self.metrics = self._new_metrics()
         
-        # Track execution metrics
-        self.metrics = {
+    @staticmethod
+    def _new_metrics() -> Dict[str, Any]:
+        return {
             "agents_run": 0,
             "total_tokens": 0,
             "total_cost": 0.0,
             "execution_time": 0.0
         }
+    
+    def set_concurrency(self, commits: int) -> None:
+        """Size the agent pool for this many commits analyzed at once (e.g. backfill workers)"""
+        pool_size = len(self.agents) * max(1, commits)
+        if pool_size != self.pool_size:
+            old_executor = self.executor
+            self.pool_size = pool_size
+            self.executor = ThreadPoolExecutor(max_workers=pool_size)
+            old_executor.shutdown(wait=False)
         
     def _initialize_agents(self) -> Dict[str, BaseAgent]:
         """Initialize all available agents"""
@@ -72,17 +109,30 @@ class AgentOrchestrator:
         logger.info(f"Initialized {len(agents)} agents for project {self.project_id}")
         return agents
     
-    def analyze_commit(self, git_diff: str, commit_info: Dict[str, Any]) -> Dict[str, Any]:
-        """Analyze a commit using all enabled agents"""
-        start_time = datetime.now()
-        
-        # Initialize shared state
+    def _initial_state(self, git_diff: str, commit_info: Dict[str, Any],
+                       start_time: datetime, diff_digest: Optional[str] = None) -> AgentState:
+        """Shared state every agent starts from"""
         state = AgentState({
             "git_diff": git_diff,
             "commit_info": commit_info,
             "project_id": self.project_id,
-            "timestamp": start_time.isoformat()
+            "timestamp": start_time.isoformat(),
+            # Parsed once here and shared read-only by every agent
+            "parsed_diff": ParsedDiff.parse(git_diff),
+            "metrics": self._new_metrics()
         })
+        if diff_digest:
+            # Condensed form of a large diff for LLM prompts; pattern scans still use git_diff
+            state["diff_digest"] = diff_digest
+        return state
+    
+    def analyze_commit(self, git_diff: str, commit_info: Dict[str, Any],
+                       diff_digest: Optional[str] = None) -> Dict[str, Any]:
+        """Analyze a commit using all enabled agents"""
+        start_time = datetime.now()
+        
+        # Initialize shared state
+        state = self._initial_state(git_diff, commit_info, start_time, diff_digest)
         
         # Determine execution mode
         execution_mode = self.settings.get("execution_mode", "parallel")
@@ -93,60 +143,189 @@ class AgentOrchestrator:
             state = self._run_agents_sequential(state)
         elif execution_mode == "priority":
             state = self._run_agents_priority(state)
+        elif execution_mode == "batched":
+            state = self._run_agents_batched(state)
+        elif execution_mode == "pipelined":
+            # Called directly there is nothing to overlap with, so just apply the deadline
+            state = self._run_agents_parallel(state, deadline=self.settings.get("agent_deadline"))
         else:
             logger.warning(f"Unknown execution mode: {execution_mode}, defaulting to parallel")
             state = self._run_agents_parallel(state)
         
-        # Calculate final metrics
+        return self._finish(state, start_time)
+    
+    def _finish(self, state: AgentState, start_time: datetime) -> Dict[str, Any]:
+        """Record timing and aggregate agent results"""
         elapsed_time = (datetime.now() - start_time).total_seconds()
-        self.metrics["execution_time"] = elapsed_time
+        metrics = state["metrics"]
+        metrics["execution_time"] = elapsed_time
+        self.metrics = dict(metrics)
         
         # Aggregate results
         results = self._aggregate_results(state)
-        results["metrics"] = self.metrics
+        results["metrics"] = dict(metrics)
         
         logger.info(f"Analysis complete in {elapsed_time:.2f}s")
         return results
     
-    def _run_agents_parallel(self, state: AgentState) -> AgentState:
-        """Run all enabled agents in parallel"""
+    def start_analysis(self, git_diff: str, commit_info: Dict[str, Any],
+                       diff_digest: Optional[str] = None) -> PendingAnalysis:
+        """Submit all enabled agents and return without waiting for them.
+        
+        Used by the pipelined workflow so summaries can be generated while
+        agents run; pass the handle to collect_analysis() afterwards.
+        """
+        start_time = datetime.now()
+        state = self._initial_state(git_diff, commit_info, start_time, diff_digest)
+        return PendingAnalysis(state, self._submit_agents(state), start_time)
+    
+    def collect_analysis(self, pending: PendingAnalysis,
+                         deadline: Optional[float] = None) -> Dict[str, Any]:
+        """Aggregate agents that finish within deadline seconds of start_analysis()
+        
+        Agents still running at the deadline are recorded as late in the
+        results and listed in pending.late; collect_late() waits for them.
+        """
+        self._collect_agents(pending.state, pending.futures, deadline,
+                             started_at=pending.started_at, late=pending.late)
+        return self._finish(pending.state, pending.start_time)
+    
+    def collect_late(self, pending: PendingAnalysis,
+                     timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Wait for agents that missed the deadline and return their results by name
+        
+        All late agents share one grace period (timeout seconds, by default
+        the late_agent_grace setting); any still running after it are
+        reported as timed out rather than waited on one after another.
+        """
+        if timeout is None:
+            timeout = self.settings.get("late_agent_grace", LATE_AGENT_GRACE_SECONDS)
+        futures = dict(pending.futures)
+        late_futures = {name: futures[name] for name in pending.late}
+        wait(late_futures.values(), timeout=timeout)
+        
+        late_results = {}
+        for name, future in late_futures.items():
+            if not future.done():
+                logger.warning(f"{name} agent still running {timeout}s past the deadline; giving up on it")
+                late_results[name] = {"error": f"Timed out after {timeout}s past the deadline"}
+                continue
+            try:
+                agent_state = future.result()
+                late_results[name] = agent_state.get(f"agent_{name}", {})
+                self._update_metrics(pending.state, late_results[name])
+            except Exception as e:
+                logger.error(f"Error running {name} agent: {e}")
+                late_results[name] = {"error": str(e)}
+        return late_results
+    
+    def _submit_agents(self, state: AgentState) -> List[Tuple[str, Future]]:
+        """Start every enabled agent on the executor with its own copy of state"""
         enabled_agents = [(name, agent) for name, agent in self.agents.items() if agent.enabled]
         
         if not enabled_agents:
             logger.warning("No agents enabled")
-            return state
+            return []
+        
+        # Agent spans hang off the graph node that submitted them
+        parent = current_span()
         
-        # Run agents in parallel using ThreadPoolExecutor
+        # A shallow copy per agent: the diff text and ParsedDiff are shared,
+        # only the agent_<name> result each agent adds is private to it
         futures = []
         for name, agent in enabled_agents:
-            future = self.executor.submit(agent.analyze, AgentState(state.copy()))
+            future = self.executor.submit(
+                self._run_agent, name, agent, AgentState(state.copy()), parent, time.perf_counter()
+            )
             futures.append((name, future))
+        return futures
+    
+    def _run_agent(self, name: str, agent: BaseAgent, state: AgentState,
+                   parent: Optional[Span] = None, submitted_at: Optional[float] = None) -> AgentState:
+        """Run one agent inside a span; queue wait is the time spent waiting for a pool thread"""
+        queue_wait_ms = round((time.perf_counter() - submitted_at) * 1000, 3) if submitted_at else None
+        with get_tracer().span(f"{name}_agent", kind='agent', parent=parent,
+                               queue_wait_ms=queue_wait_ms, agent=name, model=agent.model) as span:
+            try:
+                state = agent.analyze(state)
+            finally:
+                # Once an agent is done it can't join a batched LLM call any more
+                batch = state.get("llm_batch")
+                if batch is not None:
+                    batch.done(name)
+            
+            agent_result = state.get(f"agent_{name}", {})
+            span.add_tokens(agent_result.get("tokens_used", 0))
+            if agent_result.get("skipped"):
+                span.set(skipped=True)
+            if "error" in agent_result:
+                span.fail(str(agent_result["error"]))
+        return state
+    
+    def _collect_agents(self, state: AgentState, futures: List[Tuple[str, Future]],
+                        deadline: Optional[float] = None, started_at: Optional[float] = None,
+                        late: Optional[List[str]] = None) -> AgentState:
+        """Merge agent results into state, honouring an overall deadline if given"""
+        if started_at is None:
+            started_at = time.monotonic()
         
-        # Collect results
         for name, future in futures:
+            if deadline is None:
+                timeout = AGENT_TIMEOUT_SECONDS
+            else:
+                timeout = max(started_at + deadline - time.monotonic(), 0)
+            
             try:
-                agent_state = future.result(timeout=30)  # 30 second timeout per agent
+                agent_state = future.result(timeout=timeout)
                 # Merge agent results into main state
                 if f"agent_{name}" in agent_state:
                     state[f"agent_{name}"] = agent_state[f"agent_{name}"]
-                    self._update_metrics(agent_state[f"agent_{name}"])
-                self.metrics["agents_run"] += 1
+                    self._update_metrics(state, agent_state[f"agent_{name}"])
+                state["metrics"]["agents_run"] += 1
+            except FutureTimeoutError:
+                if deadline is not None and late is not None:
+                    logger.warning(f"{name} agent missed the {deadline}s deadline; leaving it out of the summary")
+                    late.append(name)
+                    state[f"agent_{name}"] = {"error": f"Missed the {deadline}s deadline", "late": True}
+                else:
+                    logger.error(f"Error running {name} agent: timed out after {timeout:.0f}s")
+                    state[f"agent_{name}"] = {"error": f"Timed out after {timeout:.0f}s"}
             except Exception as e:
                 logger.error(f"Error running {name} agent: {e}")
                 state[f"agent_{name}"] = {"error": str(e)}
         
         return state
     
+    def _run_agents_parallel(self, state: AgentState, deadline: Optional[float] = None) -> AgentState:
+        """Run all enabled agents in parallel"""
+        return self._collect_agents(state, self._submit_agents(state), deadline)
+    
+    def _run_agents_batched(self, state: AgentState) -> AgentState:
+        """Run agents in parallel, sending the diff agents' LLM requests as one call"""
+        members = [name for name in BATCHABLE_AGENTS
+                   if name in self.agents and self.agents[name].enabled]
+        # One call goes to one model; agents configured with another model call theirs
+        if members:
+            model = self.agents[members[0]].model
+            members = [name for name in members if self.agents[name].model == model]
+        
+        if len(members) > 1:
+            # Members stop waiting on the combined call when the collector below stops waiting on them
+            state["llm_batch"] = LLMBatch(members, state, timeout=AGENT_TIMEOUT_SECONDS)
+        state = self._run_agents_parallel(state)
+        state.pop("llm_batch", None)
+        return state
+    
     def _run_agents_sequential(self, state: AgentState) -> AgentState:
         """Run agents sequentially, passing state between them"""
         enabled_agents = [(name, agent) for name, agent in self.agents.items() if agent.enabled]
         
         for name, agent in enabled_agents:
             try:
-                state = agent.analyze(state)
+                state = self._run_agent(name, agent, state)
                 if f"agent_{name}" in state:
-                    self._update_metrics(state[f"agent_{name}"])
-                self.metrics["agents_run"] += 1
+                    self._update_metrics(state, state[f"agent_{name}"])
+                state["metrics"]["agents_run"] += 1
             except Exception as e:
                 logger.error(f"Error running {name} agent: {e}")
                 state[f"agent_{name}"] = {"error": str(e)}
@@ -173,10 +352,10 @@ class AgentOrchestrator:
             try:
                 # Check if we should continue based on previous results
                 if self._should_continue(state):
-                    state = agent.analyze(state)
+                    state = self._run_agent(name, agent, state)
                     if f"agent_{name}" in state:
-                        self._update_metrics(state[f"agent_{name}"])
-                    self.metrics["agents_run"] += 1
+                        self._update_metrics(state, state[f"agent_{name}"])
+                    state["metrics"]["agents_run"] += 1
             except Exception as e:
                 logger.error(f"Error running {name} agent: {e}")
                 state[f"agent_{name}"] = {"error": str(e)}
@@ -189,8 +368,8 @@ class AgentOrchestrator:
         budget_enabled = self.settings.get("budgetEnabled", False)
         if budget_enabled:
             budget_limit = self.settings.get("commitTokenLimit", 10000)
-            if self.metrics["total_tokens"] >= budget_limit:
-                logger.warning(f"Token budget exceeded: {self.metrics['total_tokens']} >= {budget_limit}")
+            if state["metrics"]["total_tokens"] >= budget_limit:
+                logger.warning(f"Token budget exceeded: {state['metrics']['total_tokens']} >= {budget_limit}")
                 return False
         
         # Check for critical security issues
@@ -202,12 +381,13 @@ class AgentOrchestrator:
         
         return True
     
-    def _update_metrics(self, agent_result: Dict[str, Any]):
-        """Update execution metrics from agent result"""
+    def _update_metrics(self, state: AgentState, agent_result: Dict[str, Any]):
+        """Update the analysis' execution metrics from agent result"""
+        metrics = state["metrics"]
         if "tokens_used" in agent_result:
-            self.metrics["total_tokens"] += agent_result["tokens_used"]
+            metrics["total_tokens"] += agent_result["tokens_used"]
         if "cost" in agent_result:
-            self.metrics["total_cost"] += agent_result["cost"]
+            metrics["total_cost"] += agent_result["cost"]
     
     def _aggregate_results(self, state: AgentState) -> Dict[str, Any]:
         """Aggregate results from all agents into a unified summary"""
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+History backfill for Auto-Brainlift
+Summarizes a range of existing commits with one warm summarizer
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import argparse
+import threading
+import logging
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional
+
+from agents.repository import get_repository
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimiter:
+    """Token bucket shared by all workers: at most `rate` starts per minute"""
+    
+    def __init__(self, rate_per_minute: float, burst: int = 1):
+        self.interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+    
+    def acquire(self) -> None:
+        """Block until the caller may start another commit"""
+        if not self.interval:
+            return
+        
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) / self.interval)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) * self.interval
+            time.sleep(wait)
+
+
+class BackfillCheckpoint:
+    """Records finished commits so an interrupted backfill resumes where it stopped"""
+    
+    def __init__(self, checkpoint_file: Path, spec: str):
+        self.checkpoint_file = Path(checkpoint_file)
+        self.spec = spec
+        self._lock = threading.Lock()
+        
+        self.completed: List[str] = []
+        self.failed: Dict[str, str] = {}
+        self._completed_set = set()
+        self._load()
+    
+    def _load(self) -> None:
+        """Load progress from a previous run of the same backfill"""
+        if not self.checkpoint_file.exists():
+            return
+        
+        try:
+            with open(self.checkpoint_file, 'r') as f:
+                data = json.load(f)
+            self.completed = data.get('completed', [])
+            self.failed = data.get('failed', {})
+            self._completed_set = set(self.completed)
+        except Exception as e:
+            logger.error(f"Failed to load backfill checkpoint: {e}")
+    
+    def is_done(self, commit_hash: str) -> bool:
+        """Whether a previous run already summarized this commit"""
+        return commit_hash in self._completed_set
+    
+    def mark_done(self, commit_hash: str) -> None:
+        """Record a summarized commit"""
+        with self._lock:
+            if commit_hash not in self._completed_set:
+                self._completed_set.add(commit_hash)
+                self.completed.append(commit_hash)
+            self.failed.pop(commit_hash, None)
+            self._save()
+    
+    def mark_failed(self, commit_hash: str, error: str) -> None:
+        """Record a commit to be retried on the next run"""
+        with self._lock:
+            self.failed[commit_hash] = error
+            self._save()
+    
+    def _save(self) -> None:
+        """Atomically rewrite the checkpoint file (caller holds the lock)"""
+        try:
+            self.checkpoint_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.checkpoint_file.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({
+                    'spec': self.spec,
+                    'completed': self.completed,
+                    'failed': self.failed,
+                    'updated': datetime.now().isoformat()
+                }, f, indent=2)
+            os.replace(tmp_file, self.checkpoint_file)
+        except Exception as e:
+            logger.error(f"Failed to save backfill checkpoint: {e}")
+
+
+class BackfillRunner:
+    """Runs GitCommitSummarizer over a commit range with a bounded worker pool"""
+    
+    def __init__(self, summarizer, workers: int = 4, rate_per_minute: float = 30,
+                 resume: bool = True):
+        self.summarizer = summarizer
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(rate_per_minute, burst=self.workers)
+        self.resume = resume
+        
+        self.stats = {
+            'total': 0,
+            'processed': 0,
+            'cached': 0,
+            'resumed': 0,
+            'failed': 0,
+            'cost': 0.0
+        }
+        self._stats_lock = threading.Lock()
+        self.started_at: Optional[float] = None
+    
+    def list_commits(self, rev_range: Optional[str] = None,
+                     since: Optional[str] = None) -> List[str]:
+        """Walk history once, oldest first, skipping merge commits"""
+        repo = get_repository(self.summarizer.base_dir).repo
+        kwargs = {'no_merges': True, 'reverse': True}
+        if since:
+            kwargs['since'] = since
+        return [commit.hexsha for commit in repo.iter_commits(rev_range or 'HEAD', **kwargs)]
+    
+    def _checkpoint_for(self, spec: str) -> BackfillCheckpoint:
+        """Checkpoint file for this range, next to the project's cache"""
+        cache_manager = self.summarizer.cache_manager
+        if cache_manager:
+            base = Path(cache_manager.cache_dir) / cache_manager.project_id / 'backfill'
+        else:
+            base = self.summarizer.base_dir / '.brainlift_backfill'
+        spec_hash = hashlib.md5(spec.encode()).hexdigest()[:12]
+        return BackfillCheckpoint(base / f"{spec_hash}.json", spec)
+    
+    def _is_cached(self, commit_hash: str) -> bool:
+        """Whether the commit's summary is already in the result cache"""
+        cache_manager = self.summarizer.cache_manager
+        return bool(cache_manager) and cache_manager.result_cache.contains(commit_hash)
+    
+    def _commit_cost(self, commit_hash: str) -> float:
+        """Spend recorded against a commit by the budget manager"""
+        budget_manager = self.summarizer.budget_manager
+        if not budget_manager:
+            return 0.0
+        return budget_manager.usage_data.get('commits', {}).get(commit_hash, {}).get('cost', 0.0)
+    
+    def _process(self, commit_hash: str) -> float:
+        """Summarize one commit and return what it cost"""
+        self.rate_limiter.acquire()
+        cost_before = self._commit_cost(commit_hash)
+        self.summarizer.process_commit(commit_hash, tag_outputs=True)
+        return self._commit_cost(commit_hash) - cost_before
+    
+    def _report(self, commit_hash: str, outcome: str) -> None:
+        """Print one progress line with running throughput and cost"""
+        with self._stats_lock:
+            done = self.stats['processed'] + self.stats['failed']
+            elapsed = time.monotonic() - self.started_at
+            rate = self.stats['processed'] / elapsed * 60 if elapsed > 0 else 0.0
+            queued = self.stats['total'] - self.stats['cached'] - self.stats['resumed']
+            print(
+                f"[{done}/{queued}] {commit_hash[:8]} {outcome} | {rate:.1f} commits/min | "
+                f"${self.stats['cost']:.4f} spent | {queued - done} left",
+                flush=True
+            )
+    
+    def run(self, rev_range: Optional[str] = None, since: Optional[str] = None) -> Dict[str, Any]:
+        """Summarize every commit in the range that is not already done"""
+        spec = f"range={rev_range or 'HEAD'};since={since or ''}"
+        checkpoint = self._checkpoint_for(spec)
+        commits = self.list_commits(rev_range, since)
+        self.stats['total'] = len(commits)
+        
+        todo = []
+        for commit_hash in commits:
+            if self.resume and checkpoint.is_done(commit_hash):
+                self.stats['resumed'] += 1
+            elif self._is_cached(commit_hash):
+                self.stats['cached'] += 1
+                checkpoint.mark_done(commit_hash)
+            else:
+                todo.append(commit_hash)
+        
+        print(
+            f"Backfilling {len(todo)} of {len(commits)} commits "
+            f"({self.stats['cached']} cached, {self.stats['resumed']} from checkpoint) "
+            f"with {self.workers} workers",
+            flush=True
+        )
+        
+        # Workers share the summarizer's orchestrator; give its pool room for
+        # every worker's agents so none queue past the agent timeout
+        if self.summarizer.agent_orchestrator:
+            self.summarizer.agent_orchestrator.set_concurrency(self.workers)
+        
+        self.started_at = time.monotonic()
+        executor = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            futures = {executor.submit(self._process, commit_hash): commit_hash for commit_hash in todo}
+            for future in as_completed(futures):
+                commit_hash = futures[future]
+                try:
+                    cost = future.result()
+                    with self._stats_lock:
+                        self.stats['processed'] += 1
+                        self.stats['cost'] += cost
+                    checkpoint.mark_done(commit_hash)
+                    self._report(commit_hash, "done")
+                except Exception as e:
+                    with self._stats_lock:
+                        self.stats['failed'] += 1
+                    checkpoint.mark_failed(commit_hash, str(e))
+                    logger.error(f"Backfill failed for {commit_hash[:8]}: {e}")
+                    self._report(commit_hash, "failed")
+        except KeyboardInterrupt:
+            print("\nInterrupted; progress is saved and the next run will resume", flush=True)
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise
+        finally:
+            executor.shutdown(wait=True)
+        
+        elapsed = time.monotonic() - self.started_at
+        self.stats['elapsed_seconds'] = round(elapsed, 2)
+        self.stats['commits_per_minute'] = round(self.stats['processed'] / elapsed * 60, 2) if elapsed > 0 else 0.0
+        self.stats['checkpoint'] = str(checkpoint.checkpoint_file)
+        return self.stats
+
+
+def main(args: List[str]) -> None:
+    """Parse backfill options and run it (called from langgraph_agent.main)"""
+    parser = argparse.ArgumentParser(
+        prog='langgraph_agent.py',
+        description='Summarize existing commits in bulk'
+    )
+    parser.add_argument('--range', dest='rev_range', help='Commit range, e.g. v1.0..HEAD')
+    parser.add_argument('--since', help='Only commits after this date, e.g. "2 weeks ago"')
+    parser.add_argument('--workers', type=int, default=int(os.getenv('BACKFILL_WORKERS', '4')),
+                        help='Commits summarized at once')
+    parser.add_argument('--rate', type=float, default=float(os.getenv('BACKFILL_RATE_PER_MINUTE', '30')),
+                        help='Maximum commits started per minute across all workers (0 = unlimited)')
+    parser.add_argument('--no-resume', action='store_true', help='Ignore the checkpoint of a previous run')
+    options = parser.parse_args(args)
+    
+    if not options.rev_range and not options.since:
+        parser.error('one of --range or --since is required')
+    
+    from agents.langgraph_agent import GitCommitSummarizer
+    summarizer = GitCommitSummarizer()
+    runner = BackfillRunner(
+        summarizer,
+        workers=options.workers,
+        rate_per_minute=options.rate,
+        resume=not options.no_resume
+    )
+    
+    try:
+        stats = runner.run(options.rev_range, options.since)
+    except KeyboardInterrupt:
+        sys.exit(130)
+    finally:
+        if summarizer.cache_manager:
+            summarizer.cache_manager.close()
+    
+    print(f"\n✅ Backfill complete!")
+    print(f"Summarized: {stats['processed']} | Cached: {stats['cached']} | "
+          f"Resumed: {stats['resumed']} | Failed: {stats['failed']}")
+    print(f"⚡ Throughput: {stats['commits_per_minute']} commits/min over {stats['elapsed_seconds']}s")
+    print(f"💵 Cost: ${stats['cost']:.4f}")
+    if stats['failed']:
+        print(f"Failed commits are kept in {stats['checkpoint']} and retried on the next run")
+        sys.exit(1)
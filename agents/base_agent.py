@@ -16,6 +16,10 @@ from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
 
+from agents.diff_map_reduce import MAX_DIRECT_DIFF_CHARS
+from agents.llm_gate import GateDecision, get_llm_gate
+from agents.parsed_diff import ParsedDiff
+
 logger = logging.getLogger(__name__)
 
 
@@ -52,6 +56,13 @@ class BaseAgent(ABC):
         tokens = len(text) / 4
         return (tokens / 1000) * self.cost_per_1k_tokens
     
+    def get_parsed_diff(self, state: AgentState) -> ParsedDiff:
+        """The commit's shared ParsedDiff (read-only), parsing git_diff if the orchestrator didn't"""
+        parsed = state.get("parsed_diff")
+        if parsed is None:
+            parsed = ParsedDiff.parse(state.get("git_diff", ""))
+        return parsed
+    
     def update_state(self, state: AgentState, updates: Dict[str, Any]) -> AgentState:
         """Update shared state with agent results"""
         agent_key = f"agent_{self.name}"
@@ -91,9 +102,22 @@ class SpecializedAgent(BaseAgent):
             prompt = self.prompt_template.format(
                 commit_hash=commit_info.get("commit_hash", ""),
                 commit_message=commit_info.get("commit_message", ""),
-                git_diff=git_diff[:3000]  # Limit diff size
+                # Large diffs arrive pre-condensed; otherwise cap what goes to the LLM
+                git_diff=state.get("diff_digest") or git_diff[:MAX_DIRECT_DIFF_CHARS]
             )
             
+            # In batched mode the orchestrator's batch answers for several agents at once
+            batch = state.get("llm_batch")
+            batched = batch.submit(self) if batch is not None else None
+            if batched is not None:
+                analysis_result, tokens_used, cost = batched
+                return self.update_state(state, {
+                    "analysis": analysis_result,
+                    "tokens_used": tokens_used,
+                    "cost": cost,
+                    "batched": True
+                })
+            
             # Get LLM response
             response = self.llm.invoke([HumanMessage(content=prompt)])
             
@@ -111,6 +135,38 @@ class SpecializedAgent(BaseAgent):
             logger.error(f"Error in {self.name} analysis: {e}")
             return self.update_state(state, {"error": str(e)})
     
+    def gate_llm(self, state: AgentState, findings: int, content: Optional[str] = None) -> GateDecision:
+        """Ask the LLM gate whether this commit needs the agent's LLM call.
+        
+        findings is the number of static findings. content is what the
+        prompt would carry; by default the diff, which the gate also
+        profiles by kind of file. The decision is kept in the agent's results.
+        """
+        parsed = None
+        if content is None:
+            parsed = self.get_parsed_diff(state)
+            content = state.get("diff_digest") or parsed.text[:MAX_DIRECT_DIFF_CHARS]
+        
+        decision = get_llm_gate().decide(
+            self.name, findings,
+            input_chars=len(parsed.text) if parsed else len(content),
+            prompt_chars=len(self.prompt_template) + len(content),
+            parsed=parsed,
+            commit=state.get("commit_info", {}).get("commit_hash")
+        )
+        self.update_state(state, {"llm_gate": decision.to_dict()})
+        return decision
+    
+    def record_llm_verdict(self, state: AgentState, decision: GateDecision) -> None:
+        """Tell the gate whether the LLM agreed with a static-clean result"""
+        analysis = state.get(f"agent_{self.name}", {}).get("analysis")
+        if decision.use_llm and isinstance(analysis, dict) and "parsing_error" not in analysis:
+            get_llm_gate().record_verdict(decision, self.llm_verdict_clean(analysis))
+    
+    def llm_verdict_clean(self, analysis: Dict[str, Any]) -> Optional[bool]:
+        """Whether an LLM analysis found nothing to report; None if it can't be compared"""
+        return None
+    
     def process_response(self, response: str) -> Dict[str, Any]:
         """Process LLM response - can be overridden by subclasses"""
         return {"raw_response": response} 
\ No newline at end of file
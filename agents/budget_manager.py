@@ -3,12 +3,15 @@ Budget manager for tracking token usage and costs. This section of the comment i
 """
 
 import json
+import threading
 from pathlib import Path
 from typing import Any, Dict, Optional, Tuple
 import time
 import logging
 from datetime import datetime, timedelta
 
+from agents.tracing import add_tokens
+
 logger = logging.getLogger(__name__)
 
 
@@ -43,6 +46,9 @@ class BudgetManager:
             'text-embedding-ada-002': 0.0001
         }
         
+        # Summary nodes record usage from parallel graph branches
+        self._lock = threading.Lock()
+        
         # Load existing usage data
         self.usage_data = self._load_usage()
     
@@ -109,46 +115,52 @@ class BudgetManager:
     
     def record_usage(self, tokens_used: int, model: str, commit_hash: Optional[str] = None) -> None:
         """Record actual token usage"""
-        cost = self.calculate_cost(tokens_used, model)
-        today = datetime.now().strftime('%Y-%m-%d')
-        
-        # Update totals
-        self.usage_data['total_tokens'] += tokens_used
-        self.usage_data['total_cost'] += cost
-        
-        # Update daily usage
-        if today not in self.usage_data['daily_usage']:
-            self.usage_data['daily_usage'][today] = {
-                'tokens': 0,
-                'cost': 0.0
-            }
-        
-        self.usage_data['daily_usage'][today]['tokens'] += tokens_used
-        self.usage_data['daily_usage'][today]['cost'] += cost
-        
-        # Update model breakdown
-        if model not in self.usage_data['model_breakdown']:
-            self.usage_data['model_breakdown'][model] = {
-                'tokens': 0,
-                'cost': 0.0
-            }
-        
-        self.usage_data['model_breakdown'][model]['tokens'] += tokens_used
-        self.usage_data['model_breakdown'][model]['cost'] += cost
-        
-        # Record commit-specific usage if provided
-        if commit_hash:
-            self.usage_data['commits'][commit_hash] = {
-                'tokens': tokens_used,
-                'cost': cost,
-                'model': model,
-                'timestamp': time.time()
-            }
-        
-        # Save to disk
-        self._save_usage()
-        
-        logger.info(f"Recorded usage: {tokens_used} tokens, ${cost:.4f} for model {model}")
+        with self._lock:
+            cost = self.calculate_cost(tokens_used, model)
+            today = datetime.now().strftime('%Y-%m-%d')
+            
+            # Update totals
+            self.usage_data['total_tokens'] += tokens_used
+            self.usage_data['total_cost'] += cost
+            
+            # Update daily usage
+            if today not in self.usage_data['daily_usage']:
+                self.usage_data['daily_usage'][today] = {
+                    'tokens': 0,
+                    'cost': 0.0
+                }
+            
+            self.usage_data['daily_usage'][today]['tokens'] += tokens_used
+            self.usage_data['daily_usage'][today]['cost'] += cost
+            
+            # Update model breakdown
+            if model not in self.usage_data['model_breakdown']:
+                self.usage_data['model_breakdown'][model] = {
+                    'tokens': 0,
+                    'cost': 0.0
+                }
+            
+            self.usage_data['model_breakdown'][model]['tokens'] += tokens_used
+            self.usage_data['model_breakdown'][model]['cost'] += cost
+            
+            # Record commit-specific usage if provided; several LLM calls
+            # (context and brainlift summaries) belong to one commit
+            if commit_hash:
+                previous = self.usage_data['commits'].get(commit_hash, {})
+                self.usage_data['commits'][commit_hash] = {
+                    'tokens': previous.get('tokens', 0) + tokens_used,
+                    'cost': previous.get('cost', 0.0) + cost,
+                    'model': model,
+                    'timestamp': time.time()
+                }
+            
+            # Save to disk
+            self._save_usage()
+            
+            # Attribute the tokens to the graph node or agent making the call
+            add_tokens(tokens_used)
+            
+            logger.info(f"Recorded usage: {tokens_used} tokens, ${cost:.4f} for model {model}")
     
     def calculate_cost(self, tokens: int, model: str) -> float:
         """Calculate cost for given tokens and model"""
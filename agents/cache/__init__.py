@@ -4,7 +4,10 @@ Provides multi-tier caching for LLM responses
 """
 
 from .cache_manager import CacheManager
+from .embeddings import EmbeddingProvider, create_embedding_provider
 from .exact_cache import ExactCache
+from .result_cache import ResultCache
 from .semantic_cache import SemanticCache
 
-__all__ = ['CacheManager', 'ExactCache', 'SemanticCache'] 
\ No newline at end of file
+__all__ = ['CacheManager', 'EmbeddingProvider', 'ExactCache', 'ResultCache',
+           'SemanticCache', 'create_embedding_provider'] 
\ No newline at end of file
@@ -18,6 +18,8 @@ class CacheBase(ABC):
             'sets': 0,
             'evictions': 0
         }
+        # Evictions broken down by reason (ttl, lru, lfu, tinylfu, ...)
+        self.eviction_counts: Dict[str, int] = {}
     
     @abstractmethod
     def get(self, key: str) -> Optional[Any]:
@@ -47,9 +49,15 @@ class CacheBase(ABC):
         
         return {
             **self.stats,
-            'hit_rate': hit_rate
+            'hit_rate': hit_rate,
+            'evictions_by_policy': dict(self.eviction_counts)
         }
     
+    def _record_eviction(self, reason: str, count: int = 1) -> None:
+        """Count evicted entries overall and per policy"""
+        self.stats['evictions'] += count
+        self.eviction_counts[reason] = self.eviction_counts.get(reason, 0) + count
+    
     def _is_expired(self, timestamp: float, ttl: int) -> bool:
         """Check if cache entry has expired"""
         return time.time() - timestamp > ttl 
\ No newline at end of file
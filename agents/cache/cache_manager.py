@@ -3,15 +3,21 @@ Cache manager orchestrating multi-tier caching for Auto-Brainlift
 """
 
 import asyncio
+import inspect
+import os
 import time
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set
 from pathlib import Path
 import logging
 from concurrent.futures import ThreadPoolExecutor
 
-from langchain_openai import OpenAIEmbeddings
+from .embedding_memo import EmbeddingMemo
+from .embeddings import EmbeddingProvider, create_embedding_provider
 from .exact_cache import ExactCache
+from .result_cache import ResultCache
 from .semantic_cache import SemanticCache
+from .single_flight import SingleFlight
+from .stats_aggregator import StatsAggregator
 
 logger = logging.getLogger(__name__)
 
@@ -19,10 +25,17 @@ logger = logging.getLogger(__name__)
 class CacheManager:
     """Orchestrates multi-tier caching with exact and semantic matching"""
     
-    def __init__(self, project_id: str, cache_dir: Optional[Path] = None):
+    def __init__(self, project_id: str, cache_dir: Optional[Path] = None,
+                 embedding_provider: Optional[EmbeddingProvider] = None,
+                 max_pending_writes: int = 32):
         """Initialize cache manager for a specific project"""
         self.project_id = project_id
         
+        # Embedding backend (openai | local); it decides the model and threshold
+        if embedding_provider is None:
+            embedding_provider = create_embedding_provider(os.getenv('EMBEDDING_PROVIDER', 'openai'))
+        self.embedding_provider = embedding_provider
+        
         # Set up cache directory to match Electron's app.getPath('userData')
         if cache_dir is None:
             # Use platform-specific app data directory
@@ -37,26 +50,64 @@ class CacheManager:
         self.cache_dir = cache_dir
         
         # Initialize caches
-        self.exact_cache = ExactCache(project_id, cache_dir)
-        self.semantic_cache = SemanticCache(project_id, cache_dir)
+        self.exact_cache = ExactCache(
+            project_id, cache_dir,
+            max_entries=int(os.getenv('EXACT_CACHE_MAX_ENTRIES', '2000')),
+            max_bytes=int(os.getenv('EXACT_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+            eviction_policy=os.getenv('EXACT_CACHE_EVICTION_POLICY', 'lru')  # lru | lfu | tinylfu
+        )
+        self.semantic_cache = SemanticCache(
+            project_id, cache_dir,
+            similarity_threshold=embedding_provider.similarity_threshold,
+            index_mode=os.getenv('SEMANTIC_INDEX_MODE', 'auto'),  # exact | ivf | auto
+            embedding_model=embedding_provider.model
+        )
         
-        # Initialize embeddings model
-        self.embeddings = OpenAIEmbeddings(
-            model="text-embedding-ada-002"  # Cheapest at $0.0001/1K tokens
+        # Finished commit/WIP summaries under one versioned key per subject
+        self.result_cache = ResultCache(
+            self.exact_cache,
+            ttl=int(os.getenv('RESULT_CACHE_TTL', '86400'))
         )
         
+        # Memo of computed embeddings, stored alongside the semantic cache
+        self.embedding_memo = EmbeddingMemo(
+            self.semantic_cache.pool,
+            max_entries=int(os.getenv('EMBEDDING_MEMO_MAX_ENTRIES', '5000'))
+        )
+        
+        # Coalesces concurrent misses for the same query across threads and processes
+        self.single_flight = SingleFlight(cache_dir / project_id / 'cache' / 'locks')
+        
         # Thread pool for async operations
         self.executor = ThreadPoolExecutor(max_workers=2)
         
+        # Write-behind tasks started by the asyncio API; new misses wait once
+        # max_pending_writes are in flight so a slow disk applies backpressure
+        self.max_pending_writes = max_pending_writes
+        self._pending_writes: Set[asyncio.Task] = set()
+        self._write_slots: Optional[asyncio.Semaphore] = None
+        self._closed = False
+        
         # Metrics tracking
         self.metrics = {
             'exact_hits': 0,
             'semantic_hits': 0,
             'cache_misses': 0,
             'embedding_generations': 0,
+            'embedding_memo_hits': 0,
+            'embedding_cost': 0.0,
             'total_latency_ms': 0,
-            'request_count': 0
+            'request_count': 0,
+            'coalesced_requests': 0
         }
+        
+        # stats.json is written in batches rather than on every request
+        self.stats_aggregator = StatsAggregator(
+            cache_dir / project_id / 'cache' / 'stats.json',
+            self.get_cache_stats,
+            flush_interval=float(os.getenv('CACHE_STATS_FLUSH_INTERVAL', '5')),
+            dirty_threshold=int(os.getenv('CACHE_STATS_DIRTY_THRESHOLD', '20'))
+        )
     
     def get_or_generate(self, query: str, generator_fn: Callable, 
                        cache_ttl: int = 3600) -> Dict[str, Any]:
@@ -74,16 +125,54 @@ class CacheManager:
         start_time = time.time()
         
         # Level 1: Check exact match cache (fastest ~50ms)
-        exact_result = self.exact_cache.get(query)
+        exact_result = self._check_exact(query, start_time)
         if exact_result is not None:
-            self.metrics['exact_hits'] += 1
-            return self._format_result(
-                exact_result, 
-                cache_hit='exact',
-                latency_ms=(time.time() - start_time) * 1000
-            )
+            return exact_result
+        
+        # Concurrent misses for the same query wait on a single lookup/generation.
+        # Once the cross-process lock is held, re-read the exact cache in case
+        # another process finished the same query while we were waiting.
+        result, shared = self.single_flight.do(
+            self.exact_cache._generate_key(query),
+            lambda: self._lookup_or_generate(query, generator_fn, cache_ttl, start_time),
+            recheck=lambda: self._check_exact(query, start_time, refresh=True)
+        )
         
-        # Level 2: Generate embedding and check semantic cache (~2s)
+        if shared:
+            self.metrics['coalesced_requests'] += 1
+            result = {
+                **result,
+                'metadata': {
+                    **result['metadata'],
+                    'coalesced': True,
+                    'latency_ms': (time.time() - start_time) * 1000
+                }
+            }
+        return result
+    
+    def _check_exact(self, query: str, start_time: float,
+                     refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Return a formatted exact-cache hit, optionally reloading other processes' writes first"""
+        if refresh:
+            self.exact_cache.refresh()
+        
+        exact_result = self.exact_cache.get(query)
+        if exact_result is None:
+            return None
+        
+        self.metrics['exact_hits'] += 1
+        self.stats_aggregator.mark_dirty()
+        return self._format_result(
+            exact_result, 
+            cache_hit='exact',
+            latency_ms=(time.time() - start_time) * 1000
+        )
+    
+    def _lookup_or_generate(self, query: str, generator_fn: Callable,
+                            cache_ttl: int, start_time: float) -> Dict[str, Any]:
+        """Semantic lookup, falling back to generation (runs once per in-flight query)"""
+        # Level 2: Generate embedding and check semantic cache (~2s remote, ~ms local)
+        query_embedding = None
         try:
             # Generate embedding for the query
             query_embedding = self._generate_embedding(query)
@@ -92,6 +181,7 @@ class CacheManager:
             semantic_result = self.semantic_cache.find_similar(query_embedding)
             if semantic_result is not None:
                 self.metrics['semantic_hits'] += 1
+                self.stats_aggregator.mark_dirty()
                 return self._format_result(
                     semantic_result['data'],
                     cache_hit='semantic',
@@ -109,16 +199,17 @@ class CacheManager:
             # Generate result using provided function
             result = generator_fn(query)
             
-            # Cache the result asynchronously
-            self._cache_result_async(query, result, query_embedding, cache_ttl)
+            # Write the exact entry before releasing the flight so waiting
+            # processes find it; the semantic entry is written in the background
+            self.exact_cache.set(query, result, cache_ttl)
+            self._cache_result_async(query, result, query_embedding, cache_ttl, include_exact=False)
             
             # Update metrics
             elapsed_ms = int((time.time() - start_time) * 1000)
             self.metrics['request_count'] += 1
             self.metrics['total_latency_ms'] += elapsed_ms
             
-            # Save updated stats to file
-            self.save_stats_to_file(self.get_cache_stats())
+            self.stats_aggregator.mark_dirty()
             
             return self._format_result(
                 result,
@@ -130,27 +221,180 @@ class CacheManager:
             logger.error(f"Error generating result: {e}")
             raise
     
-    def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding for text using OpenAI API"""
+    async def aget_or_generate(self, query: str, generator_fn: Callable,
+                               cache_ttl: int = 3600) -> Dict[str, Any]:
+        """
+        Async version of get_or_generate for use inside an event loop
+        
+        Args:
+            query: The query/diff to process
+            generator_fn: Coroutine function (or plain function, run in a
+                worker thread) that generates the result if not cached
+            cache_ttl: Time-to-live for cache entries
+            
+        Returns:
+            Dict with result and metadata
+        """
+        start_time = time.time()
+        
+        # Level 1: exact cache is in memory, so check it inline
+        exact_result = self._check_exact(query, start_time)
+        if exact_result is not None:
+            return exact_result
+        
+        async def recheck():
+            return await asyncio.to_thread(self._check_exact, query, start_time, True)
+        
+        result, shared = await self.single_flight.ado(
+            self.exact_cache._generate_key(query),
+            lambda: self._alookup_or_generate(query, generator_fn, cache_ttl, start_time),
+            recheck=recheck
+        )
+        
+        if shared:
+            self.metrics['coalesced_requests'] += 1
+            result = {
+                **result,
+                'metadata': {
+                    **result['metadata'],
+                    'coalesced': True,
+                    'latency_ms': (time.time() - start_time) * 1000
+                }
+            }
+        return result
+    
+    async def _alookup_or_generate(self, query: str, generator_fn: Callable,
+                                   cache_ttl: int, start_time: float) -> Dict[str, Any]:
+        """Async semantic lookup, falling back to generation"""
+        # Level 2: embedding and semantic search
+        query_embedding = None
         try:
+            query_embedding = await self._agenerate_embedding(query)
+            
+            semantic_result = await asyncio.to_thread(self.semantic_cache.find_similar, query_embedding)
+            if semantic_result is not None:
+                self.metrics['semantic_hits'] += 1
+                self.stats_aggregator.mark_dirty()
+                return self._format_result(
+                    semantic_result['data'],
+                    cache_hit='semantic',
+                    similarity=semantic_result['similarity'],
+                    cache_age_hours=semantic_result['cache_age'] / 3600,
+                    latency_ms=(time.time() - start_time) * 1000
+                )
+        except Exception as e:
+            logger.error(f"Error in semantic cache lookup: {e}")
+        
+        # Level 3: generate a new result
+        self.metrics['cache_misses'] += 1
+        
+        try:
+            if inspect.iscoroutinefunction(generator_fn):
+                result = await generator_fn(query)
+            else:
+                result = await asyncio.to_thread(generator_fn, query)
+            
+            # Exact entry is written before other waiters are released
+            await asyncio.to_thread(self.exact_cache.set, query, result, cache_ttl)
+            await self._schedule_write(query, result, query_embedding, cache_ttl)
+            
+            elapsed_ms = int((time.time() - start_time) * 1000)
+            self.metrics['request_count'] += 1
+            self.metrics['total_latency_ms'] += elapsed_ms
+            
+            self.stats_aggregator.mark_dirty()
+            
+            return self._format_result(
+                result,
+                cache_hit='miss',
+                latency_ms=elapsed_ms
+            )
+            
+        except Exception as e:
+            logger.error(f"Error generating result: {e}")
+            raise
+    
+    async def _agenerate_embedding(self, text: str) -> List[float]:
+        """Async version of _generate_embedding"""
+        try:
+            if len(text) > 8000:
+                text = text[:8000] + "... [truncated]"
+            
+            model = self.embedding_provider.model
+            embedding = await asyncio.to_thread(self.embedding_memo.get, model, text)
+            if embedding is not None:
+                self.metrics['embedding_memo_hits'] += 1
+                return embedding
+            
             self.metrics['embedding_generations'] += 1
+            embedding = await self.embedding_provider.aembed(text)
+            self.metrics['embedding_cost'] += self.embedding_provider.estimate_cost(text)
+            
+            await asyncio.to_thread(self.embedding_memo.set, model, text, embedding)
+            return embedding
+        except Exception as e:
+            logger.error(f"Failed to generate embedding: {e}")
+            raise
+    
+    async def _schedule_write(self, query: str, result: Any,
+                              embedding: Optional[List[float]], ttl: int) -> None:
+        """Start a bounded write-behind task for the semantic entry"""
+        if embedding is None:
+            return
+        
+        if self._write_slots is None:
+            self._write_slots = asyncio.Semaphore(self.max_pending_writes)
+        await self._write_slots.acquire()
+        
+        async def write_task():
+            try:
+                await asyncio.to_thread(
+                    self.semantic_cache.add_embedding,
+                    embedding, result,
+                    query_preview=query[:200],
+                    ttl=ttl * 24  # Semantic cache has longer TTL
+                )
+            except Exception as e:
+                logger.error(f"Failed to cache result: {e}")
+            finally:
+                self._write_slots.release()
+        
+        task = asyncio.create_task(write_task())
+        self._pending_writes.add(task)
+        task.add_done_callback(self._pending_writes.discard)
+    
+    def _generate_embedding(self, text: str) -> List[float]:
+        """Generate embedding for text with the configured provider, reusing memoized results"""
+        try:
             # Truncate very long texts to save on embedding costs
             if len(text) > 8000:
                 text = text[:8000] + "... [truncated]"
             
-            embedding = self.embeddings.embed_query(text)
+            model = self.embedding_provider.model
+            embedding = self.embedding_memo.get(model, text)
+            if embedding is not None:
+                self.metrics['embedding_memo_hits'] += 1
+                return embedding
+            
+            # Only real provider calls count as generations and cost
+            self.metrics['embedding_generations'] += 1
+            embedding = self.embedding_provider.embed(text)
+            self.metrics['embedding_cost'] += self.embedding_provider.estimate_cost(text)
+            
+            self.embedding_memo.set(model, text, embedding)
             return embedding
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
             raise
     
     def _cache_result_async(self, query: str, result: Any, 
-                           embedding: Optional[List[float]], ttl: int) -> None:
+                           embedding: Optional[List[float]], ttl: int,
+                           include_exact: bool = True) -> None:
         """Cache result in background without blocking"""
         def cache_task():
             try:
-                # Always cache exact match
-                self.exact_cache.set(query, result, ttl)
+                if include_exact:
+                    self.exact_cache.set(query, result, ttl)
                 
                 # Cache semantic match if embedding available
                 if embedding is not None:
@@ -187,20 +431,19 @@ class CacheManager:
         if cache_type in ['all', 'semantic']:
             self.semantic_cache.clear()
             results['semantic'] = True
+        
+        if cache_type == 'all':
+            self.embedding_memo.clear()
+            results['embeddings'] = True
             
+        self.stats_aggregator.mark_dirty()
         logger.info(f"Cleared {cache_type} cache for project {self.project_id}")
         return results
     
     def save_stats_to_file(self, stats: Dict[str, Any]) -> None:
         """Save cache statistics to a JSON file for the Electron UI to read"""
         try:
-            stats_file = self.cache_dir / self.project_id / 'cache' / 'stats.json'
-            stats_file.parent.mkdir(parents=True, exist_ok=True)
-            
-            with open(stats_file, 'w') as f:
-                import json
-                json.dump(stats, f, indent=2)
-                
+            self.stats_aggregator.write(stats)
         except Exception as e:
             logger.error(f"Failed to save cache stats: {e}")
     
@@ -219,7 +462,6 @@ class CacheManager:
         avg_latency = (self.metrics['total_latency_ms'] / self.metrics['request_count']
                       if self.metrics['request_count'] > 0 else 0)
         
-        # Save stats after calculating
         stats = {
             'project_id': self.project_id,
             'overall': {
@@ -237,24 +479,61 @@ class CacheManager:
                 **semantic_size
             },
             'embeddings': {
+                'provider': self.embedding_provider.name,
+                'model': self.embedding_provider.model,
                 'generations': self.metrics['embedding_generations'],
-                'estimated_cost': self.metrics['embedding_generations'] * 0.0001  # $0.0001/1K tokens
+                'estimated_cost': self.metrics['embedding_cost'],
+                'memo_hits': self.metrics['embedding_memo_hits'],
+                'memo': self.embedding_memo.get_stats()
+            },
+            'results': self.result_cache.get_stats(),
+            'coalescing': {
+                'coalesced_requests': self.metrics['coalesced_requests'],
+                **self.single_flight.get_stats()
             }
         }
         
-        # Save to file whenever stats are retrieved
-        self.save_stats_to_file(stats)
-        
         return stats
     
     def cleanup_expired(self) -> Dict[str, int]:
         """Cleanup expired entries from all caches"""
-        return {
+        removed = {
             'exact': self.exact_cache.cleanup_expired(),
             'semantic': self.semantic_cache.cleanup_expired()
         }
+        if any(removed.values()):
+            self.stats_aggregator.mark_dirty()
+        return removed
+    
+    def close(self) -> None:
+        """Finish background writes and release database connections"""
+        if self._closed:
+            return
+        self._closed = True
+        self.executor.shutdown(wait=True)
+        # Final stats write needs the database, so it goes before the pool closes
+        self.stats_aggregator.close()
+        self.semantic_cache.close()
+    
+    async def aclose(self) -> None:
+        """Wait for async write-behind tasks, then close"""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        await asyncio.to_thread(self.close)
+    
+    def __enter__(self) -> 'CacheManager':
+        return self
+    
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+    
+    async def __aenter__(self) -> 'CacheManager':
+        return self
+    
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
     
     def __del__(self):
-        """Cleanup resources"""
-        if hasattr(self, 'executor'):
-            self.executor.shutdown(wait=True) 
\ No newline at end of file
+        """Last-resort cleanup if close() was never called"""
+        if hasattr(self, '_closed'):
+            self.close()
@@ -0,0 +1,145 @@
+"""
+Persistent memo of computed embeddings keyed by content hash
+"""
+
+import hashlib
+import time
+import logging
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from .sqlite_pool import SQLitePool
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingMemo:
+    """LRU table of embeddings so the same text is never embedded twice.
+    
+    Entries are keyed by a SHA-256 of the model name and the (already
+    truncated) text and live next to the semantic cache in its SQLite
+    database. Vectors are stored as packed float32 BLOBs.
+    """
+    
+    def __init__(self, pool: SQLitePool, max_entries: int = 5000,
+                 touch_interval: float = 60.0):
+        self.pool = pool
+        self.max_entries = max_entries
+        # Skip rewriting last_used for entries touched this recently
+        self.touch_interval = touch_interval
+        
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'evictions': 0
+        }
+        
+        self._init_db()
+    
+    def _init_db(self) -> None:
+        """Create the memo table if needed"""
+        with self.pool.connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS embedding_memo (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    created REAL NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS idx_memo_last_used
+                ON embedding_memo(last_used)
+            ''')
+            conn.commit()
+    
+    @staticmethod
+    def make_key(model: str, text: str) -> str:
+        """Hash the model name and text into a memo key"""
+        return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+    
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the memoized embedding for text, if any"""
+        key = self.make_key(model, text)
+        try:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT embedding, last_used FROM embedding_memo WHERE key = ?', (key,)
+                ).fetchone()
+            
+            if row is None:
+                self.stats['misses'] += 1
+                return None
+            
+            blob, last_used = row
+            now = time.time()
+            if now - last_used > self.touch_interval:
+                with self.pool.write() as conn:
+                    conn.execute('UPDATE embedding_memo SET last_used = ? WHERE key = ?', (now, key))
+            
+            self.stats['hits'] += 1
+            return np.frombuffer(blob, dtype=np.float32).tolist()
+        
+        except Exception as e:
+            logger.error(f"Error reading embedding memo: {e}")
+            self.stats['misses'] += 1
+            return None
+    
+    def set(self, model: str, text: str, embedding: List[float]) -> None:
+        """Memoize an embedding, evicting least recently used entries over the limit"""
+        key = self.make_key(model, text)
+        blob = np.asarray(embedding, dtype=np.float32).tobytes()
+        now = time.time()
+        
+        try:
+            with self.pool.write() as conn:
+                conn.execute('''
+                    INSERT OR REPLACE INTO embedding_memo
+                    (key, model, embedding, created, last_used)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (key, model, blob, now, now))
+                
+                count = conn.execute('SELECT COUNT(*) FROM embedding_memo').fetchone()[0]
+                excess = count - self.max_entries
+                if excess > 0:
+                    conn.execute('''
+                        DELETE FROM embedding_memo WHERE key IN (
+                            SELECT key FROM embedding_memo ORDER BY last_used LIMIT ?
+                        )
+                    ''', (excess,))
+            
+            self.stats['sets'] += 1
+            if excess > 0:
+                self.stats['evictions'] += excess
+                logger.debug(f"Evicted {excess} embedding memo entries")
+        
+        except Exception as e:
+            logger.error(f"Failed to memoize embedding: {e}")
+    
+    def clear(self) -> None:
+        """Remove every memoized embedding"""
+        try:
+            with self.pool.write() as conn:
+                conn.execute('DELETE FROM embedding_memo')
+        except Exception as e:
+            logger.error(f"Failed to clear embedding memo: {e}")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Memo hit/miss counters and current size"""
+        try:
+            with self.pool.connection() as conn:
+                entry_count = conn.execute('SELECT COUNT(*) FROM embedding_memo').fetchone()[0]
+        except Exception as e:
+            logger.error(f"Failed to count embedding memo entries: {e}")
+            entry_count = 0
+        
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': (self.stats['hits'] / lookups) if lookups > 0 else 0,
+            'entry_count': entry_count,
+            'max_entries': self.max_entries
+        }
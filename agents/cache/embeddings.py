@@ -0,0 +1,135 @@
+"""
+Embedding providers for the semantic cache
+"""
+
+import asyncio
+import re
+import zlib
+import logging
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Type
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class EmbeddingProvider(ABC):
+    """Turns text into vectors for semantic cache lookups.
+    
+    Each provider owns its vector space, so it declares its own model name,
+    dimension and similarity threshold. Embeddings from different providers
+    are never compared with each other.
+    """
+    
+    name = 'base'
+    model = ''
+    dimension = 0
+    similarity_threshold = 0.85
+    cost_per_1k_tokens = 0.0
+    is_remote = False
+    
+    @abstractmethod
+    def embed(self, text: str) -> List[float]:
+        """Embed a single text"""
+        pass
+    
+    async def aembed(self, text: str) -> List[float]:
+        """Embed a single text without blocking the event loop"""
+        return await asyncio.to_thread(self.embed, text)
+    
+    def estimate_cost(self, text: str) -> float:
+        """Estimate the API cost of embedding text (~4 chars per token)"""
+        return (len(text) / 4 / 1000) * self.cost_per_1k_tokens
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """OpenAI embeddings through langchain (network call per embedding)"""
+    
+    name = 'openai'
+    model = 'text-embedding-ada-002'
+    dimension = 1536
+    similarity_threshold = 0.85
+    cost_per_1k_tokens = 0.0001  # Cheapest at $0.0001/1K tokens
+    is_remote = True
+    
+    def __init__(self):
+        from langchain_openai import OpenAIEmbeddings
+        self.embeddings = OpenAIEmbeddings(model=self.model)
+    
+    def embed(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
+    
+    async def aembed(self, text: str) -> List[float]:
+        return await self.embeddings.aembed_query(text)
+
+
+class HashedNgramEmbeddingProvider(EmbeddingProvider):
+    """Offline, CPU-only embeddings from hashed token n-grams of a diff.
+    
+    Code tokens and token bigrams are hashed into a fixed number of signed
+    buckets (the hashing trick). Added and removed lines weigh more than
+    context lines and diff headers, and the vector is L2-normalized so
+    cosine similarity measures how much of the change two diffs share.
+    """
+    
+    name = 'local'
+    model = 'hashed-ngram-v1'
+    dimension = 1024
+    similarity_threshold = 0.9
+    cost_per_1k_tokens = 0.0
+    is_remote = False
+    
+    TOKEN_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]")
+    HEADER_PREFIXES = ('diff --git', 'index ', '--- ', '+++ ', '@@')
+    
+    def embed(self, text: str) -> List[float]:
+        buckets: List[int] = []
+        weights: List[float] = []
+        
+        for line in text.splitlines():
+            if line.startswith(self.HEADER_PREFIXES):
+                weight = 0.25
+            elif line.startswith(('+', '-')):
+                weight = 1.0
+            else:
+                weight = 0.5
+            
+            tokens = self.TOKEN_PATTERN.findall(line)
+            features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+            for feature in features:
+                h = zlib.crc32(feature.encode())
+                buckets.append(h % self.dimension)
+                # Use a separate hash bit for the sign so collisions tend to cancel
+                weights.append(weight if (h >> 31) & 1 else -weight)
+        
+        if not buckets:
+            return [0.0] * self.dimension
+        
+        vec = np.bincount(buckets, weights=weights, minlength=self.dimension)
+        # Dampen very frequent features so boilerplate does not dominate
+        vec = np.sign(vec) * np.log1p(np.abs(vec))
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+        return vec.astype(np.float32).tolist()
+    
+    async def aembed(self, text: str) -> List[float]:
+        # A few milliseconds of CPU; cheaper inline than a thread hop
+        return self.embed(text)
+
+
+PROVIDERS: Dict[str, Type[EmbeddingProvider]] = {
+    OpenAIEmbeddingProvider.name: OpenAIEmbeddingProvider,
+    HashedNgramEmbeddingProvider.name: HashedNgramEmbeddingProvider,
+}
+
+
+def create_embedding_provider(name: Optional[str] = None) -> EmbeddingProvider:
+    """Create an embedding provider by name (openai or local)"""
+    name = (name or 'openai').lower()
+    provider_cls = PROVIDERS.get(name)
+    if provider_cls is None:
+        logger.warning(f"Unknown embedding provider: {name}, defaulting to openai")
+        provider_cls = OpenAIEmbeddingProvider
+    return provider_cls()
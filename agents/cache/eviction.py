@@ -0,0 +1,178 @@
+"""
+Eviction policies for size-bounded caches
+"""
+
+import heapq
+import hashlib
+import itertools
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class EvictionPolicy(ABC):
+    """Tracks key usage and chooses which key to evict next"""
+    
+    name = 'base'
+    
+    @abstractmethod
+    def on_insert(self, key: str) -> None:
+        """Record a newly stored key"""
+        pass
+    
+    @abstractmethod
+    def on_access(self, key: str) -> None:
+        """Record a cache hit"""
+        pass
+    
+    @abstractmethod
+    def on_remove(self, key: str) -> None:
+        """Forget a key that left the cache"""
+        pass
+    
+    @abstractmethod
+    def victim(self) -> Optional[str]:
+        """Key that should be evicted next"""
+        pass
+    
+    def on_miss(self, key: str) -> None:
+        """Record a lookup for a key that is not cached"""
+        pass
+    
+    def admit(self, candidate: str, victim: str) -> bool:
+        """Whether a new key may displace the victim"""
+        return True
+
+
+class LRUPolicy(EvictionPolicy):
+    """Evicts the least recently used key"""
+    
+    name = 'lru'
+    
+    def __init__(self):
+        self._order: 'OrderedDict[str, None]' = OrderedDict()
+    
+    def on_insert(self, key: str) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+    
+    def on_access(self, key: str) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+    
+    def on_remove(self, key: str) -> None:
+        self._order.pop(key, None)
+    
+    def victim(self) -> Optional[str]:
+        return next(iter(self._order), None)
+
+
+class LFUPolicy(EvictionPolicy):
+    """Evicts the least frequently used key, oldest first among ties"""
+    
+    name = 'lfu'
+    
+    def __init__(self):
+        self._counts: Dict[str, Tuple[int, int]] = {}
+        self._heap: List[Tuple[int, int, str]] = []
+        self._seq = itertools.count()
+    
+    def on_insert(self, key: str) -> None:
+        self._push(key, 1)
+    
+    def on_access(self, key: str) -> None:
+        if key in self._counts:
+            self._push(key, self._counts[key][0] + 1)
+    
+    def on_remove(self, key: str) -> None:
+        self._counts.pop(key, None)
+    
+    def victim(self) -> Optional[str]:
+        # Entries are pushed again on every access, so skip stale heap records
+        while self._heap:
+            count, seq, key = self._heap[0]
+            if self._counts.get(key) == (count, seq):
+                return key
+            heapq.heappop(self._heap)
+        return None
+    
+    def _push(self, key: str, count: int) -> None:
+        seq = next(self._seq)
+        self._counts[key] = (count, seq)
+        heapq.heappush(self._heap, (count, seq, key))
+        
+        # Rebuild when stale records dominate the heap
+        if len(self._heap) > 4 * max(len(self._counts), 16):
+            self._heap = [(c, s, k) for k, (c, s) in self._counts.items()]
+            heapq.heapify(self._heap)
+
+
+class CountMinSketch:
+    """Approximate frequency counter with periodic aging"""
+    
+    def __init__(self, width: int = 4096, depth: int = 4, sample_size: int = 40960):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self._table = np.zeros((depth, width), dtype=np.uint32)
+        self._additions = 0
+    
+    def _indexes(self, key: str) -> List[int]:
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[i * 4:(i + 1) * 4], 'little') % self.width
+                for i in range(self.depth)]
+    
+    def add(self, key: str) -> None:
+        for row, col in enumerate(self._indexes(key)):
+            self._table[row, col] += 1
+        self._additions += 1
+        
+        # Halve all counters so old popularity fades out
+        if self._additions >= self.sample_size:
+            self._table >>= 1
+            self._additions //= 2
+    
+    def estimate(self, key: str) -> int:
+        return int(min(self._table[row, col] for row, col in enumerate(self._indexes(key))))
+
+
+class TinyLFUPolicy(LRUPolicy):
+    """LRU eviction with TinyLFU admission.
+    
+    The sketch counts lookups (hits and misses). A new key only displaces
+    the LRU victim when it has been requested at least as often as the
+    victim, so one-off entries cannot flush frequently reused ones.
+    """
+    
+    name = 'tinylfu'
+    
+    def __init__(self):
+        super().__init__()
+        self.sketch = CountMinSketch()
+    
+    def on_access(self, key: str) -> None:
+        super().on_access(key)
+        self.sketch.add(key)
+    
+    def on_miss(self, key: str) -> None:
+        self.sketch.add(key)
+    
+    def admit(self, candidate: str, victim: str) -> bool:
+        return self.sketch.estimate(candidate) >= self.sketch.estimate(victim)
+
+
+POLICIES = {
+    LRUPolicy.name: LRUPolicy,
+    LFUPolicy.name: LFUPolicy,
+    TinyLFUPolicy.name: TinyLFUPolicy,
+}
+
+
+def create_policy(name: str) -> EvictionPolicy:
+    """Create an eviction policy by name"""
+    policy_cls = POLICIES.get(name.lower())
+    if policy_cls is None:
+        raise ValueError(f"Unknown eviction policy: {name} (expected one of {', '.join(POLICIES)})")
+    return policy_cls()
@@ -2,28 +2,69 @@
 Exact match cache implementation using in-memory storage
 """
 
+import os
 import time
 import hashlib
 import json
-from typing import Any, Dict, Optional
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from pathlib import Path
 import logging
 
 from .cache_base import CacheBase
+from .eviction import create_policy
+from .file_lock import FileLock
 
 logger = logging.getLogger(__name__)
 
 
 class ExactCache(CacheBase):
-    """In-memory cache for exact query matches with persistent backup"""
+    """In-memory cache for exact query matches with log-structured persistence
     
-    def __init__(self, project_id: str, cache_dir: Path):
+    Every write is one appended JSON line in exact_cache.log, so inserts are
+    O(1) and never rewrite existing data. A background compaction folds the
+    log into the exact_cache.json snapshot once it grows past a threshold.
+    Startup replays the snapshot followed by the log, and refresh() picks up
+    records appended by other processes since then.
+    
+    The cache is bounded by entry count and by total serialized bytes;
+    eviction_policy picks lru, lfu or tinylfu (LRU with frequency-based
+    admission). Evictions are logged so replay sees the same contents.
+    """
+    
+    def __init__(self, project_id: str, cache_dir: Path,
+                 compact_threshold: int = 500,
+                 max_entries: Optional[int] = 2000,
+                 max_bytes: Optional[int] = 64 * 1024 * 1024,
+                 eviction_policy: str = 'lru'):
         super().__init__(project_id)
         self.cache_dir = cache_dir / project_id / 'cache'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         
         self.memory_cache: Dict[str, Dict[str, Any]] = {}
         self.cache_file = self.cache_dir / 'exact_cache.json'
+        self.log_file = self.cache_dir / 'exact_cache.log'
+        
+        # Serializes appends and compaction across threads and processes
+        self.file_lock = FileLock(self.cache_dir / 'exact_cache.lock')
+        self._lock = threading.RLock()
+        
+        self.compact_threshold = compact_threshold
+        self._log_records = 0
+        
+        # How far into the log (and which snapshot) memory reflects, for refresh()
+        self._log_offset = 0
+        self._snapshot_signature: Optional[Tuple[int, int, int]] = None
+        
+        # Size bounds and eviction bookkeeping
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.policy = create_policy(eviction_policy)
+        self._entry_sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._compaction_thread: Optional[threading.Thread] = None
+        # New keys the admission policy kept out; nothing was evicted for them
+        self.stats['rejected_admissions'] = 0
         
         # Load persistent cache on init
         self._load_cache()
@@ -38,102 +79,433 @@ class ExactCache(CacheBase):
         """Get value from cache if not expired"""
         key = self._generate_key(query)
         
-        if key in self.memory_cache:
-            entry = self.memory_cache[key]
-            
-            # Check if expired
-            if self._is_expired(entry['timestamp'], entry['ttl']):
-                del self.memory_cache[key]
-                self.stats['evictions'] += 1
-                self.stats['misses'] += 1
-                return None
+        with self._lock:
+            if key in self.memory_cache:
+                entry = self.memory_cache[key]
+                
+                # Check if expired
+                if self._is_expired(entry['timestamp'], entry['ttl']):
+                    self._drop(key)
+                    self._record_eviction('ttl')
+                    self.stats['misses'] += 1
+                    return None
+                
+                self.policy.on_access(key)
+                self.stats['hits'] += 1
+                logger.debug(f"Cache hit for key: {key[:8]}...")
+                return entry['value']
             
-            self.stats['hits'] += 1
-            logger.debug(f"Cache hit for key: {key[:8]}...")
-            return entry['value']
+            self.policy.on_miss(key)
         
         self.stats['misses'] += 1
         return None
     
+    def contains(self, query: str) -> bool:
+        """Whether an unexpired entry exists, without counting a hit or miss"""
+        key = self._generate_key(query)
+
+        with self._lock:
+            entry = self.memory_cache.get(key)
+            return entry is not None and not self._is_expired(entry['timestamp'], entry['ttl'])
+
+    def peek(self, query: str) -> Optional[Any]:
+        """Value if present and unexpired, without counting a hit or miss"""
+        key = self._generate_key(query)
+        
+        with self._lock:
+            entry = self.memory_cache.get(key)
+            if entry is None or self._is_expired(entry['timestamp'], entry['ttl']):
+                return None
+            return entry['value']
+    
     def set(self, query: str, value: Any, ttl: int = 3600) -> None:
         """Store value in cache with TTL"""
         key = self._generate_key(query)
-        
-        self.memory_cache[key] = {
+        entry = {
             'value': value,
             'timestamp': time.time(),
             'ttl': ttl,
             'query_preview': query[:100]  # For debugging
         }
         
-        self.stats['sets'] += 1
-        logger.debug(f"Cached result for key: {key[:8]}...")
+        record = {'op': 'set', 'key': key, 'entry': entry}
+        size = len(json.dumps(record, separators=(',', ':')))
         
-        # Always persist to disk to ensure cache works between runs
-        self._save_cache()
+        with self._lock:
+            if key not in self.memory_cache and not self._admit(key, size):
+                self.stats['rejected_admissions'] += 1
+                logger.debug(f"Admission policy rejected key: {key[:8]}...")
+                return
+            
+            self._drop(key)
+            self.memory_cache[key] = entry
+            self._entry_sizes[key] = size
+            self._total_bytes += size
+            self.policy.on_insert(key)
+            self.stats['sets'] += 1
+            
+            # Persist the write and any evictions it caused as one log append
+            records = [record] + self._evict_to_bounds()
+            self._append_records(records)
+        
+        logger.debug(f"Cached result for key: {key[:8]}...")
+    
+    def items(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """Snapshot of (key, entry) pairs for unexpired entries"""
+        with self._lock:
+            return [(key, entry) for key, entry in self.memory_cache.items()
+                    if not self._is_expired(entry['timestamp'], entry['ttl'])]
     
     def delete(self, key: str) -> bool:
         """Delete specific key from cache"""
-        if key in self.memory_cache:
-            del self.memory_cache[key]
-            return True
+        with self._lock:
+            if key in self.memory_cache:
+                self._drop(key)
+                self._append_records([{'op': 'delete', 'key': key}])
+                return True
         return False
     
     def clear(self) -> None:
         """Clear all cache entries"""
-        self.memory_cache.clear()
-        self._save_cache()
+        with self._lock:
+            for key in list(self.memory_cache):
+                self._drop(key)
+            try:
+                with self.file_lock.hold():
+                    self._write_snapshot({})
+                    self._truncate_log()
+            except Exception as e:
+                logger.error(f"Failed to clear cache files: {e}")
         logger.info(f"Cleared exact cache for project {self.project_id}")
     
     def _load_cache(self) -> None:
-        """Load cache from persistent storage"""
+        """Load cache from the snapshot and replay the log on top of it"""
+        try:
+            with self.file_lock.hold():
+                entries, log_records = self._read_disk_state()
+            
+            self._log_records = log_records
+            self._rebuild_memory(entries)
+            
+            evicted = self._evict_to_bounds()
+            if evicted:
+                self._append_records(evicted)
+            
+            logger.info(f"Loaded {len(self.memory_cache)} cache entries from disk")
+        except Exception as e:
+            logger.error(f"Failed to load cache: {e}")
+            self.memory_cache = {}
+    
+    def _rebuild_memory(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Replace memory with the live entries, rebuilding recency in write order"""
+        for key in list(self.memory_cache):
+            self._drop(key)
+        
+        live = sorted(
+            ((k, v) for k, v in entries.items()
+             if not self._is_expired(v['timestamp'], v['ttl'])),
+            key=lambda item: item[1]['timestamp']
+        )
+        for key, entry in live:
+            self._insert(key, entry)
+    
+    def _insert(self, key: str, entry: Dict[str, Any]) -> None:
+        """Put an entry in memory with its size and policy bookkeeping"""
+        size = len(json.dumps({'op': 'set', 'key': key, 'entry': entry}, separators=(',', ':')))
+        self.memory_cache[key] = entry
+        self._entry_sizes[key] = size
+        self._total_bytes += size
+        self.policy.on_insert(key)
+    
+    def refresh(self) -> int:
+        """Apply log records appended by other processes since the last read.
+        
+        Returns the number of records read. If another process compacted or
+        cleared the cache in the meantime, memory is rebuilt from disk.
+        """
+        try:
+            with self._lock, self.file_lock.hold():
+                log_size = self.log_file.stat().st_size if self.log_file.exists() else 0
+                
+                if self._in_sync_with_disk():
+                    return 0
+                
+                if (self._read_snapshot_signature() != self._snapshot_signature
+                        or log_size < self._log_offset):
+                    entries, log_records = self._read_disk_state()
+                    self._log_records = log_records
+                    self._rebuild_memory(entries)
+                    return log_records
+                
+                applied = 0
+                for record, offset in self._iter_log(self._log_offset):
+                    self._apply_to_memory(record)
+                    self._log_offset = offset
+                    applied += 1
+            
+            # Other processes enforce their own bounds; only trim memory here
+            with self._lock:
+                while self._over_bounds() and self.policy.victim() is not None:
+                    self._drop(self.policy.victim())
+            
+            return applied
+        except Exception as e:
+            logger.error(f"Failed to refresh cache from disk: {e}")
+            return 0
+    
+    def _apply_to_memory(self, record: Dict[str, Any]) -> None:
+        """Apply one log record to memory (caller holds _lock)"""
+        op = record.get('op')
+        if op == 'set':
+            key, entry = record['key'], record['entry']
+            # Our own appends come back through the log; leave them untouched
+            if self.memory_cache.get(key) == entry:
+                return
+            self._drop(key)
+            if not self._is_expired(entry['timestamp'], entry['ttl']):
+                self._insert(key, entry)
+        elif op == 'delete':
+            self._drop(record['key'])
+        elif op == 'clear':
+            for key in list(self.memory_cache):
+                self._drop(key)
+    
+    def _in_sync_with_disk(self) -> bool:
+        """Whether memory reflects the whole snapshot and log (caller holds file lock)"""
+        log_size = self.log_file.stat().st_size if self.log_file.exists() else 0
+        return (self._read_snapshot_signature() == self._snapshot_signature
+                and log_size == self._log_offset)
+    
+    def _read_snapshot_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Identify the current snapshot file so replacements can be detected"""
+        try:
+            st = self.cache_file.stat()
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+    
+    def _read_disk_state(self) -> Tuple[Dict[str, Dict[str, Any]], int]:
+        """Read the snapshot and apply every complete log record (caller holds file lock)"""
+        entries: Dict[str, Dict[str, Any]] = {}
+        self._snapshot_signature = self._read_snapshot_signature()
         if self.cache_file.exists():
             try:
                 with open(self.cache_file, 'r') as f:
-                    data = json.load(f)
-                    
-                # Filter out expired entries
-                current_time = time.time()
-                self.memory_cache = {
-                    k: v for k, v in data.items()
-                    if not self._is_expired(v['timestamp'], v['ttl'])
-                }
-                
-                logger.info(f"Loaded {len(self.memory_cache)} cache entries from disk")
+                    entries = json.load(f)
             except Exception as e:
-                logger.error(f"Failed to load cache: {e}")
-                self.memory_cache = {}
+                logger.error(f"Failed to read cache snapshot, starting empty: {e}")
+        
+        log_records = 0
+        self._log_offset = 0
+        for record, offset in self._iter_log():
+            self._apply_record(entries, record)
+            self._log_offset = offset
+            log_records += 1
+        
+        return entries, log_records
+    
+    def _iter_log(self, offset: int = 0) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """Yield (record, end offset) for complete records, skipping a torn trailing write"""
+        if not self.log_file.exists():
+            return
+        
+        with open(self.log_file, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # Partial record from a crash mid-append
+                    logger.warning("Ignoring incomplete trailing record in cache log")
+                    break
+                offset += len(line)
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line), offset
+                except json.JSONDecodeError:
+                    logger.warning("Skipping corrupt record in cache log")
     
-    def _save_cache(self) -> None:
-        """Save cache to persistent storage"""
+    @staticmethod
+    def _apply_record(entries: Dict[str, Dict[str, Any]], record: Dict[str, Any]) -> None:
+        """Apply one log record to an entry map"""
+        op = record.get('op')
+        if op == 'set':
+            entries[record['key']] = record['entry']
+        elif op == 'delete':
+            entries.pop(record['key'], None)
+        elif op == 'clear':
+            entries.clear()
+    
+    def _append_records(self, records: List[Dict[str, Any]]) -> None:
+        """Durably append records to the log with a single write"""
+        line = ''.join(json.dumps(r, separators=(',', ':')) + '\n' for r in records).encode()
+        
         try:
-            # Only save non-expired entries
-            current_time = time.time()
-            valid_entries = {
-                k: v for k, v in self.memory_cache.items()
-                if not self._is_expired(v['timestamp'], v['ttl'])
-            }
+            with self.file_lock.hold():
+                # A newline is written first if a previous writer crashed mid-record,
+                # so the torn bytes can never merge with this record
+                fd = os.open(self.log_file, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    size_before = os.fstat(fd).st_size
+                    if self._log_needs_separator(fd):
+                        line = b'\n' + line
+                    os.write(fd, line)
+                    os.fsync(fd)
+                    
+                    # Memory already holds these records, so skip them on refresh
+                    if size_before == self._log_offset:
+                        self._log_offset = size_before + len(line)
+                finally:
+                    os.close(fd)
             
-            with open(self.cache_file, 'w') as f:
-                json.dump(valid_entries, f, indent=2)
-                
-            logger.debug(f"Saved {len(valid_entries)} cache entries to disk")
+            self._log_records += len(records)
         except Exception as e:
             logger.error(f"Failed to save cache: {e}")
+            return
+        
+        if self._log_records >= self.compact_threshold:
+            self._schedule_compaction()
+    
+    def _log_needs_separator(self, fd: int) -> bool:
+        """Check whether the log ends without a trailing newline"""
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return False
+        with open(self.log_file, 'rb') as f:
+            f.seek(size - 1)
+            return f.read(1) != b'\n'
+    
+    def _schedule_compaction(self) -> None:
+        """Run compaction in a background thread if one is not already running"""
+        if self._compaction_thread is not None and self._compaction_thread.is_alive():
+            return
+        self._compaction_thread = threading.Thread(
+            target=self.compact, name='exact-cache-compaction', daemon=True
+        )
+        self._compaction_thread.start()
+    
+    def compact(self) -> None:
+        """Fold the log into a fresh snapshot and truncate the log"""
+        try:
+            # Same lock order as refresh(): writers update the offset, signature
+            # and record count under _lock, so compaction must too
+            with self._lock, self.file_lock.hold():
+                in_sync = self._in_sync_with_disk()
+                
+                # Re-read from disk so records appended by other processes are kept
+                entries, _ = self._read_disk_state()
+                valid_entries = self._bounded_snapshot(entries)
+                
+                self._write_snapshot(valid_entries)
+                self._truncate_log()
+                self._log_records = 0
+                
+                if not in_sync:
+                    # Memory lacks records folded in from other processes; refresh() reloads
+                    self._snapshot_signature = None
+            
+            logger.debug(f"Compacted cache log into snapshot with {len(valid_entries)} entries")
+        except Exception as e:
+            logger.error(f"Failed to compact cache log: {e}")
+    
+    def _write_snapshot(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        """Atomically replace the snapshot file (caller holds file lock)"""
+        tmp_file = self.cache_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(entries, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.cache_file)
+        self._snapshot_signature = self._read_snapshot_signature()
+    
+    def _truncate_log(self) -> None:
+        """Empty the log once its records are in the snapshot (caller holds file lock)"""
+        with open(self.log_file, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+        self._log_offset = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics including size and bounds"""
+        return {
+            **super().get_stats(),
+            'entry_count': len(self.memory_cache),
+            'total_bytes': self._total_bytes,
+            'max_entries': self.max_entries,
+            'max_bytes': self.max_bytes,
+            'eviction_policy': self.policy.name
+        }
+    
+    def _admit(self, key: str, size: int) -> bool:
+        """Ask the policy whether a new key may displace the current victim"""
+        if self.max_bytes is not None and size > self.max_bytes:
+            return False
+        if not self._over_bounds(extra_entries=1, extra_bytes=size):
+            return True
+        victim = self.policy.victim()
+        return victim is None or self.policy.admit(key, victim)
+    
+    def _over_bounds(self, extra_entries: int = 0, extra_bytes: int = 0) -> bool:
+        """Check whether the cache (plus a pending entry) exceeds its limits"""
+        if self.max_entries is not None and len(self.memory_cache) + extra_entries > self.max_entries:
+            return True
+        if self.max_bytes is not None and self._total_bytes + extra_bytes > self.max_bytes:
+            return True
+        return False
+    
+    def _evict_to_bounds(self) -> List[Dict[str, Any]]:
+        """Evict policy victims until within bounds, returning log records for them"""
+        records = []
+        while self._over_bounds():
+            victim = self.policy.victim()
+            if victim is None:
+                break
+            self._drop(victim)
+            self._record_eviction(self.policy.name)
+            records.append({'op': 'delete', 'key': victim})
+        return records
+    
+    def _drop(self, key: str) -> None:
+        """Remove a key from memory and from size/policy bookkeeping"""
+        if self.memory_cache.pop(key, None) is not None:
+            self._total_bytes -= self._entry_sizes.pop(key, 0)
+            self.policy.on_remove(key)
+    
+    def _bounded_snapshot(self, entries: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Drop expired entries and keep the newest ones that fit the bounds"""
+        live = sorted(
+            ((k, v) for k, v in entries.items()
+             if not self._is_expired(v['timestamp'], v['ttl'])),
+            key=lambda item: item[1]['timestamp'],
+            reverse=True
+        )
+        
+        kept = {}
+        total = 0
+        for key, entry in live:
+            if self.max_entries is not None and len(kept) >= self.max_entries:
+                break
+            size = len(json.dumps({'op': 'set', 'key': key, 'entry': entry}, separators=(',', ':')))
+            if self.max_bytes is not None and total + size > self.max_bytes:
+                break
+            kept[key] = entry
+            total += size
+        return kept
     
     def cleanup_expired(self) -> int:
         """Remove expired entries and return count"""
-        initial_size = len(self.memory_cache)
-        current_time = time.time()
-        
-        self.memory_cache = {
-            k: v for k, v in self.memory_cache.items()
-            if not self._is_expired(v['timestamp'], v['ttl'])
-        }
+        with self._lock:
+            expired = [
+                k for k, v in self.memory_cache.items()
+                if self._is_expired(v['timestamp'], v['ttl'])
+            ]
+            for key in expired:
+                self._drop(key)
+            
+            removed = len(expired)
         
-        removed = initial_size - len(self.memory_cache)
         if removed > 0:
-            self.stats['evictions'] += removed
-            self._save_cache()
-            
-        return removed 
\ No newline at end of file
+            self._record_eviction('ttl', removed)
+            # Expired entries are dropped from disk the next time the log is folded
+            self._schedule_compaction()
+        
+        return removed
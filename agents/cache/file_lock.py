@@ -0,0 +1,97 @@
+"""
+Cross-process file locking helpers for cache files
+"""
+
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+
+class FileLock:
+    """Exclusive lock shared by threads in this process and by other processes.
+    
+    Uses flock() on POSIX and msvcrt.locking() on Windows. The in-process
+    RLock is taken first so threads never contend on the OS lock.
+    """
+    
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+    
+    def acquire(self) -> None:
+        """Block until the lock is held"""
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+                elif msvcrt is not None:
+                    msvcrt.locking(self._fd, msvcrt.LK_LOCK, 1)
+            except Exception:
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+    
+    def try_acquire(self) -> bool:
+        """Take the lock without blocking, returning whether it is now held"""
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        if self._depth == 0:
+            try:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                elif msvcrt is not None:
+                    msvcrt.locking(self._fd, msvcrt.LK_NBLCK, 1)
+            except OSError:
+                # Held by another process
+                if self._fd is not None:
+                    os.close(self._fd)
+                    self._fd = None
+                self._thread_lock.release()
+                return False
+        self._depth += 1
+        return True
+    
+    def release(self) -> None:
+        """Release one level of the lock"""
+        self._depth -= 1
+        if self._depth == 0 and self._fd is not None:
+            try:
+                if fcntl is not None:
+                    fcntl.flock(self._fd, fcntl.LOCK_UN)
+                elif msvcrt is not None:
+                    os.lseek(self._fd, 0, os.SEEK_SET)
+                    msvcrt.locking(self._fd, msvcrt.LK_UNLCK, 1)
+            finally:
+                os.close(self._fd)
+                self._fd = None
+        self._thread_lock.release()
+    
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        """Context manager form of acquire/release"""
+        self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
@@ -0,0 +1,149 @@
+"""
+Cache-aside layer for finished commit and WIP summaries
+"""
+
+import re
+import time
+import logging
+from typing import Any, Dict, Optional
+
+from .exact_cache import ExactCache
+
+logger = logging.getLogger(__name__)
+
+# Bump when the shape of cached results changes; older values read as misses
+RESULT_SCHEMA_VERSION = 2
+
+# Keys used before this layer: commit:{sha} from process_commit and
+# commit_with_agents:{subject} from the graph
+LEGACY_KEY = re.compile(r'^(commit|commit_with_agents):(.+)$')
+
+
+class ResultCache:
+    """One canonical entry per summarized commit or WIP diff.
+    
+    Keys are ``summary:{subject}`` where the subject is the full commit SHA
+    or the WIP identifier (``wip_{mode}:{diff hash}``). Values carry
+    ``schema_version`` so results written by an older layout are ignored
+    instead of being half-used. Callers read once before doing any work and
+    write once after the output files exist.
+    """
+    
+    def __init__(self, exact_cache: ExactCache, ttl: int = 86400):
+        self.exact_cache = exact_cache
+        self.ttl = ttl
+        
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'stale_versions': 0,
+            'writes': 0,
+            'migrated': 0
+        }
+        
+        self.migrate_legacy_entries()
+    
+    @staticmethod
+    def key_for(subject: str) -> str:
+        """Canonical cache key for a commit SHA or WIP identifier"""
+        return f"summary:{subject}"
+    
+    def get(self, subject: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Cached result for subject, or None.
+        
+        With refresh=True, records appended by other processes since the
+        last load are replayed first (memory only; no extra disk read when
+        nothing new was appended).
+        """
+        if refresh:
+            self.exact_cache.refresh()
+        
+        value = self.exact_cache.get(self.key_for(subject))
+        if value is None:
+            self.stats['misses'] += 1
+            return None
+        
+        if value.get('schema_version') != RESULT_SCHEMA_VERSION:
+            self.stats['stale_versions'] += 1
+            self.stats['misses'] += 1
+            return None
+        
+        self.stats['hits'] += 1
+        return value
+    
+    def contains(self, subject: str) -> bool:
+        """Whether a current-version result exists, without counting a lookup"""
+        value = self.exact_cache.peek(self.key_for(subject))
+        return isinstance(value, dict) and value.get('schema_version') == RESULT_SCHEMA_VERSION
+    
+    def put(self, subject: str, context_summary: str, brainlift_summary: str,
+            multi_agent_results: Optional[Dict[str, Any]] = None,
+            output_files: Optional[Dict[str, str]] = None) -> None:
+        """Store a finished result (one durable log append)"""
+        self.exact_cache.set(
+            self.key_for(subject),
+            self._value(context_summary, brainlift_summary, multi_agent_results, output_files),
+            ttl=self.ttl
+        )
+        self.stats['writes'] += 1
+    
+    @staticmethod
+    def _value(context_summary: str, brainlift_summary: str,
+               multi_agent_results: Optional[Dict[str, Any]],
+               output_files: Optional[Dict[str, str]]) -> Dict[str, Any]:
+        return {
+            'schema_version': RESULT_SCHEMA_VERSION,
+            'context_summary': context_summary,
+            'brainlift_summary': brainlift_summary,
+            'multi_agent_results': multi_agent_results or {},
+            'output_files': output_files or {},
+            'created': time.time()
+        }
+    
+    def migrate_legacy_entries(self) -> int:
+        """Rewrite commit:/commit_with_agents: entries under the canonical key.
+        
+        ExactCache stores only a hash of each key, so legacy entries are
+        recognized by the query preview kept next to them. When both legacy
+        keys exist for a subject the commit_with_agents one wins since it
+        also holds the agent results. Runs on every start and is a no-op once
+        no legacy entries are left.
+        """
+        legacy: Dict[str, Dict[str, Any]] = {}
+        legacy_keys = []
+        for key, entry in self.exact_cache.items():
+            match = LEGACY_KEY.match(entry.get('query_preview', ''))
+            if not match or not isinstance(entry.get('value'), dict):
+                continue
+            kind, subject = match.groups()
+            legacy_keys.append(key)
+            if kind == 'commit_with_agents' or subject not in legacy:
+                legacy[subject] = entry
+        
+        for subject, entry in legacy.items():
+            value = entry['value']
+            if self.exact_cache.contains(self.key_for(subject)):
+                continue
+            remaining_ttl = entry['ttl'] - (time.time() - entry['timestamp'])
+            self.exact_cache.set(
+                self.key_for(subject),
+                self._value(
+                    value.get('context_summary', ''),
+                    value.get('brainlift_summary', ''),
+                    value.get('multi_agent_results'),
+                    value.get('output_files')
+                ),
+                ttl=max(int(remaining_ttl), 1)
+            )
+        
+        for key in legacy_keys:
+            self.exact_cache.delete(key)
+        
+        if legacy:
+            self.stats['migrated'] += len(legacy)
+            logger.info(f"Migrated {len(legacy)} cached summaries to the {self.key_for('<subject>')} layout")
+        return len(legacy)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Lookup, write and migration counters"""
+        return dict(self.stats)
@@ -4,6 +4,7 @@ Semantic cache implementation using embeddings and SQLite
 
 import json
 import sqlite3
+import threading
 import time
 import numpy as np
 from typing import Any, Dict, List, Optional, Tuple
@@ -11,14 +12,27 @@ from pathlib import Path
 import logging
 
 from .cache_base import CacheBase
+from .sqlite_pool import SQLitePool
+from .vector_index import VectorIndex
 
 logger = logging.getLogger(__name__)
 
+# v1 stored embeddings as JSON text; v2 stores packed float32 BLOBs;
+# v3 tags each row with the embedding model that produced it
+SCHEMA_VERSION = 3
+
+# Model of rows written before embeddings were tagged
+LEGACY_EMBEDDING_MODEL = 'text-embedding-ada-002'
+
+# Rough size of one float in the old JSON encoding ("-0.0123456789012345, ")
+JSON_BYTES_PER_FLOAT = 21
+
 
 class SemanticCache(CacheBase):
     """Semantic cache using embeddings for similarity matching"""
     
-    def __init__(self, project_id: str, cache_dir: Path, similarity_threshold: float = 0.85):
+    def __init__(self, project_id: str, cache_dir: Path, similarity_threshold: float = 0.85,
+                 index_mode: str = 'auto', embedding_model: str = LEGACY_EMBEDDING_MODEL):
         super().__init__(project_id)
         self.cache_dir = cache_dir / project_id / 'cache'
         self.cache_dir.mkdir(parents=True, exist_ok=True)
@@ -26,19 +40,115 @@ class SemanticCache(CacheBase):
         self.db_path = self.cache_dir / 'semantic_cache.db'
         self.similarity_threshold = similarity_threshold
         
+        # Only embeddings from the same model share a vector space
+        self.embedding_model = embedding_model
+        
+        # Resident embedding index, loaded lazily on the first lookup
+        self.index = VectorIndex(mode=index_mode)
+        self._index_loaded = False
+        self._index_max_id = 0
+        self._index_lock = threading.Lock()
+        
+        # Size counters, seeded by one scan and then kept up to date on writes
+        self._size_counters: Optional[Dict[str, int]] = None
+        self._size_lock = threading.Lock()
+        
+        # Long-lived connections shared by all cache operations
+        self.pool = SQLitePool(self.db_path)
+        
         # Initialize database
         self._init_db()
     
     def _init_db(self) -> None:
-        """Initialize SQLite database with embeddings table"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
+        """Initialize SQLite database with embeddings table, migrating older schemas"""
+        with self.pool.connection() as conn:
+            self._create_schema(conn)
+        
+        logger.info(f"Initialized semantic cache database at {self.db_path}")
+    
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create or migrate the embeddings table on a pooled connection.
+        
+        Runs under BEGIN IMMEDIATE and reads the schema version inside the
+        transaction, so when several processes open an old cache at once
+        only the first migrates it and the rest see the new version.
+        """
+        if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+            return
+        
+        migrated_v2 = None
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            
+            version = cursor.execute('PRAGMA user_version').fetchone()[0]
+            if version == SCHEMA_VERSION:
+                # Another process migrated while we waited for the write lock
+                conn.commit()
+                return
+            table_exists = cursor.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'embeddings'"
+            ).fetchone() is not None
+            
+            if table_exists and version < 2:
+                migrated_v2 = self._migrate_to_v2(conn)
+            if table_exists and version < 3:
+                cursor.execute(f'''
+                    ALTER TABLE embeddings
+                    ADD COLUMN embedding_model TEXT NOT NULL DEFAULT '{LEGACY_EMBEDDING_MODEL}'
+                ''')
+            
+            cursor.execute(f'''
+                CREATE TABLE IF NOT EXISTS embeddings (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    project_id TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    embedding_norm REAL NOT NULL,
+                    embedding_dim INTEGER NOT NULL,
+                    data_json TEXT NOT NULL,
+                    query_preview TEXT,
+                    timestamp REAL NOT NULL,
+                    ttl INTEGER NOT NULL,
+                    embedding_model TEXT NOT NULL DEFAULT '{LEGACY_EMBEDDING_MODEL}'
+                )
+            ''')
+            
+            # Create index for faster queries
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_project_timestamp 
+                ON embeddings(project_id, timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_project_model
+                ON embeddings(project_id, embedding_model)
+            ''')
+            
+            cursor.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            conn.commit()
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Failed to create semantic cache schema: {e}")
+            raise
+        
+        if migrated_v2 is not None:
+            # Reclaim the space previously used by the JSON text
+            conn.execute('VACUUM')
+            logger.info(f"Migrated {migrated_v2} semantic cache entries to schema v2")
+    
+    def _migrate_to_v2(self, conn: sqlite3.Connection) -> int:
+        """Convert JSON text embeddings into packed float32 BLOBs in place.
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS embeddings (
+        Runs inside _create_schema's transaction; returns the rows converted.
+        """
+        logger.info(f"Migrating semantic cache at {self.db_path} to binary embeddings")
+        
+        conn.execute('''
+            CREATE TABLE embeddings_v2 (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 project_id TEXT NOT NULL,
-                embedding_json TEXT NOT NULL,
+                embedding BLOB NOT NULL,
+                embedding_norm REAL NOT NULL,
+                embedding_dim INTEGER NOT NULL,
                 data_json TEXT NOT NULL,
                 query_preview TEXT,
                 timestamp REAL NOT NULL,
@@ -46,107 +156,152 @@ class SemanticCache(CacheBase):
             )
         ''')
         
-        # Create index for faster queries
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_project_timestamp 
-            ON embeddings(project_id, timestamp)
+        read_cursor = conn.execute('''
+            SELECT id, project_id, embedding_json, data_json, query_preview, timestamp, ttl
+            FROM embeddings
         ''')
+        migrated = 0
+        while True:
+            rows = read_cursor.fetchmany(500)
+            if not rows:
+                break
+            
+            converted = []
+            for row_id, project_id, emb_json, data_json, preview, timestamp, ttl in rows:
+                blob, norm, dim = self._pack_embedding(json.loads(emb_json))
+                converted.append((row_id, project_id, blob, norm, dim, data_json, preview, timestamp, ttl))
+            
+            conn.executemany('''
+                INSERT INTO embeddings_v2
+                (id, project_id, embedding, embedding_norm, embedding_dim,
+                 data_json, query_preview, timestamp, ttl)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', converted)
+            migrated += len(converted)
         
-        conn.commit()
-        conn.close()
-        
-        logger.info(f"Initialized semantic cache database at {self.db_path}")
+        conn.execute('DROP TABLE embeddings')
+        conn.execute('ALTER TABLE embeddings_v2 RENAME TO embeddings')
+        return migrated
+    
+    @staticmethod
+    def _pack_embedding(embedding: List[float]) -> Tuple[bytes, float, int]:
+        """Pack an embedding into float32 bytes with its norm and dimension"""
+        vec = np.asarray(embedding, dtype=np.float32)
+        return vec.tobytes(), float(np.linalg.norm(vec)), int(vec.shape[0])
+    
+    @staticmethod
+    def _unpack_embedding(blob: bytes) -> np.ndarray:
+        """Decode a packed embedding without copying the buffer"""
+        return np.frombuffer(blob, dtype=np.float32)
     
     def add_embedding(self, embedding: List[float], data: Any, 
                      query_preview: str = "", ttl: int = 86400) -> None:
         """Add embedding with associated data to cache"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('''
-                INSERT INTO embeddings 
-                (project_id, embedding_json, data_json, query_preview, timestamp, ttl)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                self.project_id,
-                json.dumps(embedding),
-                json.dumps(data),
-                query_preview[:200],
-                time.time(),
-                ttl
-            ))
+            timestamp = time.time()
+            blob, norm, dim = self._pack_embedding(embedding)
+            data_json = json.dumps(data)
+            
+            with self.pool.write() as conn:
+                cursor = conn.execute('''
+                    INSERT INTO embeddings 
+                    (project_id, embedding, embedding_norm, embedding_dim, data_json, query_preview,
+                     timestamp, ttl, embedding_model)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (
+                    self.project_id,
+                    blob,
+                    norm,
+                    dim,
+                    data_json,
+                    query_preview[:200],
+                    timestamp,
+                    ttl,
+                    self.embedding_model
+                ))
+                row_id = cursor.lastrowid
             
-            conn.commit()
             self.stats['sets'] += 1
+            self._adjust_size(1, len(blob), len(data_json), dim)
+            
+            # Keep the resident index in sync without reloading it
+            with self._index_lock:
+                if self._index_loaded and row_id > self._index_max_id:
+                    self.index.add(row_id, self._unpack_embedding(blob), timestamp + ttl, norm=norm)
+                    self._index_max_id = row_id
             logger.debug(f"Added embedding to semantic cache")
             
         except Exception as e:
             logger.error(f"Failed to add embedding: {e}")
-        finally:
-            conn.close()
     
     def find_similar(self, query_embedding: List[float], 
                     threshold: Optional[float] = None) -> Optional[Dict[str, Any]]:
         """Find most similar cached result above threshold"""
         if threshold is None:
             threshold = self.similarity_threshold
-            
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
         
         try:
-            # Get all non-expired embeddings for this project
-            current_time = time.time()
-            cursor.execute('''
-                SELECT id, embedding_json, data_json, timestamp, ttl
-                FROM embeddings
-                WHERE project_id = ?
-                AND (timestamp + ttl) > ?
-            ''', (self.project_id, current_time))
-            
-            rows = cursor.fetchall()
-            
-            if not rows:
-                self.stats['misses'] += 1
-                return None
-            
-            # Convert query embedding to numpy array
-            query_vec = np.array(query_embedding)
-            
-            # Find most similar embedding
-            best_similarity = -1
-            best_result = None
-            
-            for row_id, emb_json, data_json, timestamp, ttl in rows:
-                # Parse stored embedding
-                stored_vec = np.array(json.loads(emb_json))
-                
-                # Calculate cosine similarity
-                similarity = self._cosine_similarity(query_vec, stored_vec)
+            with self.pool.connection() as conn:
+                cursor = conn.cursor()
+                current_time = time.time()
+                self._sync_index(cursor)
                 
-                if similarity > best_similarity and similarity >= threshold:
-                    best_similarity = similarity
-                    best_result = {
+                # A match may have been deleted by another process since it was indexed,
+                # so drop stale ids and retry a few times before giving up
+                for _ in range(3):
+                    match = self.index.search(query_embedding, threshold, current_time)
+                    if match is None:
+                        break
+                    
+                    row_id, similarity = match
+                    cursor.execute('''
+                        SELECT data_json, timestamp FROM embeddings WHERE id = ?
+                    ''', (row_id,))
+                    row = cursor.fetchone()
+                    
+                    if row is None:
+                        self.index.remove_ids([row_id])
+                        continue
+                    
+                    data_json, timestamp = row
+                    self.stats['hits'] += 1
+                    logger.debug(f"Semantic cache hit with similarity: {similarity:.3f}")
+                    return {
                         'data': json.loads(data_json),
                         'similarity': similarity,
                         'cache_age': current_time - timestamp
                     }
             
-            if best_result:
-                self.stats['hits'] += 1
-                logger.debug(f"Semantic cache hit with similarity: {best_similarity:.3f}")
-                return best_result
-            else:
-                self.stats['misses'] += 1
-                return None
+            self.stats['misses'] += 1
+            return None
                 
         except Exception as e:
             logger.error(f"Error searching semantic cache: {e}")
             self.stats['misses'] += 1
             return None
-        finally:
-            conn.close()
+    
+    def _sync_index(self, cursor: sqlite3.Cursor) -> None:
+        """Load the index once, then pick up rows added by other processes"""
+        with self._index_lock:
+            # NOT INDEXED keeps SQLite on the rowid range instead of the project index,
+            # so catching up only touches rows newer than the last one indexed
+            cursor.execute('''
+                SELECT id, embedding, embedding_norm, timestamp, ttl
+                FROM embeddings NOT INDEXED
+                WHERE id > ? AND project_id = ? AND embedding_model = ? AND (timestamp + ttl) > ?
+                ORDER BY id
+            ''', (self._index_max_id, self.project_id, self.embedding_model, time.time()))
+            
+            rows = cursor.fetchall()
+            for row_id, blob, norm, timestamp, ttl in rows:
+                self.index.add(row_id, self._unpack_embedding(blob), timestamp + ttl, norm=norm)
+            
+            if rows:
+                self._index_max_id = rows[-1][0]
+            
+            if not self._index_loaded:
+                self._index_loaded = True
+                logger.info(f"Loaded {len(self.index)} embeddings into semantic index")
     
     def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
         """Calculate cosine similarity between two vectors"""
@@ -173,41 +328,37 @@ class SemanticCache(CacheBase):
     
     def clear(self) -> None:
         """Clear all cache entries for this project"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute('DELETE FROM embeddings WHERE project_id = ?', (self.project_id,))
-            conn.commit()
+            with self.pool.write() as conn:
+                conn.execute('DELETE FROM embeddings WHERE project_id = ?', (self.project_id,))
+            self.index.clear()
+            with self._size_lock:
+                if self._size_counters is not None:
+                    self._size_counters = dict.fromkeys(self._size_counters, 0)
             logger.info(f"Cleared semantic cache for project {self.project_id}")
         except Exception as e:
             logger.error(f"Failed to clear semantic cache: {e}")
-        finally:
-            conn.close()
     
     def cleanup_expired(self) -> int:
         """Remove expired entries and return count"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         try:
             current_time = time.time()
             
-            # Count entries to be deleted
-            cursor.execute('''
-                SELECT COUNT(*) FROM embeddings
-                WHERE project_id = ? AND (timestamp + ttl) <= ?
-            ''', (self.project_id, current_time))
-            
-            count = cursor.fetchone()[0]
-            
             # Delete expired entries
-            cursor.execute('''
-                DELETE FROM embeddings
-                WHERE project_id = ? AND (timestamp + ttl) <= ?
-            ''', (self.project_id, current_time))
+            with self.pool.write() as conn:
+                removed = conn.execute('''
+                    SELECT COUNT(*), SUM(LENGTH(embedding)), SUM(LENGTH(data_json)), SUM(embedding_dim)
+                    FROM embeddings
+                    WHERE project_id = ? AND (timestamp + ttl) <= ?
+                ''', (self.project_id, current_time)).fetchone()
+                cursor = conn.execute('''
+                    DELETE FROM embeddings
+                    WHERE project_id = ? AND (timestamp + ttl) <= ?
+                ''', (self.project_id, current_time))
+                count = cursor.rowcount
             
-            conn.commit()
+            self.index.remove_expired(current_time)
+            self._adjust_size(*(-(value or 0) for value in removed))
             
             if count > 0:
                 self.stats['evictions'] += count
@@ -218,31 +369,71 @@ class SemanticCache(CacheBase):
         except Exception as e:
             logger.error(f"Failed to cleanup expired entries: {e}")
             return 0
-        finally:
-            conn.close()
     
-    def get_cache_size(self) -> Dict[str, int]:
-        """Get cache size statistics"""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        try:
-            cursor.execute('''
-                SELECT COUNT(*), SUM(LENGTH(embedding_json) + LENGTH(data_json))
+    def _adjust_size(self, entries: int, embedding_bytes: int,
+                     data_bytes: int, dims: int) -> None:
+        """Apply a write to the size counters (no-op until they are seeded)"""
+        with self._size_lock:
+            if self._size_counters is None:
+                return
+            counters = self._size_counters
+            counters['entry_count'] = max(counters['entry_count'] + entries, 0)
+            counters['embedding_bytes'] = max(counters['embedding_bytes'] + embedding_bytes, 0)
+            counters['data_bytes'] = max(counters['data_bytes'] + data_bytes, 0)
+            counters['total_dims'] = max(counters['total_dims'] + dims, 0)
+    
+    def _count_size(self) -> Dict[str, int]:
+        """Scan the table for size totals"""
+        with self.pool.connection() as conn:
+            count, embedding_bytes, data_bytes, total_dims = conn.execute('''
+                SELECT COUNT(*), SUM(LENGTH(embedding)), SUM(LENGTH(data_json)), SUM(embedding_dim)
                 FROM embeddings
                 WHERE project_id = ?
-            ''', (self.project_id,))
+            ''', (self.project_id,)).fetchone()
+        return {
+            'entry_count': count or 0,
+            'embedding_bytes': embedding_bytes or 0,
+            'data_bytes': data_bytes or 0,
+            'total_dims': total_dims or 0
+        }
+    
+    def get_cache_size(self, recount: bool = False) -> Dict[str, int]:
+        """Get cache size statistics, including savings from binary embeddings
+        
+        Totals come from counters maintained on insert and delete; the table
+        is only scanned the first time or when recount is set (e.g. to pick up
+        rows written by other processes).
+        """
+        try:
+            with self._size_lock:
+                seeded = self._size_counters is not None
+            if recount or not seeded:
+                counters = self._count_size()
+                with self._size_lock:
+                    self._size_counters = counters
             
-            count, total_size = cursor.fetchone()
+            with self._size_lock:
+                count = self._size_counters['entry_count']
+                embedding_bytes = self._size_counters['embedding_bytes']
+                data_bytes = self._size_counters['data_bytes']
+                total_dims = self._size_counters['total_dims']
+            
+            total_size = embedding_bytes + data_bytes
+            json_equivalent = total_dims * JSON_BYTES_PER_FLOAT
             
             return {
                 'entry_count': count or 0,
-                'total_bytes': total_size or 0,
-                'avg_entry_bytes': (total_size // count) if count else 0
+                'total_bytes': total_size,
+                'avg_entry_bytes': (total_size // count) if count else 0,
+                'embedding_bytes': embedding_bytes,
+                'json_embedding_bytes_estimate': json_equivalent,
+                'bytes_saved_estimate': max(json_equivalent - embedding_bytes, 0)
             }
             
         except Exception as e:
             logger.error(f"Failed to get cache size: {e}")
             return {'entry_count': 0, 'total_bytes': 0, 'avg_entry_bytes': 0}
-        finally:
-            conn.close() 
\ No newline at end of file
+    
+    def close(self) -> None:
+        """Close pooled database connections"""
+        self.pool.close() 
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Request coalescing so concurrent callers share one generation per key
+"""
+
+import asyncio
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .file_lock import FileLock
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-progress call that followers wait on"""
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Runs at most one generation per key at a time, in this process and across processes.
+    
+    Threads asking for a key that is already being generated wait for the
+    leader and share its result. Across processes the leader holds a lock
+    file, and each process re-checks the cache through ``recheck`` once it
+    gets the lock, so a result written by another process is reused instead
+    of being generated again. Keys hash onto a fixed set of lock files so the
+    lock directory does not grow with the number of keys.
+    """
+    
+    def __init__(self, lock_dir: Path, stripes: int = 256):
+        self.lock_dir = Path(lock_dir)
+        self.lock_dir.mkdir(parents=True, exist_ok=True)
+        self.stripes = stripes
+        
+        self._mutex = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self._async_flights: Dict[str, 'asyncio.Future[Any]'] = {}
+        self._file_locks: Dict[int, FileLock] = {}
+        
+        self.stats = {
+            'leaders': 0,
+            'coalesced': 0,
+            'recheck_hits': 0
+        }
+    
+    def _file_lock(self, key: str) -> FileLock:
+        """Lock file shared by every key that hashes to the same stripe"""
+        stripe = int(hashlib.sha1(key.encode()).hexdigest(), 16) % self.stripes
+        with self._mutex:
+            lock = self._file_locks.get(stripe)
+            if lock is None:
+                lock = FileLock(self.lock_dir / f"flight_{stripe:03d}.lock")
+                self._file_locks[stripe] = lock
+            return lock
+    
+    def do(self, key: str, fn: Callable[[], Any],
+           recheck: Optional[Callable[[], Any]] = None) -> Tuple[Any, bool]:
+        """Run fn once for all concurrent callers of key.
+        
+        Args:
+            key: Identity of the work being coalesced
+            fn: Produces the result when nobody else has
+            recheck: Called under the cross-process lock before fn; a
+                non-None return is used as the result instead of calling fn
+        
+        Returns:
+            (result, shared) where shared is True if this caller waited on
+            another thread's call instead of running it
+        """
+        with self._mutex:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _Flight()
+                self._flights[key] = flight
+        
+        if not leader:
+            flight.done.wait()
+            self.stats['coalesced'] += 1
+            logger.debug(f"Coalesced request for key: {key[:16]}...")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+        
+        try:
+            with self._file_lock(key).hold():
+                result = recheck() if recheck is not None else None
+                if result is not None:
+                    self.stats['recheck_hits'] += 1
+                else:
+                    self.stats['leaders'] += 1
+                    result = fn()
+            flight.result = result
+            return result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._mutex:
+                self._flights.pop(key, None)
+            flight.done.set()
+    
+    async def ado(self, key: str, fn: Callable[[], Awaitable[Any]],
+                  recheck: Optional[Callable[[], Awaitable[Any]]] = None,
+                  poll_interval: float = 0.05) -> Tuple[Any, bool]:
+        """Async form of do(): coroutines on the loop share one call per key.
+        
+        The cross-process lock is polled without blocking so the event loop
+        keeps serving other keys while this one waits.
+        """
+        flight = self._async_flights.get(key)
+        if flight is not None:
+            # shield() so a cancelled follower does not cancel the leader's result
+            result = await asyncio.shield(flight)
+            self.stats['coalesced'] += 1
+            logger.debug(f"Coalesced request for key: {key[:16]}...")
+            return result, True
+        
+        flight = asyncio.get_running_loop().create_future()
+        self._async_flights[key] = flight
+        
+        try:
+            lock = self._file_lock(key)
+            while not lock.try_acquire():
+                await asyncio.sleep(poll_interval)
+            try:
+                result = await recheck() if recheck is not None else None
+                if result is not None:
+                    self.stats['recheck_hits'] += 1
+                else:
+                    self.stats['leaders'] += 1
+                    result = await fn()
+            finally:
+                lock.release()
+            flight.set_result(result)
+            return result, False
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except BaseException as e:
+            flight.set_exception(e)
+            # Followers re-raise it; mark it retrieved so an unwatched future is not logged
+            flight.exception()
+            raise
+        finally:
+            self._async_flights.pop(key, None)
+    
+    def get_stats(self) -> Dict[str, int]:
+        """Counts of generations run, shared and found on recheck"""
+        return dict(self.stats)
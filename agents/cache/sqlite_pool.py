@@ -0,0 +1,121 @@
+"""
+Pooled, long-lived SQLite connections for cache databases
+"""
+
+import queue
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List
+
+logger = logging.getLogger(__name__)
+
+
+class SQLitePool:
+    """Thread-safe pool of SQLite connections tuned for a read-heavy cache.
+    
+    Connections stay open for the life of the pool, so pragmas are applied
+    once and sqlite3's per-connection statement cache keeps prepared
+    statements warm. WAL mode lets readers run alongside a writer; writes
+    are serialized in-process by a lock and across processes by SQLite's
+    busy timeout.
+    """
+    
+    def __init__(self, db_path: Path, max_connections: int = 4,
+                 busy_timeout_ms: int = 5000, mmap_size: int = 256 * 1024 * 1024,
+                 cached_statements: int = 128):
+        self.db_path = db_path
+        self.max_connections = max_connections
+        self.busy_timeout_ms = busy_timeout_ms
+        self.mmap_size = mmap_size
+        self.cached_statements = cached_statements
+        
+        self._idle: 'queue.LifoQueue[sqlite3.Connection]' = queue.LifoQueue()
+        self._all: List[sqlite3.Connection] = []
+        self._created_lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._closed = False
+    
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a connection and apply the cache pragmas"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False,  # Connections move between pool threads
+            cached_statements=self.cached_statements
+        )
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute('PRAGMA temp_store = MEMORY')
+        return conn
+    
+    def _acquire(self) -> sqlite3.Connection:
+        """Take an idle connection, opening a new one while under the limit"""
+        if self._closed:
+            raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+        
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        
+        with self._created_lock:
+            if len(self._all) < self.max_connections:
+                conn = self._create_connection()
+                self._all.append(conn)
+                return conn
+        
+        return self._idle.get()
+    
+    def _release(self, conn: sqlite3.Connection) -> None:
+        """Return a connection, discarding any transaction left open"""
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+    
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for reads"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+    
+    @contextmanager
+    def write(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection inside an immediate write transaction"""
+        with self._write_lock:
+            conn = self._acquire()
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                yield conn
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                self._release(conn)
+    
+    def close(self) -> None:
+        """Close every pooled connection"""
+        self._closed = True
+        with self._created_lock:
+            while True:
+                try:
+                    self._idle.get_nowait()
+                except queue.Empty:
+                    break
+            for conn in self._all:
+                try:
+                    conn.close()
+                except Exception as e:
+                    logger.debug(f"Error closing SQLite connection: {e}")
+            self._all.clear()
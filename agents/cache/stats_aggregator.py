@@ -0,0 +1,100 @@
+"""
+Batched persistence of cache statistics for the Electron UI
+"""
+
+import atexit
+import json
+import os
+import threading
+import logging
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StatsAggregator:
+    """Writes stats.json in batches instead of on every cache operation.
+    
+    Callers mark the stats dirty as they change. The file is rewritten once
+    dirty_threshold changes have piled up, or by a background timer every
+    flush_interval seconds if anything changed, and a final time on close
+    or interpreter exit. Writes go through a temp file and os.replace so the
+    UI never reads a half-written file.
+    """
+    
+    def __init__(self, stats_file: Path, collect: Callable[[], Dict[str, Any]],
+                 flush_interval: float = 5.0, dirty_threshold: int = 20):
+        self.stats_file = Path(stats_file)
+        self.collect = collect
+        self.flush_interval = flush_interval
+        self.dirty_threshold = dirty_threshold
+        
+        self._dirty = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+        self.flush_count = 0
+        
+        atexit.register(self.close)
+    
+    def mark_dirty(self, changes: int = 1) -> None:
+        """Record that stats changed, flushing if enough changes accumulated"""
+        with self._lock:
+            self._dirty += changes
+            due = self._dirty >= self.dirty_threshold
+        
+        if due:
+            self.flush()
+        else:
+            self._ensure_timer()
+    
+    def _ensure_timer(self) -> None:
+        """Start the background flush timer on first use"""
+        if self._timer is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Thread(
+                    target=self._run_timer, name='cache-stats-flush', daemon=True
+                )
+                self._timer.start()
+    
+    def _run_timer(self) -> None:
+        """Flush pending changes every flush_interval until closed"""
+        while not self._stop.wait(self.flush_interval):
+            if self._dirty:
+                self.flush()
+    
+    def flush(self) -> bool:
+        """Write current stats if anything changed since the last write"""
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return False
+                self._dirty = 0
+            
+            try:
+                self.write(self.collect())
+                self.flush_count += 1
+                return True
+            except Exception as e:
+                logger.error(f"Failed to save cache stats: {e}")
+                return False
+    
+    def write(self, stats: Dict[str, Any]) -> None:
+        """Atomically replace stats.json"""
+        self.stats_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.stats_file.with_suffix('.json.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(stats, f, indent=2)
+        os.replace(tmp_file, self.stats_file)
+    
+    def close(self) -> None:
+        """Stop the timer and write any pending changes"""
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        atexit.unregister(self.close)
+        self.flush()
@@ -0,0 +1,202 @@
+"""
+In-memory vector index for semantic cache lookups
+"""
+
+import threading
+import logging
+from typing import Iterable, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class VectorIndex:
+    """Resident matrix of normalized float32 embeddings searched with one matrix-vector product.
+    
+    Rows are stored pre-normalized so cosine similarity reduces to a dot product.
+    For very large caches an IVF (inverted file) mode clusters the rows with
+    spherical k-means and only scores the clusters closest to the query.
+    """
+    
+    MODES = ('exact', 'ivf', 'auto')
+    
+    def __init__(self, mode: str = 'auto', ivf_threshold: int = 20000, nprobe: int = 8):
+        if mode not in self.MODES:
+            logger.warning(f"Unknown index mode: {mode}, defaulting to auto")
+            mode = 'auto'
+        
+        self.mode = mode
+        self.ivf_threshold = ivf_threshold
+        self.nprobe = nprobe
+        self.dimension: Optional[int] = None
+        
+        self._lock = threading.RLock()
+        self._size = 0
+        self._ids = np.empty(0, dtype=np.int64)
+        self._expires_at = np.empty(0, dtype=np.float64)
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        
+        # IVF state (only populated once the index is large enough)
+        self._centroids: Optional[np.ndarray] = None
+        self._assignments = np.empty(0, dtype=np.int32)
+        self._ivf_built_size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def add(self, row_id: int, vector: Iterable[float], expires_at: float,
+            norm: Optional[float] = None) -> bool:
+        """Add a single embedding to the index, reusing a precomputed norm if given"""
+        vec = np.asarray(vector, dtype=np.float32)
+        if norm is None:
+            norm = float(np.linalg.norm(vec))
+        if norm == 0:
+            return False
+        
+        with self._lock:
+            if self.dimension is None:
+                self.dimension = vec.shape[0]
+            elif vec.shape[0] != self.dimension:
+                logger.warning(f"Skipping embedding with dimension {vec.shape[0]} (index uses {self.dimension})")
+                return False
+            
+            self._ensure_capacity(self._size + 1)
+            self._matrix[self._size] = vec / norm
+            self._ids[self._size] = row_id
+            self._expires_at[self._size] = expires_at
+            
+            if self._centroids is not None:
+                self._assignments[self._size] = int(np.argmax(self._centroids @ self._matrix[self._size]))
+            
+            self._size += 1
+            return True
+    
+    def search(self, query: Iterable[float], threshold: float,
+               now: float) -> Optional[Tuple[int, float]]:
+        """Return (row_id, similarity) of the best live match above threshold"""
+        q = np.asarray(query, dtype=np.float32)
+        norm = float(np.linalg.norm(q))
+        
+        with self._lock:
+            if self._size == 0 or norm == 0 or q.shape[0] != self.dimension:
+                return None
+            q = q / norm
+            
+            if self._use_ivf():
+                candidates = self._ivf_candidates(q)
+                if candidates.size == 0:
+                    return None
+                scores = self._matrix[candidates] @ q
+                scores[self._expires_at[candidates] <= now] = -np.inf
+                best = int(np.argmax(scores))
+                row = int(candidates[best])
+            else:
+                scores = self._matrix[:self._size] @ q
+                scores[self._expires_at[:self._size] <= now] = -np.inf
+                row = int(np.argmax(scores))
+                best = row
+            
+            similarity = float(scores[best])
+            if similarity < threshold:
+                return None
+            return int(self._ids[row]), similarity
+    
+    def remove_expired(self, now: float) -> int:
+        """Drop rows whose TTL has passed"""
+        with self._lock:
+            keep = self._expires_at[:self._size] > now
+            return self._compact(keep)
+    
+    def remove_ids(self, row_ids: Iterable[int]) -> int:
+        """Drop specific rows by database id"""
+        with self._lock:
+            keep = ~np.isin(self._ids[:self._size], np.fromiter(row_ids, dtype=np.int64))
+            return self._compact(keep)
+    
+    def clear(self) -> None:
+        """Remove all rows"""
+        with self._lock:
+            self._size = 0
+            self._centroids = None
+            self._ivf_built_size = 0
+    
+    def _ensure_capacity(self, needed: int) -> None:
+        """Grow backing arrays geometrically so appends stay amortized O(1)"""
+        capacity = self._ids.shape[0]
+        if needed <= capacity and self._matrix.shape[1] == self.dimension:
+            return
+        
+        new_capacity = max(needed, capacity * 2, 64)
+        matrix = np.empty((new_capacity, self.dimension), dtype=np.float32)
+        ids = np.empty(new_capacity, dtype=np.int64)
+        expires_at = np.empty(new_capacity, dtype=np.float64)
+        assignments = np.empty(new_capacity, dtype=np.int32)
+        
+        if self._size:
+            matrix[:self._size] = self._matrix[:self._size]
+            ids[:self._size] = self._ids[:self._size]
+            expires_at[:self._size] = self._expires_at[:self._size]
+            assignments[:self._size] = self._assignments[:self._size]
+        
+        self._matrix, self._ids, self._expires_at, self._assignments = matrix, ids, expires_at, assignments
+    
+    def _compact(self, keep: np.ndarray) -> int:
+        """Keep only the masked rows, preserving order"""
+        removed = int(self._size - np.count_nonzero(keep))
+        if removed == 0:
+            return 0
+        
+        new_size = self._size - removed
+        self._matrix[:new_size] = self._matrix[:self._size][keep]
+        self._ids[:new_size] = self._ids[:self._size][keep]
+        self._expires_at[:new_size] = self._expires_at[:self._size][keep]
+        if self._centroids is not None:
+            self._assignments[:new_size] = self._assignments[:self._size][keep]
+        self._size = new_size
+        return removed
+    
+    def _use_ivf(self) -> bool:
+        """Decide whether to search approximately, (re)building clusters as needed"""
+        if self.mode == 'exact':
+            return False
+        if self.mode == 'auto' and self._size < self.ivf_threshold:
+            return False
+        
+        # Rebuild when the index has doubled since the last clustering
+        if self._centroids is None or self._size > 2 * self._ivf_built_size:
+            self._build_ivf()
+        return self._centroids is not None
+    
+    def _build_ivf(self, iterations: int = 10, sample_size: int = 20000) -> None:
+        """Cluster rows with spherical k-means and assign each row to a list"""
+        data = self._matrix[:self._size]
+        nlist = max(1, int(np.sqrt(self._size)))
+        if self._size < nlist * 2:
+            return
+        
+        rng = np.random.default_rng(0)
+        sample = data[rng.choice(self._size, size=min(sample_size, self._size), replace=False)]
+        centroids = sample[rng.choice(sample.shape[0], size=nlist, replace=False)].copy()
+        
+        for _ in range(iterations):
+            labels = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(nlist):
+                members = sample[labels == c]
+                if members.shape[0] == 0:
+                    # Re-seed empty clusters from a random sample row
+                    centroids[c] = sample[rng.integers(sample.shape[0])]
+                    continue
+                centroid = members.sum(axis=0)
+                centroids[c] = centroid / max(float(np.linalg.norm(centroid)), 1e-12)
+        
+        self._centroids = centroids
+        self._assignments[:self._size] = np.argmax(data @ centroids.T, axis=1)
+        self._ivf_built_size = self._size
+        logger.info(f"Built IVF index with {nlist} lists over {self._size} embeddings")
+    
+    def _ivf_candidates(self, q: np.ndarray) -> np.ndarray:
+        """Row positions belonging to the lists closest to the query"""
+        nprobe = min(self.nprobe, self._centroids.shape[0])
+        probes = np.argpartition(-(self._centroids @ q), nprobe - 1)[:nprobe]
+        return np.flatnonzero(np.isin(self._assignments[:self._size], probes))
@@ -142,7 +142,7 @@ class CursorChatAgent(SpecializedAgent):
             chat_content = self._format_chats_for_analysis(parsed_chats)
             
             # Use LLM to analyze if we have substantial content
-            if len(chat_content) > 200:  # Minimal threshold
+            if self.gate_llm(state, 0, content=chat_content).use_llm:
                 # Format prompt
                 prompt = self.prompt_template.format(chat_content=chat_content)
                 
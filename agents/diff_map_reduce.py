@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+"""
+Map-reduce summarization for diffs too large to send whole
+Splits a diff per file and hunk, summarizes the pieces concurrently and
+condenses the results into a digest the summary prompts can use instead
+"""
+
+import re
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from agents.tracing import bind_context
+
+logger = logging.getLogger(__name__)
+
+# Diffs up to this size are sent to the prompts as they are
+MAX_DIRECT_DIFF_CHARS = 6000
+
+# Chunk summaries only depend on the hunk text, so they can live much longer than commit results
+CHUNK_CACHE_TTL = 30 * 86400
+
+HUNK_HEADER = re.compile(r'^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@')
+
+# `index <old>..<new>` line of a diff made with --full-index
+INDEX_LINE = re.compile(r'^index ([0-9a-f]{7,64})\.\.([0-9a-f]{7,64})', re.MULTILINE)
+
+
+class DiffChunk:
+    """Consecutive hunks of one file, small enough for a single summary call"""
+    
+    def __init__(self, file_path: str, header: str, hunks: List[str]):
+        self.file_path = file_path
+        self.header = header
+        self.hunks = hunks
+    
+    @property
+    def blob_pair(self) -> Optional[Tuple[str, str]]:
+        """(old, new) blob SHAs from the file header, if the diff has an index line"""
+        match = INDEX_LINE.search(self.header)
+        return (match.group(1), match.group(2)) if match else None
+    
+    @property
+    def text(self) -> str:
+        return self.header + ''.join(self.hunks)
+    
+    @property
+    def content_hash(self) -> str:
+        """Hash of the file path and hunk bodies with line numbers stripped.
+        
+        Rebasing or amending shifts hunk offsets and rewrites index lines but
+        leaves most hunks unchanged, so those keep the same hash.
+        """
+        digest = hashlib.sha256(self.file_path.encode())
+        for hunk in self.hunks:
+            digest.update(b'\0')
+            digest.update(HUNK_HEADER.sub('@@', hunk).encode())
+        return digest.hexdigest()
+
+
+def _file_path(header: str) -> str:
+    """Path of the file a diff section belongs to"""
+    old_path = None
+    for line in header.splitlines():
+        path = line[4:].strip()
+        if line.startswith('+++ ') and path != '/dev/null':
+            return path[2:] if path.startswith('b/') else path
+        if line.startswith('--- ') and path != '/dev/null':
+            old_path = path[2:] if path.startswith('a/') else path
+    if old_path:
+        # Deleted file
+        return old_path
+    match = re.match(r'diff --git a/(.+?) b/(.+)', header)
+    return match.group(2) if match else 'unknown'
+
+
+def _split_large_hunk(hunk: str, max_chars: int) -> List[str]:
+    """Cut one oversized hunk on line boundaries, repeating its @@ header"""
+    lines = hunk.splitlines(keepends=True)
+    header, body = lines[0], lines[1:]
+    pieces, current, size = [], [], len(header)
+    for line in body:
+        if current and size + len(line) > max_chars:
+            pieces.append(header + ''.join(current))
+            current, size = [], len(header)
+        current.append(line)
+        size += len(line)
+    if current or not pieces:
+        pieces.append(header + ''.join(current))
+    return pieces
+
+
+def split_diff(diff: str, max_chunk_chars: int = 4000) -> List[DiffChunk]:
+    """Split a unified diff into per-file chunks of whole hunks.
+    
+    Consecutive hunks of a file are grouped while they fit in
+    max_chunk_chars; a hunk bigger than that is split on line boundaries.
+    Anything before the first file section (a `git show` commit header) is
+    dropped since the commit message is already part of the prompt.
+    """
+    sections = re.split(r'^(?=diff --git )', diff, flags=re.MULTILINE)
+    chunks = []
+    
+    for section in sections:
+        if not section.startswith('diff --git '):
+            continue
+        
+        parts = re.split(r'^(?=@@ )', section, flags=re.MULTILINE)
+        header, hunks = parts[0], parts[1:]
+        file_path = _file_path(header)
+        
+        if not hunks:
+            # Renames, mode changes and binary files: nothing to summarize
+            chunks.append(DiffChunk(file_path, header, []))
+            continue
+        
+        budget = max(max_chunk_chars - len(header), 500)
+        group, size = [], 0
+        for hunk in hunks:
+            for piece in (_split_large_hunk(hunk, budget) if len(hunk) > budget else [hunk]):
+                if group and size + len(piece) > budget:
+                    chunks.append(DiffChunk(file_path, header, group))
+                    group, size = [], 0
+                group.append(piece)
+                size += len(piece)
+        if group:
+            chunks.append(DiffChunk(file_path, header, group))
+    
+    return chunks
+
+
+def file_blob_pairs(diff: str) -> List[Dict[str, Optional[str]]]:
+    """Per-file (path, old blob, new blob) entries of a diff made with --full-index"""
+    pairs = []
+    for section in re.split(r'^(?=diff --git )', diff, flags=re.MULTILINE):
+        if not section.startswith('diff --git '):
+            continue
+        header = re.split(r'^(?=@@ )', section, maxsplit=1, flags=re.MULTILINE)[0]
+        match = INDEX_LINE.search(header)
+        pairs.append({
+            'path': _file_path(header),
+            'old': match.group(1) if match else None,
+            'new': match.group(2) if match else None
+        })
+    return pairs
+
+
+def changeset_key(pairs: List[Dict[str, Optional[str]]]) -> Optional[str]:
+    """Content address of a whole change: the same file blobs give the same key
+    whether they come from a WIP diff, the commit, or an amended commit.
+    
+    Files without an index line (pure renames, mode changes) have no
+    content change and are keyed by path alone. None if there are no files.
+    """
+    if not pairs:
+        return None
+    lines = sorted(f"{pair['path']}:{pair['old'] or '-'}:{pair['new'] or '-'}" for pair in pairs)
+    return hashlib.sha256("\n".join(lines).encode()).hexdigest()
+
+
+class DiffMapReducer:
+    """Summarizes a large diff chunk by chunk, caching each chunk summary by content hash"""
+    
+    def __init__(self, llm, model: str, chunk_prompt: str, reduce_prompt: str,
+                 cache_manager=None, budget_manager=None, workers: int = 4,
+                 max_chunk_chars: int = 4000, max_digest_chars: int = MAX_DIRECT_DIFF_CHARS):
+        self.llm = llm
+        self.model = model
+        self.chunk_prompt = chunk_prompt
+        self.reduce_prompt = reduce_prompt
+        self.cache_manager = cache_manager
+        self.budget_manager = budget_manager
+        self.workers = max(1, workers)
+        self.max_chunk_chars = max_chunk_chars
+        self.max_digest_chars = max_digest_chars
+        
+        self.stats = {
+            'diffs': 0,
+            'chunks': 0,
+            'file_cache_hits': 0,
+            'chunk_cache_hits': 0,
+            'chunks_generated': 0,
+            'reduce_calls': 0
+        }
+    
+    def summarize(self, diff: str, commit_hash: Optional[str] = None) -> str:
+        """Return a digest of the diff no longer than max_digest_chars (best effort)"""
+        chunks = split_diff(diff, self.max_chunk_chars)
+        self.stats['diffs'] += 1
+        self.stats['chunks'] += len(chunks)
+        
+        files: Dict[str, List[DiffChunk]] = {}
+        for chunk in chunks:
+            files.setdefault(chunk.file_path, []).append(chunk)
+        
+        # Files whose blob pair was summarized before (in a WIP run, an earlier
+        # version of an amended commit, ...) are not sent to the LLM again
+        notes: Dict[str, Optional[str]] = {path: self._cached_file_notes(file_chunks)
+                                           for path, file_chunks in files.items()}
+        pending = [chunk for path, file_chunks in files.items() if notes[path] is None
+                   for chunk in file_chunks]
+        
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            # bind_context keeps the workers' token counts on the condense_diff span
+            summaries = list(executor.map(
+                bind_context(lambda chunk: self._summarize_chunk(chunk, commit_hash)), pending
+            ))
+        
+        generated: Dict[str, List[str]] = {}
+        for chunk, summary in zip(pending, summaries):
+            generated.setdefault(chunk.file_path, []).append(summary.strip())
+        for path, parts in generated.items():
+            notes[path] = "\n".join(parts)
+            self._store_file_notes(files[path], notes[path])
+        
+        # Reduce: per-file notes in diff order, condensed with the LLM if still too long
+        sections = [f"### {path}\n{file_notes}" for path, file_notes in notes.items()]
+        
+        digest = self._reduce(sections, commit_hash)
+        files = len(notes)
+        logger.info(f"Condensed {len(diff)}-char diff ({files} files, {len(chunks)} chunks) to {len(digest)} chars")
+        return (
+            f"[Large diff: {len(diff)} characters across {files} files, "
+            f"condensed from {len(chunks)} per-hunk summaries]\n\n{digest}"
+        )
+    
+    def _file_cache_key(self, file_chunks: List[DiffChunk]) -> Optional[str]:
+        """Cache key for a file's notes, addressed by its old and new blob SHAs"""
+        pair = file_chunks[0].blob_pair
+        return f"file_notes:{self.model}:{pair[0]}:{pair[1]}" if pair else None
+    
+    def _cached_file_notes(self, file_chunks: List[DiffChunk]) -> Optional[str]:
+        """Notes for a file whose exact before/after content was summarized before"""
+        key = self._file_cache_key(file_chunks)
+        if key is None or not self.cache_manager:
+            return None
+        cached = self.cache_manager.exact_cache.get(key)
+        if cached is not None:
+            self.stats['file_cache_hits'] += 1
+        return cached
+    
+    def _store_file_notes(self, file_chunks: List[DiffChunk], notes: str) -> None:
+        """Remember a file's notes under its blob pair"""
+        key = self._file_cache_key(file_chunks)
+        if key is not None and self.cache_manager:
+            self.cache_manager.exact_cache.set(key, notes, ttl=CHUNK_CACHE_TTL)
+    
+    def _summarize_chunk(self, chunk: DiffChunk, commit_hash: Optional[str]) -> str:
+        """Map step: summarize one chunk, reusing a cached summary of identical hunks"""
+        if not chunk.hunks:
+            # Header-only section; describe it without an LLM call
+            details = [line for line in chunk.header.splitlines()[1:] if not line.startswith('index ')]
+            return "- " + ("; ".join(details) if details else "File metadata changed")
+        
+        cache_key = f"diff_chunk:{self.model}:{chunk.content_hash}"
+        exact_cache = self.cache_manager.exact_cache if self.cache_manager else None
+        if exact_cache is not None:
+            cached = exact_cache.get(cache_key)
+            if cached is not None:
+                self.stats['chunk_cache_hits'] += 1
+                return cached
+        
+        prompt = self.chunk_prompt.format(file_path=chunk.file_path, chunk=chunk.text)
+        summary = self._invoke(prompt, commit_hash)
+        self.stats['chunks_generated'] += 1
+        
+        if exact_cache is not None:
+            exact_cache.set(cache_key, summary, ttl=CHUNK_CACHE_TTL)
+        return summary
+    
+    def _reduce(self, sections: List[str], commit_hash: Optional[str], max_rounds: int = 3) -> str:
+        """Condense per-file sections in batches until the digest fits"""
+        for _ in range(max_rounds):
+            digest = "\n\n".join(sections)
+            if len(digest) <= self.max_digest_chars:
+                return digest
+            
+            batches, current, size = [], [], 0
+            for section in sections:
+                if current and size + len(section) > self.max_chunk_chars:
+                    batches.append(current)
+                    current, size = [], 0
+                current.append(section)
+                size += len(section)
+            if current:
+                batches.append(current)
+            
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                sections = list(executor.map(
+                    bind_context(lambda batch: self._invoke(
+                        self.reduce_prompt.format(summaries="\n\n".join(batch)), commit_hash
+                    ).strip()),
+                    batches
+                ))
+            self.stats['reduce_calls'] += len(batches)
+        
+        digest = "\n\n".join(sections)
+        if len(digest) > self.max_digest_chars:
+            logger.warning(f"Diff digest still {len(digest)} chars after {max_rounds} reduce rounds, truncating")
+            digest = digest[:self.max_digest_chars]
+        return digest
+    
+    def _invoke(self, prompt: str, commit_hash: Optional[str]) -> str:
+        """One LLM call, recorded against the commit's budget"""
+        response = self.llm.invoke([HumanMessage(content=prompt)])
+        content = response.content
+        
+        if self.budget_manager:
+            tokens_used = len(prompt) // 4 + len(content) // 4
+            self.budget_manager.record_usage(tokens_used, self.model, commit_hash)
+        
+        return content
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Chunk counts and how many summaries came from the cache"""
+        return dict(self.stats)
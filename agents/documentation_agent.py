@@ -4,10 +4,11 @@ Documentation Generator Agent
 Analyzes code changes and generates appropriate documentation
 """
 
-import re
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from agents.base_agent import SpecializedAgent, AgentState
+from agents.parsed_diff import ParsedDiff
+from agents.rule_packs import get_rule_packs
 
 DOCUMENTATION_PROMPT = """You are a technical documentation expert analyzing code changes to generate helpful documentation.
 
@@ -64,22 +65,24 @@ class DocumentationAgent(SpecializedAgent):
         
     def analyze(self, state: AgentState) -> AgentState:
         """Analyze code and generate documentation suggestions"""
-        git_diff = state.get("git_diff", "")
+        parsed = self.get_parsed_diff(state)
         
         # Quick analysis of documentation coverage
-        doc_analysis = self._analyze_documentation_coverage(git_diff)
+        doc_analysis = self._analyze_documentation_coverage(parsed)
         
-        # If significant undocumented code or large diff, use LLM
-        if doc_analysis["undocumented_items"] > 2 or len(git_diff) > 500:
+        # Significant undocumented code goes to the LLM; otherwise the gate decides
+        decision = self.gate_llm(state, doc_analysis["undocumented_items"])
+        if decision.use_llm:
             # Call parent analyze method for LLM analysis
             state = super().analyze(state)
+            self.record_llm_verdict(state, decision)
             
             # Merge quick analysis with LLM results
             if "agent_documentation" in state and "analysis" in state["agent_documentation"]:
                 state["agent_documentation"]["quick_analysis"] = doc_analysis
         else:
             # Generate basic documentation suggestions
-            suggestions = self._generate_basic_suggestions(git_diff, doc_analysis)
+            suggestions = self._generate_basic_suggestions(parsed, doc_analysis)
             
             state = self.update_state(state, {
                 "analysis": suggestions,
@@ -90,58 +93,42 @@ class DocumentationAgent(SpecializedAgent):
             
         return state
     
-    def _analyze_documentation_coverage(self, diff: str) -> Dict[str, Any]:
+    def _analyze_documentation_coverage(self, parsed: ParsedDiff) -> Dict[str, Any]:
         """Quick analysis of documentation coverage in diff"""
-        lines = diff.split('\n')
-        
-        # Patterns for various code elements
-        function_pattern = r'^\+\s*def\s+(\w+)\s*\('
-        class_pattern = r'^\+\s*class\s+(\w+)'
-        docstring_pattern = r'^\+\s*"""'
-        comment_pattern = r'^\+\s*#'
+        lines = parsed.lines
+        # Definition, docstring and comment rules per language (rules/documentation.yaml)
+        pack = get_rule_packs().get("documentation")
         
         functions = []
         classes = []
         docstrings = 0
         comments = 0
         
-        i = 0
-        while i < len(lines):
-            line = lines[i]
-            
-            # Check for functions
-            func_match = re.match(function_pattern, line)
-            if func_match:
-                func_name = func_match.group(1)
-                # Check if next line has docstring
-                has_docstring = (i + 1 < len(lines) and 
-                               ('"""' in lines[i + 1] or "'''" in lines[i + 1]))
-                functions.append({
-                    "name": func_name,
-                    "line": i + 1,
-                    "has_docstring": has_docstring
-                })
-            
-            # Check for classes
-            class_match = re.match(class_pattern, line)
-            if class_match:
-                class_name = class_match.group(1)
-                # Check if next line has docstring
-                has_docstring = (i + 1 < len(lines) and 
-                               ('"""' in lines[i + 1] or "'''" in lines[i + 1]))
-                classes.append({
-                    "name": class_name,
-                    "line": i + 1,
-                    "has_docstring": has_docstring
-                })
+        for diff_file in parsed.files:
+            rules = pack.rules_for(diff_file)
+            if not rules:
+                continue
             
-            # Count docstrings and comments
-            if re.match(docstring_pattern, line):
-                docstrings += 1
-            if re.match(comment_pattern, line):
-                comments += 1
+            # Every rule needs a leading '+', so only added lines are scanned
+            for line_number, _ in diff_file.added:
+                line = lines[line_number - 1]
                 
-            i += 1
+                for rule in rules:
+                    match = rule.regex.match(line)
+                    if not match:
+                        continue
+                    
+                    if rule.category in ("function", "class"):
+                        item = {
+                            "name": match.group(1),
+                            "line": line_number,
+                            "has_docstring": self._is_documented(rule, lines, line_number)
+                        }
+                        (functions if rule.category == "function" else classes).append(item)
+                    elif rule.category == "docstring":
+                        docstrings += 1
+                    elif rule.category == "comment":
+                        comments += 1
         
         undocumented_functions = [f for f in functions if not f["has_docstring"]]
         undocumented_classes = [c for c in classes if not c["has_docstring"]]
@@ -157,7 +144,18 @@ class DocumentationAgent(SpecializedAgent):
             "documentation_ratio": (docstrings + comments) / max(len(functions) + len(classes), 1)
         }
     
-    def _generate_basic_suggestions(self, diff: str, doc_analysis: Dict[str, Any]) -> Dict[str, Any]:
+    @staticmethod
+    def _is_documented(rule, lines: List[str], line_number: int) -> bool:
+        """Whether the diff line before/after a definition matches the rule's doc pattern"""
+        if rule.doc_regex is None:
+            return False
+        # lines is 0-based, line_number 1-based: the next line is lines[line_number]
+        index = line_number if rule.doc_position == "next" else line_number - 2
+        if index < 0 or index >= len(lines):
+            return False
+        return bool(rule.doc_regex.search(lines[index]))
+    
+    def _generate_basic_suggestions(self, parsed: ParsedDiff, doc_analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Generate basic documentation suggestions without LLM"""
         missing_docs = []
         
@@ -196,17 +194,17 @@ class DocumentationAgent(SpecializedAgent):
             "documentation_score": int(doc_score),
             "missing_docs": missing_docs,
             "suggested_readme_updates": [],
-            "changelog_entry": self._generate_changelog_entry(diff),
+            "changelog_entry": self._generate_changelog_entry(parsed),
             "inline_comments_needed": [],
             "existing_docs_quality": doc_quality,
             "summary": f"Found {doc_analysis['undocumented_items']} undocumented items. Documentation coverage: {doc_score:.0f}%"
         }
     
-    def _generate_changelog_entry(self, diff: str) -> str:
+    def _generate_changelog_entry(self, parsed: ParsedDiff) -> str:
         """Generate a simple changelog entry based on diff"""
         # Count additions and deletions
-        additions = sum(1 for line in diff.split('\n') if line.startswith('+') and not line.startswith('+++'))
-        deletions = sum(1 for line in diff.split('\n') if line.startswith('-') and not line.startswith('---'))
+        additions = parsed.added_count
+        deletions = parsed.removed_count
         
         if additions > deletions:
             return f"Added new functionality ({additions} lines added)"
@@ -215,6 +213,12 @@ class DocumentationAgent(SpecializedAgent):
         else:
             return f"Updated existing code ({additions} lines modified)"
     
+    def llm_verdict_clean(self, analysis: Dict[str, Any]) -> Optional[bool]:
+        score = analysis.get("documentation_score")
+        if not isinstance(score, (int, float)):
+            return None
+        return score >= 70
+    
     def process_response(self, response: str) -> Dict[str, Any]:
         """Process and validate documentation analysis response"""
         try:
@@ -15,7 +15,8 @@ import logging
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from dotenv import load_dotenv
-import git
+
+from agents.repository import get_repository
 
 # Load environment variables
 load_dotenv()
@@ -37,8 +38,7 @@ logger = logging.getLogger(__name__)
 def get_latest_commit_hash():
     """Get the hash of the latest commit"""
     try:
-        repo = git.Repo(Path(__file__).parent.parent)
-        return str(repo.head.commit.hexsha)
+        return get_repository(Path(__file__).parent.parent).head_sha()
     except Exception as e:
         logger.error(f"Failed to get latest commit: {e}")
         return None
@@ -101,6 +101,71 @@ def should_skip_commit(repo, commit_hash):
         return False
 
 
+def _on_summary_success(commit_hash):
+    """Record a finished summary and notify the Electron app"""
+    logger.info("Summary generation completed successfully")
+    mark_commit_processed(commit_hash)
+    
+    # Check if this was in the retry queue, remove it
+    try:
+        from agents.retry_manager import RetryManager
+        retry_manager = RetryManager()
+        retry_manager.remove_from_queue(commit_hash)
+    except:
+        pass  # Retry manager is optional
+    
+    # Send notification to Electron app if running
+    try:
+        notification_script = Path(__file__).parent.parent / "ui" / "notify.js"
+        if notification_script.exists():
+            subprocess.run(["node", str(notification_script), "complete"], capture_output=True)
+    except:
+        pass  # Notification is optional
+
+
+def _on_summary_failure(commit_hash, error):
+    """Queue a failed commit for retry"""
+    logger.error(f"Summary generation failed: {error}")
+    # Add to retry queue
+    try:
+        from agents.retry_manager import RetryManager
+        retry_manager = RetryManager()
+        retry_manager.add_to_queue(commit_hash, error or "Unknown error")
+        logger.info(f"Added commit {commit_hash[:8]} to retry queue")
+    except Exception as e:
+        logger.error(f"Failed to add to retry queue: {e}")
+
+
+def _run_via_daemon(commit_hash):
+    """Hand the commit to a running summarizer daemon.
+    
+    Returns the daemon's final job status, or None if the daemon is not
+    enabled or not available (after optionally starting one so the next
+    commit finds it warm). Opt-in: a resident daemon keeps the settings it
+    started with, so changes to .env only apply after it restarts.
+    """
+    if os.getenv('SUMMARIZER_DAEMON_ENABLED', 'false').lower() != 'true':
+        return None
+    
+    try:
+        from agents.summarizer_daemon import submit_job, start_daemon_process
+    except Exception as e:
+        logger.warning(f"Summarizer daemon unavailable: {e}")
+        return None
+    
+    timeout = float(os.getenv('SUMMARIZER_DAEMON_JOB_TIMEOUT', '600'))
+    result = submit_job('commit', timeout=timeout, commit_hash=commit_hash)
+    
+    if result is None and os.getenv('SUMMARIZER_DAEMON_AUTOSTART', 'false').lower() == 'true':
+        try:
+            if start_daemon_process():
+                logger.info("Started summarizer daemon for subsequent commits")
+        except Exception as e:
+            logger.warning(f"Failed to start summarizer daemon: {e}")
+    
+    return result
+
+
 def trigger_summary_generation(commit_hash):
     """Trigger the LangGraph agent to generate summaries"""
     try:
@@ -109,6 +174,21 @@ def trigger_summary_generation(commit_hash):
             logger.info("Git hook is disabled via GIT_HOOK_ENABLED env var")
             return
         
+        logger.info(f"Triggering summary generation for commit {commit_hash[:8]}")
+        
+        # Prefer the warm daemon; it reports the job's final status back to us
+        daemon_result = _run_via_daemon(commit_hash)
+        if daemon_result is not None:
+            if daemon_result.get('status') == 'done':
+                logger.info(
+                    f"Daemon job finished in {daemon_result.get('elapsed_seconds', 0)}s "
+                    f"(cache hit: {daemon_result.get('cache_hit', False)})"
+                )
+                _on_summary_success(commit_hash)
+            else:
+                _on_summary_failure(commit_hash, daemon_result.get('error'))
+            return
+        
         # Get the Python executable (prefer venv)
         venv_python = Path(__file__).parent.parent / "venv" / "bin" / "python"
         python_cmd = str(venv_python) if venv_python.exists() else "python3"
@@ -116,8 +196,6 @@ def trigger_summary_generation(commit_hash):
         # Path to the LangGraph agent
         agent_path = Path(__file__).parent / "langgraph_agent.py"
         
-        logger.info(f"Triggering summary generation for commit {commit_hash[:8]}")
-        
         # Run the agent
         result = subprocess.run(
             [python_cmd, str(agent_path), commit_hash],
@@ -126,34 +204,9 @@ def trigger_summary_generation(commit_hash):
         )
         
         if result.returncode == 0:
-            logger.info("Summary generation completed successfully")
-            mark_commit_processed(commit_hash)
-            
-            # Check if this was in the retry queue, remove it
-            try:
-                from agents.retry_manager import RetryManager
-                retry_manager = RetryManager()
-                retry_manager.remove_from_queue(commit_hash)
-            except:
-                pass  # Retry manager is optional
-            
-            # Send notification to Electron app if running
-            try:
-                notification_script = Path(__file__).parent.parent / "ui" / "notify.js"
-                if notification_script.exists():
-                    subprocess.run(["node", str(notification_script), "complete"], capture_output=True)
-            except:
-                pass  # Notification is optional
+            _on_summary_success(commit_hash)
         else:
-            logger.error(f"Summary generation failed: {result.stderr}")
-            # Add to retry queue
-            try:
-                from agents.retry_manager import RetryManager
-                retry_manager = RetryManager()
-                retry_manager.add_to_queue(commit_hash, result.stderr or "Unknown error")
-                logger.info(f"Added commit {commit_hash[:8]} to retry queue")
-            except Exception as e:
-                logger.error(f"Failed to add to retry queue: {e}")
+            _on_summary_failure(commit_hash, result.stderr)
             
     except Exception as e:
         logger.error(f"Failed to trigger summary generation: {e}")
@@ -176,7 +229,7 @@ def main():
             return
         
         # Check if we should skip this commit
-        repo = git.Repo(Path(__file__).parent.parent)
+        repo = get_repository(Path(__file__).parent.parent).repo
         if should_skip_commit(repo, commit_hash):
             mark_commit_processed(commit_hash)  # Mark as processed so we don't check again
             return
@@ -7,10 +7,12 @@ Generates context.md and brainlift.md from Git commits
 import os
 import sys
 import json
+import time
 import logging
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Dict, Any, List, Optional
 from pathlib import Path
 
 # Add parent directory to Python path for imports
@@ -20,12 +22,15 @@ from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage
 from langchain_openai import ChatOpenAI
 from langgraph.graph import StateGraph, END
-import git
 
 # Import cache and budget managers
-from cache import CacheManager
-from budget_manager import BudgetManager
-from agent_orchestrator import AgentOrchestrator
+from agents.cache import CacheManager
+from agents.budget_manager import BudgetManager
+from agents.agent_orchestrator import AgentOrchestrator
+from agents.progress import ProgressReporter
+from agents.repository import get_repository
+from agents.diff_map_reduce import DiffMapReducer, MAX_DIRECT_DIFF_CHARS, file_blob_pairs, changeset_key
+from agents.tracing import Span, get_tracer, current_span, annotate, record_cache, bind_context
 
 # Load environment variables
 load_dotenv()
@@ -43,6 +48,20 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Agent results addressed by file blob SHAs stay valid as long as the content does
+CHANGESET_CACHE_TTL = 7 * 86400
+
+
+def _merge_state(current: Dict[str, Any], update: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge node updates into the workflow state so parallel branches can both write"""
+    merged = dict(current or {})
+    merged.update(update or {})
+    return merged
+
+
+# Workflow state is a plain dict; the reducer lets the summary nodes run in one step
+WorkflowState = Annotated[dict, _merge_state]
+
 
 class GitCommitSummarizer:
     """Main agent for processing Git commits and generating summaries"""
@@ -78,13 +97,28 @@ class GitCommitSummarizer:
         self.output_dir.mkdir(exist_ok=True)
         self.context_dir.mkdir(exist_ok=True)
         
+        # Streaming writes summaries to their files as tokens arrive and
+        # reports progress to the UI as JSON lines on stdout
+        self.streaming = os.getenv('SUMMARY_STREAMING', 'false').lower() == 'true'
+        self.progress = ProgressReporter.from_env()
+        
+        # Per-node spans; each running workflow maps its trace_id to the
+        # workflow span and the time its last node finished
+        self.tracer = get_tracer()
+        self._traces: Dict[str, Dict[str, Any]] = {}
+        
         # Load prompt templates
         self.context_prompt = self._load_prompt("context.txt")
         self.brainlift_prompt = self._load_prompt("brainlift.txt")
+        self.agent_insights_prompt = self._load_prompt("agent_insights.txt")
         
         # Initialize cache and budget managers
         self._init_cache_and_budget()
         
+        # Large diffs are summarized per hunk before the summary prompts see them
+        self.diff_map_reducer = None
+        self._init_diff_map_reducer()
+        
         # Initialize agent orchestrator for multi-agent analysis
         self.agent_orchestrator = None
         self._init_agent_orchestrator()
@@ -125,6 +159,29 @@ class GitCommitSummarizer:
             self.cache_manager = None
             self.budget_manager = None
     
+    def _init_diff_map_reducer(self):
+        """Initialize chunked summarization for diffs over MAX_DIRECT_DIFF_CHARS"""
+        if os.getenv('DIFF_MAP_REDUCE_ENABLED', 'true').lower() != 'true':
+            logger.info("Diff map-reduce disabled; large diffs will be truncated")
+            return
+        
+        try:
+            chunk_model = os.getenv('DIFF_CHUNK_MODEL', self.model)
+            self.diff_map_reducer = DiffMapReducer(
+                # Deterministic chunk summaries make the per-hunk cache meaningful
+                ChatOpenAI(model=chunk_model, temperature=0),
+                chunk_model,
+                self._load_prompt("diff_chunk.txt"),
+                self._load_prompt("diff_reduce.txt"),
+                cache_manager=self.cache_manager,
+                budget_manager=self.budget_manager,
+                workers=int(os.getenv('DIFF_CHUNK_WORKERS', '4'))
+            )
+            logger.info(f"Initialized diff map-reduce with model {chunk_model}")
+        except Exception as e:
+            logger.error(f"Failed to initialize diff map-reduce: {e}")
+            self.diff_map_reducer = None
+    
     def _init_agent_orchestrator(self):
         """Initialize the agent orchestrator for multi-agent analysis"""
         try:
@@ -139,6 +196,10 @@ class GitCommitSummarizer:
                 'budgetEnabled': os.getenv('BUDGET_ENABLED', 'false').lower() == 'true',
                 'commitTokenLimit': int(os.getenv('COMMIT_TOKEN_LIMIT', '10000')),
                 'execution_mode': os.getenv('AGENT_EXECUTION_MODE', 'parallel'),
+                # Pipelined mode: seconds after the diff is parsed before late agents are dropped
+                'agent_deadline': float(os.getenv('AGENT_DEADLINE_SECONDS', '10')),
+                # Then how long all late agents get, together, before the error log is written without them
+                'late_agent_grace': float(os.getenv('LATE_AGENT_GRACE_SECONDS', '30')),
                 'agents': {
                     'cursor_chat': {
                         'enabled': os.getenv('CURSOR_CHAT_AGENT_ENABLED', 'true').lower() == 'true',
@@ -181,22 +242,44 @@ class GitCommitSummarizer:
     
     def _build_graph(self) -> StateGraph:
         """Build the LangGraph workflow"""
-        workflow = StateGraph(dict)
+        workflow = StateGraph(WorkflowState)
         
         # Define nodes
-        workflow.add_node("parse_git_diff", self.parse_git_diff)
-        workflow.add_node("check_cache_and_budget", self.check_cache_and_budget)
-        workflow.add_node("run_multi_agents", self.run_multi_agents)
-        workflow.add_node("summarize_context", self.summarize_context)
-        workflow.add_node("summarize_brainlift", self.summarize_brainlift)
-        workflow.add_node("write_output", self.write_output)
-        
-        # Define edges (linear flow with cache check, chat reading, and multi-agent analysis)
+        workflow.add_node("parse_git_diff", self._traced("parse_git_diff", self.parse_git_diff))
+        workflow.add_node("check_cache_and_budget", self._traced("check_cache_and_budget", self.check_cache_and_budget))
+        workflow.add_node("condense_diff", self._traced("condense_diff", self.condense_diff))
+        workflow.add_node("summarize_context", self._traced("summarize_context", self.summarize_context))
+        workflow.add_node("summarize_brainlift", self._traced("summarize_brainlift", self.summarize_brainlift))
+        workflow.add_node("write_output", self._traced("write_output", self.write_output))
+        
+        if self._is_pipelined():
+            # Agents run in the background while both summaries are generated;
+            # their insights are merged afterwards in a short follow-up call
+            workflow.add_node("start_multi_agents", self._traced("start_multi_agents", self.start_multi_agents))
+            workflow.add_node("merge_agent_insights", self._traced("merge_agent_insights", self.merge_agent_insights))
+            
+            workflow.add_edge("parse_git_diff", "check_cache_and_budget")
+            workflow.add_edge("check_cache_and_budget", "condense_diff")
+            workflow.add_edge("condense_diff", "start_multi_agents")
+            workflow.add_edge("start_multi_agents", "summarize_context")
+            workflow.add_edge("start_multi_agents", "summarize_brainlift")
+            workflow.add_edge(["summarize_context", "summarize_brainlift"], "merge_agent_insights")
+            workflow.add_edge("merge_agent_insights", "write_output")
+            workflow.add_edge("write_output", END)
+            workflow.set_entry_point("parse_git_diff")
+            return workflow.compile()
+        
+        workflow.add_node("run_multi_agents", self._traced("run_multi_agents", self.run_multi_agents))
+        
+        # Define edges (linear flow with cache check, chat reading, and multi-agent analysis).
+        # The two summaries only depend on the diff and agent results, so they
+        # fan out in parallel and join before the output is written.
         workflow.add_edge("parse_git_diff", "check_cache_and_budget")
-        workflow.add_edge("check_cache_and_budget", "run_multi_agents")
+        workflow.add_edge("check_cache_and_budget", "condense_diff")
+        workflow.add_edge("condense_diff", "run_multi_agents")
         workflow.add_edge("run_multi_agents", "summarize_context")
-        workflow.add_edge("summarize_context", "summarize_brainlift")
-        workflow.add_edge("summarize_brainlift", "write_output")
+        workflow.add_edge("run_multi_agents", "summarize_brainlift")
+        workflow.add_edge(["summarize_context", "summarize_brainlift"], "write_output")
         workflow.add_edge("write_output", END)
         
         # Set entry point
@@ -204,12 +287,52 @@ class GitCommitSummarizer:
         
         return workflow.compile()
     
+    def _is_pipelined(self) -> bool:
+        """Whether agents should overlap with summary generation"""
+        return (self.agent_orchestrator is not None
+                and self.agent_orchestrator.settings.get('execution_mode') == 'pipelined')
+    
+    def _traced(self, name: str, node):
+        """Wrap a graph node in a span parented to its workflow's span
+        
+        queue_wait_ms is the time since the previous node of the same run
+        finished, i.e. how long the node waited on LangGraph's scheduler
+        and on the other branch of a fan-out.
+        """
+        def run(state: Dict[str, Any]) -> Dict[str, Any]:
+            trace = self._traces.get(state.get('trace_id'))
+            parent = trace['span'] if trace else None
+            queue_wait_ms = round((time.perf_counter() - trace['ready']) * 1000, 3) if trace else None
+            
+            with self.tracer.span(name, kind='node', parent=parent, queue_wait_ms=queue_wait_ms) as span:
+                result = node(state)
+                if span.cache is None and state.get('cache_hit'):
+                    # The node skipped its work because the whole result was cached
+                    span.set_cache('hit')
+            
+            if trace:
+                trace['ready'] = max(trace['ready'], time.perf_counter())
+            return result
+        return run
+    
+    def _invoke_graph(self, initial_state: Dict[str, Any]) -> Dict[str, Any]:
+        """Run the graph with node spans recorded under the current workflow span"""
+        span = current_span()
+        if span is None:
+            return self.graph.invoke(initial_state)
+        
+        self._traces[span.trace_id] = {'span': span, 'ready': time.perf_counter()}
+        try:
+            return self.graph.invoke({**initial_state, 'trace_id': span.trace_id})
+        finally:
+            self._traces.pop(span.trace_id, None)
+    
     def parse_git_diff(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Parse Git commit information and diff, or WIP changes"""
         logger.info("Parsing Git diff...")
         
         try:
-            repo = git.Repo(self.base_dir)
+            repository = get_repository(self.base_dir)
             
             # Check if this is WIP analysis
             if state.get("wip_mode"):
@@ -219,13 +342,13 @@ class GitCommitSummarizer:
                 # Get WIP diff based on mode
                 if wip_mode == "all":
                     # All changes (staged + unstaged)
-                    diff = repo.git.diff('HEAD')
-                    staged_diff = repo.git.diff('--cached')
+                    diff = repository.wip_diff('HEAD', '--full-index')
+                    staged_diff = repository.wip_diff('--cached', '--full-index')
                     combined_diff = f"{staged_diff}\n{diff}" if staged_diff or diff else "no-changes"
                     mode_description = "All working directory changes"
                 elif wip_mode == "staged":
                     # Only staged changes
-                    diff = repo.git.diff('--cached')
+                    diff = repository.wip_diff('--cached', '--full-index')
                     combined_diff = diff if diff else "no-changes"
                     mode_description = "Staged changes only"
                 else:
@@ -250,30 +373,19 @@ class GitCommitSummarizer:
                     "commit_message": f"Work in Progress - {mode_description}",
                     "commit_author": f"Current User",
                     "commit_date": f"Analysis Date: {timestamp.strftime('%Y-%m-%d %H:%M:%S')}",
-                    "git_diff": diff[:5000]  # Limit diff size
+                    "git_diff": diff  # Large diffs are condensed in condense_diff
                 }
                 
                 state.update(wip_info)
                 logger.info(f"Parsed WIP changes: {wip_mode} mode with hash {commit_hash}")
                 
             else:
-                # Original commit-based parsing
-                if "commit_hash" in state:
-                    commit_hash = state["commit_hash"]
-                else:
-                    # Get latest commit from current repo
-                    commit = repo.head.commit
-                    commit_hash = str(commit.hexsha)
+                # Original commit-based parsing (latest commit if none given)
+                commit = repository.commit(state.get("commit_hash"))
                 
-                # Get commit details
-                commit = repo.commit(commit_hash)
-                
-                # Get diff
-                if commit.parents:
-                    diff = repo.git.diff(commit.parents[0].hexsha, commit.hexsha)
-                else:
-                    # First commit
-                    diff = repo.git.show(commit.hexsha)
+                # Diff against the first parent (or the empty tree for the
+                # first commit) through the shared Repo
+                diff = repository.commit_diff(commit)
                 
                 # Extract commit info
                 commit_info = {
@@ -282,12 +394,23 @@ class GitCommitSummarizer:
                     "commit_message": f"Message: {commit.message.strip()}",
                     "commit_author": f"Author: {commit.author.name} <{commit.author.email}>",
                     "commit_date": f"Date: {datetime.fromtimestamp(commit.committed_date).strftime('%Y-%m-%d %H:%M:%S')}",
-                    "git_diff": diff[:5000]  # Limit diff size
+                    "git_diff": diff  # Large diffs are condensed in condense_diff
                 }
                 
                 state.update(commit_info)
                 logger.info(f"Parsed commit: {commit.hexsha[:8]}")
             
+            # --full-index gives each file's blob SHAs; the same change has the
+            # same changeset key in a WIP run, the commit and an amended commit
+            file_blobs = file_blob_pairs(state.get("git_diff", ""))
+            state["file_blobs"] = file_blobs
+            state["changeset_key"] = changeset_key(file_blobs)
+            
+            # Fix the output file names now so streamed summaries and the
+            # final write in write_output land in the same files
+            state.setdefault("output_stem", self._output_stem(state))
+            self.progress.emit('diff_parsed', commit=state["commit_hash"], diff_chars=len(state.get("git_diff", "")))
+            
         except Exception as e:
             logger.error(f"Error parsing Git diff: {e}")
             raise
@@ -296,6 +419,53 @@ class GitCommitSummarizer:
     
 
     
+    def condense_diff(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Map-reduce a diff too large for the prompts into a per-file digest"""
+        git_diff = state.get("git_diff", "")
+        if state.get('cache_hit', False) or len(git_diff) <= MAX_DIRECT_DIFF_CHARS:
+            return {}
+        
+        if not self.diff_map_reducer:
+            logger.warning(f"Diff is {len(git_diff)} chars and map-reduce is off; prompts will see a truncated diff")
+            return {}
+        
+        try:
+            digest = self.diff_map_reducer.summarize(git_diff, state.get("commit_hash"))
+            annotate(diff_chars=len(git_diff), digest_chars=len(digest))
+            return {"diff_digest": digest}
+        except Exception as e:
+            # Fall back to the truncated diff rather than failing the commit
+            logger.error(f"Error condensing diff: {e}")
+            return {}
+    
+    def _cached_agent_results(self, state: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Agent results from an earlier run over exactly the same file blobs"""
+        key = state.get("changeset_key")
+        if not self.cache_manager or not key:
+            return None
+        
+        cached = self.cache_manager.exact_cache.get(f"changeset_agents:{key}")
+        record_cache('miss' if cached is None else 'hit')
+        if cached is not None:
+            logger.info(f"Reusing agent results for identical changeset {key[:12]}")
+        return cached
+    
+    def _store_agent_results(self, state: Dict[str, Any], agent_results: Dict[str, Any]) -> None:
+        """Cache agent results under the changeset's blob-based key"""
+        key = state.get("changeset_key")
+        if not self.cache_manager or not key or not agent_results.get("agents"):
+            return
+        
+        self.cache_manager.exact_cache.set(
+            f"changeset_agents:{key}",
+            agent_results,
+            ttl=CHANGESET_CACHE_TTL
+        )
+    
+    def _prompt_diff(self, state: Dict[str, Any]) -> str:
+        """Diff text for the summary prompts: the digest of a large diff, else the diff itself"""
+        return state.get("diff_digest") or state.get("git_diff", "")[:MAX_DIRECT_DIFF_CHARS]
+    
     def run_multi_agents(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Run multi-agent analysis if enabled"""
         logger.info("Running multi-agent analysis...")
@@ -310,6 +480,13 @@ class GitCommitSummarizer:
             logger.info("Using cached results, skipping multi-agent analysis")
             return state
         
+        cached_results = self._cached_agent_results(state)
+        if cached_results is not None:
+            state["multi_agent_results"] = cached_results
+            if cached_results.get("summary"):
+                state["agent_insights"] = cached_results["summary"]
+            return state
+        
         try:
             # Get commit info
             commit_info = {
@@ -322,11 +499,13 @@ class GitCommitSummarizer:
             # Run multi-agent analysis
             agent_results = self.agent_orchestrator.analyze_commit(
                 state.get("git_diff", ""),
-                commit_info
+                commit_info,
+                diff_digest=state.get("diff_digest")
             )
             
             # Store results in state
             state["multi_agent_results"] = agent_results
+            self._store_agent_results(state, agent_results)
             
             # Add agent insights to the context for summary generation
             if agent_results.get("summary"):
@@ -340,6 +519,121 @@ class GitCommitSummarizer:
             
         return state
     
+    def start_multi_agents(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Submit the agents without waiting for them (pipelined mode)"""
+        if state.get('cache_hit', False):
+            logger.info("Using cached results, skipping multi-agent analysis")
+            return {}
+        
+        cached_results = self._cached_agent_results(state)
+        if cached_results is not None:
+            return {"cached_agent_results": cached_results}
+        
+        try:
+            commit_info = {
+                "commit_hash": state.get("commit_hash", ""),
+                "commit_message": state.get("commit_message", ""),
+                "commit_author": state.get("commit_author", ""),
+                "commit_date": state.get("commit_date", "")
+            }
+            pending = self.agent_orchestrator.start_analysis(
+                state.get("git_diff", ""), commit_info, diff_digest=state.get("diff_digest")
+            )
+            logger.info("Started multi-agent analysis in the background")
+            return {"pending_agents": pending}
+        except Exception as e:
+            logger.error(f"Error starting multi-agent analysis: {e}")
+            return {"multi_agent_error": str(e)}
+    
+    def merge_agent_insights(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Collect agents that met the deadline and fold their findings into both summaries"""
+        pending = state.get("pending_agents")
+        if state.get("cached_agent_results") is not None:
+            agent_results = state["cached_agent_results"]
+        elif pending is None:
+            return {}
+        else:
+            deadline = self.agent_orchestrator.settings.get('agent_deadline')
+            try:
+                agent_results = self.agent_orchestrator.collect_analysis(pending, deadline)
+            except Exception as e:
+                logger.error(f"Error in multi-agent analysis: {e}")
+                return {"multi_agent_error": str(e)}
+            
+            if pending.late:
+                logger.info(f"Agents past the {deadline}s deadline, left for the error log: {', '.join(pending.late)}")
+            else:
+                # Results missing late agents are not worth reusing
+                self._store_agent_results(state, agent_results)
+        
+        update = {"multi_agent_results": agent_results}
+        if agent_results.get("summary"):
+            update["agent_insights"] = agent_results["summary"]
+        
+        has_findings = any(
+            "error" not in agent_data and "analysis" in agent_data
+            for agent_data in agent_results.get("agents", {}).values()
+        )
+        if not has_findings:
+            return update
+        
+        agent_analysis = self._format_agent_analysis(agent_results)
+        agent_insights = self._format_agent_insights(agent_results)
+        
+        # Both follow-up calls are short and independent, so run them together
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            context_future = executor.submit(
+                bind_context(self._generate_insights_section), state, "context log",
+                state.get("context_summary", ""), agent_analysis
+            )
+            brainlift_future = executor.submit(
+                bind_context(self._generate_insights_section), state, "brainlift (learning journal)",
+                state.get("brainlift_summary", ""), agent_insights
+            )
+            context_section = context_future.result()
+            brainlift_section = brainlift_future.result()
+        
+        if context_section:
+            update["context_summary"] = f"{state.get('context_summary', '')}\n\n{context_section}"
+        if brainlift_section:
+            update["brainlift_summary"] = f"{state.get('brainlift_summary', '')}\n\n{brainlift_section}"
+        
+        logger.info(f"Multi-agent analysis complete: {agent_results.get('summary', 'No summary')}")
+        return update
+    
+    def _generate_insights_section(self, state: Dict[str, Any], document_type: str,
+                                   summary: str, agent_findings: str) -> str:
+        """Ask the LLM for a short section merging agent findings into a finished summary"""
+        # A bare section header means no agent produced anything worth adding
+        if agent_findings.strip().endswith(':'):
+            return ""
+        
+        try:
+            prompt = self.agent_insights_prompt.format(
+                document_type=document_type,
+                commit_hash=state.get("commit_hash_display", ""),
+                commit_message=state.get("commit_message", ""),
+                summary=summary,
+                agent_findings=agent_findings
+            )
+            response = self.llm.invoke([HumanMessage(content=prompt)])
+            section = response.content
+            
+            if self.budget_manager:
+                tokens_used = len(prompt) // 4 + len(section) // 4
+                self.budget_manager.record_usage(
+                    tokens_used,
+                    self.model,
+                    state.get("commit_hash", None)
+                )
+                logger.info(f"Recorded {tokens_used} tokens for {document_type} agent insights")
+            
+            return section
+        except Exception as e:
+            # The summary is still useful without the insights section
+            logger.error(f"Error merging agent insights into {document_type}: {e}")
+            return ""
+    
     def check_cache_and_budget(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Check cache for existing results and validate budget"""
         logger.info("Checking cache and budget...")
@@ -350,10 +644,8 @@ class GitCommitSummarizer:
             return state
         
         try:
-            # Create cache key from commit hash for more stable caching
+            # Commits and WIP diffs share one cache-aside entry keyed by commit_hash
             commit_hash = state.get('commit_hash', 'unknown')
-            cache_key = f"commit_with_agents:{commit_hash}"
-            logger.info(f"Checking cache with key: {cache_key} (commit: {commit_hash})")
             
             # Estimate tokens for budget check
             estimated_tokens = self.budget_manager.estimate_tokens(state.get("git_diff", ""))
@@ -371,11 +663,20 @@ class GitCommitSummarizer:
                 # Continue with warning
             
             # Only check cache, don't generate summaries here
-            # The summaries will be generated after multi-agent analysis
-            cached_result = self.cache_manager.exact_cache.get(cache_key)
+            # The summaries will be generated after multi-agent analysis.
+            # process_commit already looked the commit up before invoking the
+            # graph, so a second read could only miss again
+            if state.get('cache_checked'):
+                cached_result = None
+                record_cache('miss')
+            else:
+                logger.info(f"Checking cache for {commit_hash}")
+                cached_result = self.cache_manager.result_cache.get(commit_hash)
+                record_cache('miss' if cached_result is None else 'hit')
             
             if cached_result is not None:
                 logger.info(f"Cache hit for commit with agents")
+                self.progress.emit('cache_hit', commit=commit_hash)
                 state['cache_hit'] = True
                 # Restore all cached data including agent results
                 state['context_summary'] = cached_result.get('context_summary', '')
@@ -384,9 +685,10 @@ class GitCommitSummarizer:
             else:
                 logger.info("Cache miss - will generate new summaries with agent analysis")
                 state['cache_hit'] = False
-                state['cache_key'] = cache_key  # Store for later caching
+                state['cache_subject'] = commit_hash  # Written once in write_output
                 
-            # Log cache stats
+            # Log cache stats (stats.json is flushed in the background)
+            self.cache_manager.stats_aggregator.mark_dirty()
             stats = self.cache_manager.get_cache_stats()
             logger.info(f"Cache stats: {stats['overall']}")
                 
@@ -397,58 +699,17 @@ class GitCommitSummarizer:
         return state
     
     def summarize_context(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate context.md summary"""
+        """Generate context.md summary (runs alongside summarize_brainlift)"""
         # Check if we already have a cached result in state
         if state.get('context_summary'):
             logger.info("Using cached context summary")
-            return state
+            return {}
             
         logger.info("Generating context summary...")
         
         try:
             # Build agent analysis section if available
-            agent_analysis = ""
-            if state.get("multi_agent_results"):
-                results = state["multi_agent_results"]
-                agent_analysis = "\n\n## Multi-Agent Analysis Results:\n"
-                
-                # Add overall summary
-                if results.get("summary"):
-                    agent_analysis += f"\n**Overall Assessment:** {results['summary']}\n"
-                
-                # Add individual agent results
-                if results.get("agents"):
-                    for agent_name, agent_data in results["agents"].items():
-                        if "error" not in agent_data and "analysis" in agent_data:
-                            analysis = agent_data["analysis"]
-                            agent_analysis += f"\n### {agent_name.title().replace('_', ' ')} Analysis:\n"
-                            
-                            if agent_name == "cursor_chat":
-                                agent_analysis += f"- Context Score: {analysis.get('context_score', 'N/A')}/100\n"
-                                if analysis.get('key_decisions'):
-                                    agent_analysis += f"- Found {len(analysis['key_decisions'])} key decisions\n"
-                                if analysis.get('problems_solved'):
-                                    agent_analysis += f"- Solved {len(analysis['problems_solved'])} problems\n"
-                                if analysis.get('summary'):
-                                    agent_analysis += f"- Summary: {analysis['summary']}\n"
-                                    
-                            elif agent_name == "security":
-                                agent_analysis += f"- Security Score: {analysis.get('security_score', 'N/A')}/100\n"
-                                agent_analysis += f"- Severity: {analysis.get('severity', 'none')}\n"
-                                if analysis.get('vulnerabilities'):
-                                    agent_analysis += f"- Found {len(analysis['vulnerabilities'])} potential issues\n"
-                                    
-                            elif agent_name == "quality":
-                                agent_analysis += f"- Quality Score: {analysis.get('quality_score', 'N/A')}/100\n"
-                                agent_analysis += f"- Complexity: {analysis.get('complexity', 'N/A')}\n"
-                                if analysis.get('issues'):
-                                    agent_analysis += f"- Found {len(analysis['issues'])} quality issues\n"
-                                    
-                            elif agent_name == "documentation":
-                                agent_analysis += f"- Documentation Score: {analysis.get('documentation_score', 'N/A')}/100\n"
-                                agent_analysis += f"- Coverage: {analysis.get('coverage', 'N/A')}%\n"
-                                if analysis.get('missing'):
-                                    agent_analysis += f"- Missing docs for {len(analysis['missing'])} items\n"
+            agent_analysis = self._format_agent_analysis(state.get("multi_agent_results"))
             
             # Format the prompt with agent analysis appended
             prompt = self.context_prompt.format(
@@ -456,7 +717,7 @@ class GitCommitSummarizer:
                 commit_message=state.get("commit_message", ""),
                 commit_author=state.get("commit_author", ""),
                 commit_date=state.get("commit_date", ""),
-                git_diff=state.get("git_diff", "")
+                git_diff=self._prompt_diff(state)
             )
             
             # Append agent analysis to the prompt
@@ -467,8 +728,9 @@ class GitCommitSummarizer:
             logger.debug(f"Context prompt: {prompt[:200]}...")
             
             # Generate summary
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            context_summary = response.content
+            context_summary = self._generate_summary(
+                prompt, "context", self._stream_path(state, self.context_dir, "context")
+            )
             
             # Track token usage
             if self.budget_manager:
@@ -480,67 +742,27 @@ class GitCommitSummarizer:
                 )
                 logger.info(f"Recorded {tokens_used} tokens for context summary")
             
-            state["context_summary"] = context_summary
             logger.info("Context summary generated successfully")
             
         except Exception as e:
             logger.error(f"Error generating context summary: {e}")
             raise
         
-        return state
+        # Return only this node's output; the parallel brainlift branch writes its own key
+        return {"context_summary": context_summary}
     
     def summarize_brainlift(self, state: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate brainlift.md summary"""
+        """Generate brainlift.md summary (runs alongside summarize_context)"""
         # Check if we already have a cached result in state
         if state.get('brainlift_summary'):
             logger.info("Using cached brainlift summary")
-            return state
+            return {}
             
         logger.info("Generating brainlift summary...")
         
         try:
             # Build agent insights narrative if available
-            agent_insights = ""
-            if state.get("multi_agent_results"):
-                results = state["multi_agent_results"]
-                agent_insights = "\n\n## Automated Analysis Insights:\n"
-                
-                # Add narrative insights from each agent
-                if results.get("agents"):
-                    for agent_name, agent_data in results["agents"].items():
-                        if "error" not in agent_data and "analysis" in agent_data:
-                            analysis = agent_data["analysis"]
-                            
-                            if agent_name == "cursor_chat":
-                                context_score = analysis.get("context_score", 0)
-                                if context_score > 50:
-                                    agent_insights += f"\n**Development Context:** "
-                                    if analysis.get('key_decisions'):
-                                        agent_insights += f"The Cursor chat history reveals {len(analysis['key_decisions'])} important decisions were made. "
-                                    if analysis.get('problems_solved'):
-                                        agent_insights += f"{len(analysis['problems_solved'])} problems were discussed and resolved. "
-                                    agent_insights += "This provides valuable context for understanding the development process.\n"
-                                    
-                            elif agent_name == "security" and analysis.get("vulnerabilities"):
-                                agent_insights += f"\n**Security Considerations:** "
-                                if analysis.get("severity") != "none":
-                                    agent_insights += f"The security scan found {analysis['severity']} severity issues that need attention. "
-                                agent_insights += "Consider reviewing the security vulnerabilities identified in this commit.\n"
-                                
-                            elif agent_name == "quality":
-                                score = analysis.get("quality_score", 0)
-                                if score < 70:
-                                    agent_insights += f"\n**Code Quality:** The code quality score of {score}/100 suggests there's room for improvement. "
-                                    agent_insights += "Consider refactoring for better maintainability.\n"
-                                elif score >= 85:
-                                    agent_insights += f"\n**Code Quality:** Excellent code quality score of {score}/100! "
-                                    agent_insights += "The code follows best practices well.\n"
-                                    
-                            elif agent_name == "documentation":
-                                doc_score = analysis.get("documentation_score", 0)
-                                if doc_score < 50:
-                                    agent_insights += f"\n**Documentation:** With a documentation score of {doc_score}/100, "
-                                    agent_insights += "this code could benefit from better documentation. Consider adding more comments and docstrings.\n"
+            agent_insights = self._format_agent_insights(state.get("multi_agent_results"))
             
             # Format the prompt
             prompt = self.brainlift_prompt.format(
@@ -548,7 +770,7 @@ class GitCommitSummarizer:
                 commit_message=state.get("commit_message", ""),
                 commit_author=state.get("commit_author", ""),
                 commit_date=state.get("commit_date", ""),
-                git_diff=state.get("git_diff", "")
+                git_diff=self._prompt_diff(state)
             )
             
             # Append agent insights to make the brainlift more insightful
@@ -559,8 +781,9 @@ class GitCommitSummarizer:
             logger.debug(f"Brainlift prompt: {prompt[:200]}...")
             
             # Generate summary
-            response = self.llm.invoke([HumanMessage(content=prompt)])
-            brainlift_summary = response.content
+            brainlift_summary = self._generate_summary(
+                prompt, "brainlift", self._stream_path(state, self.output_dir, "brainlift")
+            )
             
             # Track token usage
             if self.budget_manager:
@@ -572,14 +795,170 @@ class GitCommitSummarizer:
                 )
                 logger.info(f"Recorded {tokens_used} tokens for brainlift summary")
             
-            state["brainlift_summary"] = brainlift_summary
             logger.info("Brainlift summary generated successfully")
             
         except Exception as e:
             logger.error(f"Error generating brainlift summary: {e}")
             raise
         
-        return state
+        return {"brainlift_summary": brainlift_summary}
+    
+    def _output_stem(self, state: Dict[str, Any]) -> str:
+        """Timestamp prefix for output files, tagged with the commit for backfills"""
+        stem = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        if state.get("tag_outputs") and state.get("commit_hash"):
+            stem = f"{stem}_{state['commit_hash'][:8]}"
+        return stem
+    
+    def _stream_path(self, state: Dict[str, Any], directory: Path, kind: str) -> Optional[Path]:
+        """File a summary is streamed into, or None when not streaming"""
+        if not self.streaming or not state.get("output_stem"):
+            return None
+        return directory / f"{state['output_stem']}_{kind}.md"
+    
+    def _generate_summary(self, prompt: str, kind: str, stream_path: Optional[Path] = None) -> str:
+        """Run one summary prompt, streaming tokens into stream_path if given.
+        
+        write_output still rewrites the file with the final content (agent
+        insights, chat summary), so the streamed file is only a preview that
+        lets the UI show text long before the whole response is in.
+        """
+        started = time.monotonic()
+        self.progress.emit('summary_started', summary=kind)
+        messages = [HumanMessage(content=prompt)]
+        
+        if stream_path is None:
+            content = self.llm.invoke(messages).content
+        else:
+            parts = []
+            try:
+                with open(stream_path, 'w') as f:
+                    for chunk in self.llm.stream(messages):
+                        text = chunk.content
+                        if not text:
+                            continue
+                        if not parts:
+                            self.progress.emit(
+                                'first_token', summary=kind, file=str(stream_path),
+                                ttft_ms=int((time.monotonic() - started) * 1000)
+                            )
+                        parts.append(text)
+                        f.write(text)
+                        f.flush()
+            except Exception:
+                # Don't leave a half-written summary in the file list
+                stream_path.unlink(missing_ok=True)
+                raise
+            content = ''.join(parts)
+        
+        self.progress.emit(
+            'summary_complete', summary=kind, chars=len(content),
+            duration_ms=int((time.monotonic() - started) * 1000)
+        )
+        return content
+    
+    def _format_agent_analysis(self, results: Optional[Dict[str, Any]]) -> str:
+        """Format agent results as the analysis section appended to the context prompt"""
+        agent_analysis = ""
+        if results:
+            agent_analysis = "\n\n## Multi-Agent Analysis Results:\n"
+            
+            # Add overall summary
+            if results.get("summary"):
+                agent_analysis += f"\n**Overall Assessment:** {results['summary']}\n"
+            
+            # Add individual agent results
+            if results.get("agents"):
+                for agent_name, agent_data in results["agents"].items():
+                    if "error" not in agent_data and "analysis" in agent_data:
+                        analysis = agent_data["analysis"]
+                        agent_analysis += f"\n### {agent_name.title().replace('_', ' ')} Analysis:\n"
+                        
+                        if agent_name == "cursor_chat":
+                            agent_analysis += f"- Context Score: {analysis.get('context_score', 'N/A')}/100\n"
+                            if analysis.get('key_decisions'):
+                                agent_analysis += f"- Found {len(analysis['key_decisions'])} key decisions\n"
+                            if analysis.get('problems_solved'):
+                                agent_analysis += f"- Solved {len(analysis['problems_solved'])} problems\n"
+                            if analysis.get('summary'):
+                                agent_analysis += f"- Summary: {analysis['summary']}\n"
+                                
+                        elif agent_name == "security":
+                            agent_analysis += f"- Security Score: {analysis.get('security_score', 'N/A')}/100\n"
+                            agent_analysis += f"- Severity: {analysis.get('severity', 'none')}\n"
+                            if analysis.get('vulnerabilities'):
+                                agent_analysis += f"- Found {len(analysis['vulnerabilities'])} potential issues\n"
+                                
+                        elif agent_name == "quality":
+                            agent_analysis += f"- Quality Score: {analysis.get('quality_score', 'N/A')}/100\n"
+                            agent_analysis += f"- Complexity: {analysis.get('complexity', 'N/A')}\n"
+                            if analysis.get('issues'):
+                                agent_analysis += f"- Found {len(analysis['issues'])} quality issues\n"
+                                
+                        elif agent_name == "documentation":
+                            agent_analysis += f"- Documentation Score: {analysis.get('documentation_score', 'N/A')}/100\n"
+                            agent_analysis += f"- Coverage: {analysis.get('coverage', 'N/A')}%\n"
+                            if analysis.get('missing'):
+                                agent_analysis += f"- Missing docs for {len(analysis['missing'])} items\n"
+        
+        return agent_analysis
+    
+    def _format_agent_insights(self, results: Optional[Dict[str, Any]]) -> str:
+        """Format agent results as the narrative insights appended to the brainlift prompt"""
+        agent_insights = ""
+        if results:
+            agent_insights = "\n\n## Automated Analysis Insights:\n"
+            
+            # Add narrative insights from each agent
+            if results.get("agents"):
+                for agent_name, agent_data in results["agents"].items():
+                    if "error" not in agent_data and "analysis" in agent_data:
+                        analysis = agent_data["analysis"]
+                        
+                        if agent_name == "cursor_chat":
+                            context_score = analysis.get("context_score", 0)
+                            if context_score > 50:
+                                agent_insights += f"\n**Development Context:** "
+                                if analysis.get('key_decisions'):
+                                    agent_insights += f"The Cursor chat history reveals {len(analysis['key_decisions'])} important decisions were made. "
+                                if analysis.get('problems_solved'):
+                                    agent_insights += f"{len(analysis['problems_solved'])} problems were discussed and resolved. "
+                                agent_insights += "This provides valuable context for understanding the development process.\n"
+                                
+                        elif agent_name == "security" and analysis.get("vulnerabilities"):
+                            agent_insights += f"\n**Security Considerations:** "
+                            if analysis.get("severity") != "none":
+                                agent_insights += f"The security scan found {analysis['severity']} severity issues that need attention. "
+                            agent_insights += "Consider reviewing the security vulnerabilities identified in this commit.\n"
+                            
+                        elif agent_name == "quality":
+                            score = analysis.get("quality_score", 0)
+                            if score < 70:
+                                agent_insights += f"\n**Code Quality:** The code quality score of {score}/100 suggests there's room for improvement. "
+                                agent_insights += "Consider refactoring for better maintainability.\n"
+                            elif score >= 85:
+                                agent_insights += f"\n**Code Quality:** Excellent code quality score of {score}/100! "
+                                agent_insights += "The code follows best practices well.\n"
+                                
+                        elif agent_name == "documentation":
+                            doc_score = analysis.get("documentation_score", 0)
+                            if doc_score < 50:
+                                agent_insights += f"\n**Documentation:** With a documentation score of {doc_score}/100, "
+                                agent_insights += "this code could benefit from better documentation. Consider adding more comments and docstrings.\n"
+        
+        return agent_insights
+    
+    def _with_late_agent_results(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Wait for agents that missed the pipelined deadline and add them for the error log"""
+        pending = state.get("pending_agents")
+        if pending is None or not pending.late or not state.get("multi_agent_results"):
+            return state
+        
+        late_results = self.agent_orchestrator.collect_late(pending)
+        results = dict(state["multi_agent_results"])
+        results["agents"] = {**results.get("agents", {}), **late_results}
+        results["late_agents"] = list(pending.late)
+        return {**state, "multi_agent_results": results}
     
     def _generate_error_log(self, state: Dict[str, Any]) -> str:
         """Generate a detailed error log from multi-agent analysis results"""
@@ -598,6 +977,15 @@ class GitCommitSummarizer:
 
 """
         
+        if results.get("late_agents"):
+            content += "## ⏱️ Late Agent Results\n\n"
+            content += "These agents missed the pipeline deadline, so their findings below are not reflected in the summaries:\n"
+            for agent_name in results["late_agents"]:
+                error = results["agents"].get(agent_name, {}).get("error")
+                status = f"did not finish ({error})" if error else "finished late"
+                content += f"- {agent_name.title().replace('_', ' ')}: {status}\n"
+            content += "\n"
+        
         # Cursor Chat Context (if significant)
         cursor_data = results["agents"].get("cursor_chat", {}).get("analysis", {})
         if cursor_data.get("context_score", 0) > 50:
@@ -702,13 +1090,31 @@ class GitCommitSummarizer:
         
         return content
     
+    def _write_error_log(self, state: Dict[str, Any], timestamp: str) -> Optional[Path]:
+        """Write error_log.md if multi-agent analysis found anything to report"""
+        if not state.get("multi_agent_results") or not state["multi_agent_results"].get("agents"):
+            return None
+        error_log_content = self._generate_error_log(state)
+        if not error_log_content:
+            return None
+        
+        # Create error_logs directory if it doesn't exist
+        error_log_dir = self.base_dir / "error_logs"
+        error_log_dir.mkdir(exist_ok=True)
+        
+        error_log_path = error_log_dir / f"{timestamp}_error_log.md"
+        with open(error_log_path, 'w') as f:
+            f.write(error_log_content)
+        logger.info(f"Wrote error log: {error_log_path}")
+        return error_log_path
+    
     def write_output(self, state: Dict[str, Any]) -> Dict[str, Any]:
         """Write both summaries to their respective files"""
         logger.info("Writing output files...")
         
         try:
-            # Generate timestamp for filenames
-            timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+            # Timestamp-based stem for filenames (chosen when the diff was parsed)
+            timestamp = state.get("output_stem") or self._output_stem(state)
             
             # Write context.md
             context_path = self.context_dir / f"{timestamp}_context.md"
@@ -736,19 +1142,9 @@ class GitCommitSummarizer:
                 f.write(content)
             logger.info(f"Wrote brainlift: {brainlift_path}")
             
-            # Write error_log.md if multi-agent analysis was performed
-            error_log_path = None
-            if state.get("multi_agent_results") and state["multi_agent_results"].get("agents"):
-                error_log_content = self._generate_error_log(state)
-                if error_log_content:
-                    # Create error_logs directory if it doesn't exist
-                    error_log_dir = self.base_dir / "error_logs"
-                    error_log_dir.mkdir(exist_ok=True)
-                    
-                    error_log_path = error_log_dir / f"{timestamp}_error_log.md"
-                    with open(error_log_path, 'w') as f:
-                        f.write(error_log_content)
-                    logger.info(f"Wrote error log: {error_log_path}")
+            # Write error_log.md from the agents that made the deadline; late
+            # agents are waited for only after the outputs are announced and cached
+            error_log_path = self._write_error_log(state, timestamp)
             
             state["output_files"] = {
                 "context": str(context_path),
@@ -757,21 +1153,26 @@ class GitCommitSummarizer:
             
             if error_log_path:
                 state["output_files"]["error_log"] = str(error_log_path)
+            self.progress.emit('output_written', files=state["output_files"], cache_hit=bool(state.get('cache_hit')))
             
             # Cache the complete results including multi-agent analysis
-            if self.cache_manager and state.get('cache_key') and not state.get('cache_hit'):
-                cache_data = {
-                    'context_summary': state.get('context_summary', ''),
-                    'brainlift_summary': state.get('brainlift_summary', ''),
-                    'multi_agent_results': state.get('multi_agent_results', {}),
-                    'output_files': state['output_files']
-                }
-                self.cache_manager.exact_cache.set(
-                    state['cache_key'],
-                    cache_data,
-                    ttl=86400  # 24 hours
+            if self.cache_manager and state.get('cache_subject') and not state.get('cache_hit'):
+                self.cache_manager.result_cache.put(
+                    state['cache_subject'],
+                    context_summary=state.get('context_summary', ''),
+                    brainlift_summary=state.get('brainlift_summary', ''),
+                    multi_agent_results=state.get('multi_agent_results', {}),
+                    output_files=state['output_files']
                 )
-                logger.info(f"Cached results with key: {state['cache_key']}")
+                self.cache_manager.stats_aggregator.mark_dirty()
+                logger.info(f"Cached results for {state['cache_subject']}")
+            
+            # Rewrite the error log with agents that missed the pipelined deadline
+            late_state = self._with_late_agent_results(state)
+            if late_state is not state:
+                error_log_path = self._write_error_log(late_state, timestamp)
+                if error_log_path:
+                    state["output_files"]["error_log"] = str(error_log_path)
             
             # Log final stats
             if self.cache_manager:
@@ -788,86 +1189,114 @@ class GitCommitSummarizer:
         
         return state
     
-    def process_commit(self, commit_hash: Optional[str] = None) -> Dict[str, Any]:
-        """Process a Git commit and generate summaries"""
+    def process_commit(self, commit_hash: Optional[str] = None,
+                       tag_outputs: bool = False) -> Dict[str, Any]:
+        """Process a Git commit and generate summaries
+        
+        tag_outputs adds the short commit hash to the output file names so
+        commits summarized in the same second (backfill) don't overwrite each other.
+        """
         initial_state = {}
         if commit_hash:
             initial_state["commit_hash"] = commit_hash
+        if tag_outputs:
+            initial_state["tag_outputs"] = True
         
         try:
-            # Quick cache check before running full workflow
-            if self.cache_manager:
-                # Get commit info for cache key
-                repo = git.Repo(self.base_dir)
-                commit = repo.commit(commit_hash) if commit_hash else repo.head.commit
-                
-                # Create a more stable cache key using commit hash instead of diff
-                cache_key = f"commit:{commit.hexsha}"
-                
-                # Check if we have this commit cached
-                cached = self.cache_manager.exact_cache.get(cache_key)
-                
-                if cached is not None:
-                    logger.info(f"Quick cache hit for commit {commit.hexsha[:8]}")
-                    # Even with cache hit, we need to write new files
-                    # so they appear in the dropdown with current timestamps
-                    timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-                    
-                    # Write cached context
-                    context_path = self.context_dir / f"{timestamp}_context.md"
-                    with open(context_path, 'w') as f:
-                        f.write(cached.get('context_summary', ''))
-                    
-                    # Write cached brainlift
-                    brainlift_path = self.output_dir / f"{timestamp}_brainlift.md"
-                    with open(brainlift_path, 'w') as f:
-                        f.write(cached.get('brainlift_summary', ''))
-                    
-                    output_files = {
-                        'context': str(context_path),
-                        'brainlift': str(brainlift_path)
-                    }
-                    
-                    return {
-                        'cache_hit': True,
-                        'output_files': output_files,
-                        'context_summary': cached.get('context_summary', ''),
-                        'brainlift_summary': cached.get('brainlift_summary', ''),
-                        'budget_check': {
-                            'estimated_tokens': 0,
-                            'estimated_cost': 0.0
-                        }
-                    }
-            
-            # Run full workflow if not cached
-            result = self.graph.invoke(initial_state)
-            
-            # Cache the result using commit hash as key
-            if self.cache_manager and result.get('output_files'):
-                cache_data = {
-                    'output_files': result['output_files'],
-                    'context_summary': result.get('context_summary', ''),
-                    'brainlift_summary': result.get('brainlift_summary', '')
-                }
-                self.cache_manager.exact_cache.set(
-                    cache_key,
-                    cache_data,
-                    ttl=86400  # 24 hours for commit-based cache
-                )
-            
-            logger.info("Successfully processed commit")
-            return result
+            with self.tracer.span("process_commit", kind='workflow', commit=commit_hash or 'HEAD') as span:
+                return self._process_commit(initial_state, commit_hash, span)
         except Exception as e:
             logger.error(f"Error processing commit: {e}")
             raise
     
+    def _process_commit(self, initial_state: Dict[str, Any], commit_hash: Optional[str],
+                        span: Span) -> Dict[str, Any]:
+        """process_commit inside its workflow span"""
+        if not self.cache_manager:
+            result = self._invoke_graph(initial_state)
+            logger.info("Successfully processed commit")
+            return result
+        
+        # Resolve the full SHA, which is the cache subject for a commit
+        commit = get_repository(self.base_dir).commit(commit_hash)
+        span.set(commit=commit.hexsha)
+        
+        # The one cache read for this commit; the graph skips its own lookup
+        cached_result = self._serve_cached_commit(commit.hexsha)
+        if cached_result is not None:
+            span.set_cache('hit')
+            return cached_result
+        span.set_cache('miss')
+        initial_state["commit_hash"] = commit.hexsha
+        initial_state["cache_checked"] = True
+        
+        # The hook, the retry queue and manual runs can hit the same commit at
+        # once; only one of them runs the workflow and the rest reuse its output
+        result, shared = self.cache_manager.single_flight.do(
+            self.cache_manager.result_cache.key_for(commit.hexsha),
+            lambda: self._invoke_graph(initial_state),
+            recheck=lambda: self._serve_cached_commit(commit.hexsha, refresh=True)
+        )
+        if shared:
+            span.set(coalesced=True)
+            logger.info(f"Reused in-flight result for commit {commit.hexsha[:8]}")
+        
+        logger.info("Successfully processed commit")
+        return result
+    
+    def _serve_cached_commit(self, commit_sha: str,
+                             refresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Write output files from a cached commit result, if there is one
+        
+        refresh picks up results written by other processes since startup
+        (used after waiting on another process's in-flight run).
+        """
+        cached = self.cache_manager.result_cache.get(commit_sha, refresh=refresh)
+        if cached is None:
+            return None
+        
+        logger.info(f"Quick cache hit for commit {commit_sha[:8]}")
+        self.progress.emit('cache_hit', commit=commit_sha)
+        # Even with cache hit, we need to write new files
+        # so they appear in the dropdown with current timestamps
+        timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+        
+        # Write cached context
+        context_path = self.context_dir / f"{timestamp}_context.md"
+        with open(context_path, 'w') as f:
+            f.write(cached.get('context_summary', ''))
+        
+        # Write cached brainlift
+        brainlift_path = self.output_dir / f"{timestamp}_brainlift.md"
+        with open(brainlift_path, 'w') as f:
+            f.write(cached.get('brainlift_summary', ''))
+        
+        output_files = {
+            'context': str(context_path),
+            'brainlift': str(brainlift_path)
+        }
+        self.progress.emit('output_written', files=output_files, cache_hit=True)
+        
+        return {
+            'cache_hit': True,
+            'output_files': output_files,
+            'context_summary': cached.get('context_summary', ''),
+            'brainlift_summary': cached.get('brainlift_summary', ''),
+            'budget_check': {
+                'estimated_tokens': 0,
+                'estimated_cost': 0.0
+            }
+        }
+    
     def process_wip(self, mode: str) -> Dict[str, Any]:
         """Process WIP (Work in Progress) changes and generate summaries"""
         initial_state = {"wip_mode": mode}
         
         try:
-            # Run the workflow - the parse_git_diff will generate a deterministic cache key
-            result = self.graph.invoke(initial_state)
+            with self.tracer.span("process_wip", kind='workflow', wip_mode=mode) as span:
+                # Run the workflow - the parse_git_diff will generate a deterministic cache key
+                result = self._invoke_graph(initial_state)
+                span.set_cache('hit' if result.get('cache_hit') else 'miss')
             
             logger.info(f"Successfully processed WIP analysis ({mode})")
             return result
@@ -883,6 +1312,12 @@ def main():
     # Parse command line arguments
     args = sys.argv[1:]
     
+    # Backfill a range of existing commits
+    if args and args[0].split('=')[0] in ('--range', '--since'):
+        from agents.backfill import main as backfill_main
+        backfill_main(args)
+        return
+    
     # Check if this is a WIP analysis
     if len(args) >= 2 and args[0] == '--wip':
         wip_mode = args[1]  # 'all' or 'staged'
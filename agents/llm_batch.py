@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+One LLM call for several agents
+Used by the orchestrator's batched mode so the diff is sent once per commit
+instead of once per agent
+"""
+
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from agents.diff_map_reduce import MAX_DIRECT_DIFF_CHARS
+from agents.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+# Agents whose prompts are the same diff with different instructions
+BATCHABLE_AGENTS = ("security", "quality", "documentation")
+
+# Stands in for the diff inside each agent's section of the batched prompt
+DIFF_REFERENCE = "[the code changes shown at the top of this request]"
+
+BATCH_PROMPT = """You are reviewing one commit for several specialist reviewers at once.
+
+Commit: {commit_hash}
+Message: {commit_message}
+
+Code changes:
+{git_diff}
+
+Each section below is one reviewer's request about these code changes.
+Answer every section. Respond with a single JSON object whose keys are the
+section names ({section_names}) and whose values are the JSON objects each
+section asks for. Do not add anything outside the JSON object.
+
+{sections}
+"""
+
+# (analysis, tokens_used, cost) for one agent
+BatchResult = Tuple[Dict[str, Any], int, float]
+
+
+class LLMBatch:
+    """Collects the LLM requests of one commit's agents into one call.
+    
+    Each member agent runs on its own thread as usual. When it reaches
+    its LLM call it submits its prompt and waits; members that finish
+    without calling the LLM (the gate skipped it, or they failed) are
+    marked done by the orchestrator. The thread that completes the set
+    makes the combined call and splits the JSON response by agent.
+    
+    submit() returns None whenever the agent should make its own call
+    instead: it was the only one to submit, the combined call failed, or
+    its section of the response is missing or not a JSON object.
+    
+    timeout is how long from now the orchestrator waits for the members.
+    Past it nobody collects their results, so a member still waiting for
+    the combined call gives up with an error instead of calling the LLM.
+    """
+    
+    def __init__(self, members: List[str], state: Dict[str, Any], timeout: float = 60):
+        self.members = list(members)
+        self.timeout = timeout
+        self.deadline = time.monotonic() + timeout
+        commit_info = state.get("commit_info", {})
+        self.commit_hash = commit_info.get("commit_hash", "")
+        self.commit_message = commit_info.get("commit_message", "")
+        self.diff_text = state.get("diff_digest") or state.get("git_diff", "")[:MAX_DIRECT_DIFF_CHARS]
+        
+        self._cond = threading.Condition()
+        self._waiting_on = set(members)
+        self._requests: Dict[str, Any] = {}
+        self._results: Optional[Dict[str, BatchResult]] = None
+    
+    def submit(self, agent) -> Optional[BatchResult]:
+        """Queue an agent's request and wait for the combined call"""
+        with self._cond:
+            if agent.name not in self._waiting_on:
+                # Not a member, or already past the batch
+                return None
+            self._requests[agent.name] = agent
+            leader = self._arrive(agent.name)
+        
+        if leader:
+            self._run()
+        
+        with self._cond:
+            remaining = max(self.deadline - time.monotonic(), 0)
+            if not self._cond.wait_for(lambda: self._results is not None, remaining):
+                self._requests.pop(agent.name, None)
+                raise TimeoutError(f"Batched LLM call not ready within {self.timeout}s")
+            return self._results.get(agent.name)
+    
+    def done(self, name: str) -> None:
+        """Mark an agent finished; it won't submit (again)"""
+        with self._cond:
+            if name not in self._waiting_on:
+                return
+            leader = self._arrive(name)
+        if leader:
+            self._run()
+    
+    def _arrive(self, name: str) -> bool:
+        """Record an agent's arrival (caller holds the lock); True if it completes the set"""
+        self._waiting_on.discard(name)
+        return not self._waiting_on and self._results is None
+    
+    def _run(self) -> None:
+        """Make the combined call and publish per-agent results"""
+        results: Dict[str, BatchResult] = {}
+        if len(self._requests) > 1:
+            try:
+                results = self._call(dict(self._requests))
+            except Exception as e:
+                logger.error(f"Batched LLM call failed, falling back to per-agent calls: {e}")
+        
+        with self._cond:
+            self._results = results
+            self._cond.notify_all()
+    
+    def _call(self, agents: Dict[str, Any]) -> Dict[str, BatchResult]:
+        sections = {
+            name: agent.prompt_template.format(
+                commit_hash=self.commit_hash,
+                commit_message=self.commit_message,
+                git_diff=DIFF_REFERENCE
+            )
+            for name, agent in agents.items()
+        }
+        prompt = BATCH_PROMPT.format(
+            commit_hash=self.commit_hash,
+            commit_message=self.commit_message,
+            git_diff=self.diff_text,
+            section_names=", ".join(f'"{name}"' for name in sections),
+            sections="\n\n".join(f"=== Section: {name} ===\n{text}" for name, text in sections.items())
+        )
+        
+        # Members share a model (the orchestrator only batches agents that do)
+        first = next(iter(agents.values()))
+        annotate(llm_batch=",".join(agents))
+        logger.info(f"Batched LLM call for {', '.join(agents)}")
+        response = first.llm.invoke([HumanMessage(content=prompt)]).content
+        
+        parsed = self._parse(response)
+        if parsed is None:
+            logger.warning("Could not parse the batched LLM response; falling back to per-agent calls")
+            return {}
+        
+        # Each agent pays for its own section plus an equal share of the diff
+        shared_chars = (len(prompt) - sum(map(len, sections.values()))) / len(agents)
+        results = {}
+        for name, agent in agents.items():
+            section = parsed.get(name)
+            if not isinstance(section, dict):
+                logger.warning(f"Batched LLM response has no '{name}' section; {name} calls the LLM itself")
+                continue
+            section_json = json.dumps(section)
+            tokens = int(len(sections[name]) + shared_chars + len(section_json)) // 4
+            results[name] = (
+                agent.process_response(section_json),
+                tokens,
+                (tokens / 1000) * agent.cost_per_1k_tokens
+            )
+        return results
+    
+    @staticmethod
+    def _parse(response: str) -> Optional[Dict[str, Any]]:
+        """The JSON object in a response, allowing a ```json fence around it"""
+        text = response
+        if "```json" in text:
+            text = text.split("```json")[1].split("```")[0]
+        start, end = text.find("{"), text.rfind("}")
+        if start < 0 or end < start:
+            return None
+        try:
+            result = json.loads(text[start:end + 1])
+        except json.JSONDecodeError:
+            return None
+        return result if isinstance(result, dict) else None
@@ -0,0 +1,366 @@
+#!/usr/bin/env python3
+"""
+Gating for the agents' LLM calls
+Decides per agent and commit whether static analysis is conclusive enough to
+skip the LLM, and logs every decision so skipped tokens can be measured
+
+Usage: python agents/llm_gate.py [decision_log]
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import deque
+from fnmatch import fnmatch
+from pathlib import Path
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from agents.parsed_diff import DiffFile, ParsedDiff
+from agents.tracing import annotate
+
+logger = logging.getLogger(__name__)
+
+# Decisions are appended here, one JSON object per line
+DEFAULT_DECISION_LOG = Path(__file__).parent.parent / "logs" / "llm_gate.jsonl"
+# Static vs LLM verdicts per agent, kept across runs
+DEFAULT_HISTORY_FILE = Path(__file__).parent.parent / "logs" / "llm_gate_history.json"
+
+DOC_LANGUAGES = {'markdown', 'rst', 'text'}
+LOCKFILES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml',
+    'poetry.lock', 'Pipfile.lock', 'uv.lock', 'Cargo.lock', 'Gemfile.lock',
+    'composer.lock', 'go.sum', 'packages.lock.json'
+}
+GENERATED_GLOBS = (
+    '*.min.js', '*.min.css', '*.map', '*_pb2.py', '*_pb2_grpc.py', '*.pb.go',
+    '*.generated.*', '*.snap', 'dist/*', 'build/*', '*/dist/*', '*/build/*'
+)
+# Markers generators put in a file's first lines
+GENERATED_MARKERS = ('@generated', 'DO NOT EDIT', 'Code generated by', 'Autogenerated', 'auto-generated')
+
+# Rolling window of verdicts kept per agent, and how many are needed before trusting it
+HISTORY_WINDOW = 50
+MIN_HISTORY = 20
+
+
+def classify_file(diff_file: DiffFile) -> str:
+    """What kind of change a file is: code, docs, lockfile, generated, rename, binary or metadata"""
+    if diff_file.is_binary:
+        return 'binary'
+    if not diff_file.hunks:
+        # No content change: a pure rename, or a mode change
+        return 'rename' if diff_file.path != diff_file.old_path else 'metadata'
+    
+    name = diff_file.path.rsplit('/', 1)[-1]
+    if name in LOCKFILES:
+        return 'lockfile'
+    if any(fnmatch(diff_file.path, glob) for glob in GENERATED_GLOBS):
+        return 'generated'
+    if any(marker in text for _, text in diff_file.added[:5] for marker in GENERATED_MARKERS):
+        return 'generated'
+    if diff_file.language in DOC_LANGUAGES:
+        return 'docs'
+    return 'code'
+
+
+class DiffProfile:
+    """What a diff touches, by kind of file"""
+    
+    def __init__(self, parsed: ParsedDiff):
+        self.kinds: Dict[str, int] = {}
+        self.code_chars = 0
+        for diff_file in parsed.files:
+            kind = classify_file(diff_file)
+            self.kinds[kind] = self.kinds.get(kind, 0) + 1
+            if kind == 'code':
+                self.code_chars += diff_file.end - diff_file.start
+        
+        if not parsed.files and parsed.text.strip():
+            # No file headers (e.g. a bare hunk): treat it all as code
+            self.kinds['code'] = 1
+            self.code_chars = len(parsed.text)
+    
+    @property
+    def summary(self) -> str:
+        """'code', 'empty', '<kind>_only' or 'non_code' for a mix of non-code kinds"""
+        if not self.kinds:
+            return 'empty'
+        if 'code' in self.kinds:
+            return 'code'
+        if len(self.kinds) == 1:
+            return f"{next(iter(self.kinds))}_only"
+        return 'non_code'
+
+
+class GatePolicy(NamedTuple):
+    """When an agent's static result is conclusive"""
+    # Static-clean inputs up to this many characters skip the LLM
+    max_clean_chars: int = 500
+    # More static findings than this always go to the LLM
+    max_findings: int = 0
+    # Skip the LLM when the diff only touches non-code files
+    skip_non_code: bool = True
+    # Use historical agreement between static and LLM verdicts
+    learn: bool = True
+
+
+# The thresholds each agent used to hard-code
+POLICIES = {
+    'security': GatePolicy(max_clean_chars=500, max_findings=0),
+    'quality': GatePolicy(max_clean_chars=500, max_findings=2),
+    'documentation': GatePolicy(max_clean_chars=500, max_findings=2),
+    'cursor_chat': GatePolicy(max_clean_chars=200, max_findings=0, skip_non_code=False, learn=False)
+}
+
+
+class GateDecision(NamedTuple):
+    agent: str
+    use_llm: bool
+    # Which check decided (e.g. 'small_clean'), and the same in words
+    rule: str
+    reason: str
+    # Whether static analysis found nothing that forces an LLM review
+    static_clean: bool
+    diff_kind: Optional[str]
+    # Rough prompt size the decision spends or saves
+    estimated_tokens: int
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'use_llm': self.use_llm,
+            'rule': self.rule,
+            'reason': self.reason,
+            'diff_kind': self.diff_kind,
+            'estimated_tokens': self.estimated_tokens
+        }
+
+
+class LLMGate:
+    """Decides whether an agent's LLM call is worth making.
+    
+    In order: static findings above the agent's threshold always go to
+    the LLM; diffs that only touch docs, lockfiles, generated files or
+    renames skip it; static-clean inputs below the size threshold skip
+    it. Larger static-clean inputs skip it too once the LLM has agreed
+    with static analysis on at least min_agreement of the agent's recent
+    commits, except for a deterministic 1-in-audit_every sample that
+    still calls the LLM so the agreement keeps being measured.
+    
+    mode is 'adaptive' (all of the above), 'static' (no history) or
+    'off' (always call the LLM).
+    """
+    
+    def __init__(self, mode: str = 'adaptive', min_agreement: float = 0.9,
+                 audit_every: int = 10, log_path: Optional[Path] = DEFAULT_DECISION_LOG,
+                 history_path: Optional[Path] = DEFAULT_HISTORY_FILE):
+        self.mode = mode
+        self.min_agreement = min_agreement
+        self.audit_every = audit_every
+        self.log_path = Path(log_path) if log_path else None
+        self.history_path = Path(history_path) if history_path else None
+        self._lock = threading.Lock()
+        self.history: Dict[str, Deque[bool]] = self._load_history()
+        self.stats = {'llm_calls': 0, 'skipped': 0, 'tokens_saved': 0}
+    
+    @classmethod
+    def from_env(cls) -> 'LLMGate':
+        """Configured by LLM_GATING, LLM_GATE_MIN_AGREEMENT, LLM_GATE_AUDIT_EVERY,
+        LLM_GATE_LOG and LLM_GATE_HISTORY"""
+        return cls(
+            mode=os.getenv('LLM_GATING', 'adaptive').lower(),
+            min_agreement=float(os.getenv('LLM_GATE_MIN_AGREEMENT', '0.9')),
+            audit_every=int(os.getenv('LLM_GATE_AUDIT_EVERY', '10')),
+            log_path=Path(os.getenv('LLM_GATE_LOG', str(DEFAULT_DECISION_LOG))),
+            history_path=Path(os.getenv('LLM_GATE_HISTORY', str(DEFAULT_HISTORY_FILE)))
+        )
+    
+    def decide(self, agent: str, findings: int, input_chars: int, prompt_chars: int,
+               parsed: Optional[ParsedDiff] = None, commit: Optional[str] = None) -> GateDecision:
+        """Decide one agent's LLM call for one commit and log the decision.
+        
+        findings is the number of static findings, input_chars the size of
+        what the agent analyzes (used when there is no parsed diff) and
+        prompt_chars the size of the prompt the call would send.
+        """
+        policy = POLICIES.get(agent, GatePolicy())
+        static_clean = findings <= policy.max_findings
+        profile = DiffProfile(parsed) if parsed is not None else None
+        diff_kind = profile.summary if profile else None
+        size = profile.code_chars if profile else input_chars
+        
+        if self.mode == 'off':
+            use_llm, rule, reason = True, 'disabled', 'gating disabled'
+        elif not static_clean:
+            use_llm, rule, reason = True, 'static_findings', f'{findings} static findings'
+        elif profile and policy.skip_non_code and diff_kind != 'code':
+            use_llm, rule, reason = False, 'non_code', f'diff is {diff_kind}'
+        elif size <= policy.max_clean_chars:
+            use_llm, rule, reason = False, 'small_clean', f'static clean with {size} chars to review'
+        elif self.mode == 'adaptive' and policy.learn:
+            use_llm, rule, reason = self._decide_from_history(agent, commit)
+        else:
+            use_llm, rule, reason = True, 'large', f'{size} chars to review'
+        
+        decision = GateDecision(agent, use_llm, rule, reason, static_clean, diff_kind, prompt_chars // 4)
+        self._log(decision, commit, findings, size)
+        return decision
+    
+    def _decide_from_history(self, agent: str, commit: Optional[str]):
+        with self._lock:
+            verdicts = list(self.history.get(agent, ()))
+        if len(verdicts) < MIN_HISTORY:
+            return True, 'learning', f'{len(verdicts)} of {MIN_HISTORY} verdicts needed to trust static analysis'
+        
+        agreement = f'LLM agreed with static analysis on {sum(verdicts) / len(verdicts):.0%} of recent commits'
+        if sum(verdicts) / len(verdicts) < self.min_agreement:
+            return True, 'disagreement', agreement
+        if self.audit_every and self._audit_sample(agent, commit):
+            return True, 'audit', f'audit sample; {agreement}'
+        return False, 'agreement', agreement
+    
+    def _audit_sample(self, agent: str, commit: Optional[str]) -> bool:
+        """Deterministic per commit, so reruns of a commit decide the same way"""
+        key = f"{agent}:{commit or time.time()}".encode()
+        return int(hashlib.sha256(key).hexdigest(), 16) % self.audit_every == 0
+    
+    def record_verdict(self, decision: GateDecision, llm_clean: Optional[bool]) -> None:
+        """Record whether the LLM agreed that a static-clean input was clean.
+        
+        Only static-clean calls teach the gate anything: those are the
+        calls it would skip. llm_clean is None when the LLM's verdict
+        couldn't be read.
+        """
+        if not decision.use_llm or not decision.static_clean or llm_clean is None:
+            return
+        with self._lock:
+            verdicts = self.history.setdefault(decision.agent, deque(maxlen=HISTORY_WINDOW))
+            verdicts.append(llm_clean)
+            self._save_history()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.stats,
+                'mode': self.mode,
+                'agreement': {agent: {'verdicts': len(v), 'agreement': sum(v) / len(v)}
+                              for agent, v in self.history.items() if v}
+            }
+    
+    def _log(self, decision: GateDecision, commit: Optional[str], findings: int, size: int) -> None:
+        action = 'calling' if decision.use_llm else 'skipping'
+        logger.info(f"{decision.agent}: {action} LLM ({decision.reason})")
+        annotate(llm_gate=decision.rule, llm_skipped=not decision.use_llm,
+                 llm_tokens_estimated=decision.estimated_tokens)
+        
+        record = {
+            'time': time.time(),
+            'agent': decision.agent,
+            'commit': commit,
+            'use_llm': decision.use_llm,
+            'rule': decision.rule,
+            'reason': decision.reason,
+            'diff_kind': decision.diff_kind,
+            'findings': findings,
+            'input_chars': size,
+            'estimated_tokens': decision.estimated_tokens
+        }
+        with self._lock:
+            if decision.use_llm:
+                self.stats['llm_calls'] += 1
+            else:
+                self.stats['skipped'] += 1
+                self.stats['tokens_saved'] += decision.estimated_tokens
+            
+            if not self.log_path:
+                return
+            try:
+                self.log_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.log_path, 'a') as f:
+                    f.write(json.dumps(record) + '\n')
+            except OSError as e:
+                # Logging a decision must never fail an agent
+                logger.debug(f"Failed to log LLM gate decision: {e}")
+    
+    def _load_history(self) -> Dict[str, Deque[bool]]:
+        if not self.history_path or not self.history_path.exists():
+            return {}
+        try:
+            with open(self.history_path) as f:
+                data = json.load(f)
+            return {agent: deque((bool(v) for v in verdicts), maxlen=HISTORY_WINDOW)
+                    for agent, verdicts in data.get('verdicts', {}).items()}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.error(f"Failed to load LLM gate history: {e}")
+            return {}
+    
+    def _save_history(self) -> None:
+        """Atomically rewrite the history file (caller holds the lock)"""
+        if not self.history_path:
+            return
+        try:
+            self.history_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.history_path.with_suffix('.json.tmp')
+            with open(tmp_file, 'w') as f:
+                json.dump({'verdicts': {agent: list(v) for agent, v in self.history.items()}}, f)
+            os.replace(tmp_file, self.history_path)
+        except Exception as e:
+            logger.error(f"Failed to save LLM gate history: {e}")
+
+
+_gate: Optional[LLMGate] = None
+_gate_lock = threading.Lock()
+
+
+def get_llm_gate() -> LLMGate:
+    """The process-wide gate (configured from the environment on first use)"""
+    global _gate
+    with _gate_lock:
+        if _gate is None:
+            _gate = LLMGate.from_env()
+        return _gate
+
+
+def summarize(path: Path) -> List[Dict[str, Any]]:
+    """LLM calls made and skipped, and estimated tokens saved, per agent and rule"""
+    rows: Dict[tuple, Dict[str, Any]] = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            key = (record.get('agent'), record.get('use_llm'), record.get('rule'))
+            row = rows.setdefault(key, {'agent': key[0], 'use_llm': key[1], 'rule': key[2],
+                                        'count': 0, 'tokens': 0})
+            row['count'] += 1
+            row['tokens'] += record.get('estimated_tokens', 0)
+    return sorted(rows.values(), key=lambda r: (r['agent'] or '', not r['use_llm'], -r['count']))
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(os.getenv('LLM_GATE_LOG', str(DEFAULT_DECISION_LOG)))
+    if not path.exists():
+        print(f"No LLM gate decisions recorded at {path}")
+        return 1
+    
+    rows = summarize(path)
+    print(f"{'agent':<14} {'decision':<8} {'rule':<16} {'count':>6} {'est. tokens':>11}")
+    for row in rows:
+        decision = 'call' if row['use_llm'] else 'skip'
+        print(f"{row['agent']:<14} {decision:<8} {row['rule']:<16} {row['count']:>6} {row['tokens']:>11}")
+    
+    calls = sum(r['count'] for r in rows if r['use_llm'])
+    skipped = [r for r in rows if not r['use_llm']]
+    print(f"\n{calls} LLM calls made, {sum(r['count'] for r in skipped)} skipped, "
+          f"~{sum(r['tokens'] for r in skipped)} prompt tokens saved")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Parsed diff shared by the analysis agents
+Built once per commit by the orchestrator so each agent doesn't re-split
+and re-scan the same diff text
+"""
+
+import re
+from bisect import bisect_right
+from pathlib import PurePosixPath
+from typing import Dict, List, Optional, Tuple
+
+HUNK_HEADER = re.compile(r'^@@ -(\d+)(?:,\d+)? \+(\d+)(?:,\d+)? @@')
+DIFF_HEADER = re.compile(r'^diff --git a/(.+?) b/(.+)$')
+
+# File extension (or exact name) -> language
+LANGUAGES = {
+    '.py': 'python', '.pyi': 'python',
+    '.js': 'javascript', '.jsx': 'javascript', '.mjs': 'javascript', '.cjs': 'javascript',
+    '.ts': 'typescript', '.tsx': 'typescript',
+    '.java': 'java', '.kt': 'kotlin', '.scala': 'scala',
+    '.go': 'go', '.rs': 'rust', '.rb': 'ruby', '.php': 'php',
+    '.c': 'c', '.h': 'c', '.cc': 'cpp', '.cpp': 'cpp', '.hpp': 'cpp',
+    '.cs': 'csharp', '.swift': 'swift', '.m': 'objective-c',
+    '.sh': 'shell', '.bash': 'shell', '.zsh': 'shell',
+    '.sql': 'sql', '.html': 'html', '.css': 'css', '.scss': 'css',
+    '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml', '.toml': 'toml',
+    '.md': 'markdown', '.rst': 'rst', '.txt': 'text',
+    'Dockerfile': 'dockerfile', 'Makefile': 'make'
+}
+
+# (line number in the diff text, line content without the +/- marker)
+DiffLine = Tuple[int, str]
+
+
+def detect_language(path: str) -> Optional[str]:
+    """Language of a file from its name or extension, None if unknown"""
+    name = PurePosixPath(path).name
+    return LANGUAGES.get(name) or LANGUAGES.get(PurePosixPath(path).suffix.lower())
+
+
+class DiffHunk:
+    """One @@ hunk; first_line/last_line are 1-based line numbers in the diff text"""
+    
+    __slots__ = ('header', 'old_start', 'new_start', 'first_line', 'last_line')
+    
+    def __init__(self, header: str, old_start: int, new_start: int, first_line: int):
+        self.header = header
+        self.old_start = old_start
+        self.new_start = new_start
+        self.first_line = first_line
+        self.last_line = first_line
+
+
+class DiffFile:
+    """Changes to one file: its hunks and added/removed lines"""
+    
+    __slots__ = ('path', 'old_path', 'language', 'first_line', 'start', 'end', 'is_binary',
+                 'hunks', 'added', 'removed', 'new_line_numbers')
+    
+    def __init__(self, path: str, old_path: str, first_line: int):
+        self.path = path
+        self.old_path = old_path
+        self.language = detect_language(path)
+        self.first_line = first_line
+        # Character offsets of the file's section in the diff text
+        self.start = 0
+        self.end = 0
+        self.is_binary = False
+        self.hunks: List[DiffHunk] = []
+        self.added: List[DiffLine] = []
+        self.removed: List[DiffLine] = []
+        # diff line number of each added line -> its line number in the new file
+        self.new_line_numbers: Dict[int, int] = {}
+
+
+class ParsedDiff:
+    """A unified diff split once into files, hunks and added/removed lines.
+    
+    Agents treat it as read-only and share one instance, so pattern scans
+    can still run regexes over `text` but turn match offsets into line
+    numbers with a bisect over `line_offsets` instead of counting newlines
+    in a prefix of the diff for every match.
+    
+    Line numbers are 1-based positions in the diff text (what the agents
+    have always reported); `locate()` maps one to a file and new-file line.
+    """
+    
+    def __init__(self, text: str):
+        self.text = text
+        self.lines: List[str] = text.split('\n')
+        
+        # Start offset of every line, for offset -> line number lookups
+        offsets = [0]
+        position = 0
+        for line in self.lines[:-1]:
+            position += len(line) + 1
+            offsets.append(position)
+        self.line_offsets = offsets
+        
+        self.files: List[DiffFile] = []
+        self.added: List[DiffLine] = []
+        self.removed: List[DiffLine] = []
+        self._parse()
+        self._file_starts = [f.first_line for f in self.files]
+        starts = [self.line_offsets[line - 1] for line in self._file_starts]
+        for diff_file, start, end in zip(self.files, starts, starts[1:] + [len(text)]):
+            diff_file.start = start
+            diff_file.end = end
+        
+        self.languages = sorted({f.language for f in self.files if f.language})
+    
+    @classmethod
+    def parse(cls, text: str) -> 'ParsedDiff':
+        return cls(text or '')
+    
+    def _parse(self) -> None:
+        current: Optional[DiffFile] = None
+        hunk: Optional[DiffHunk] = None
+        new_line = 0
+        
+        for number, line in enumerate(self.lines, 1):
+            if line.startswith('diff --git '):
+                match = DIFF_HEADER.match(line)
+                old_path, path = match.groups() if match else ('unknown', 'unknown')
+                current = DiffFile(path, old_path, number)
+                self.files.append(current)
+                hunk = None
+                continue
+            
+            if current is None:
+                continue
+            
+            if line.startswith('@@'):
+                match = HUNK_HEADER.match(line)
+                if match:
+                    hunk = DiffHunk(line, int(match.group(1)), int(match.group(2)), number)
+                    current.hunks.append(hunk)
+                    new_line = hunk.new_start
+                    continue
+            
+            if hunk is None:
+                # File header: ---/+++, index, mode and rename lines
+                if line.startswith('Binary files '):
+                    current.is_binary = True
+                continue
+            
+            hunk.last_line = number
+            if line.startswith('+'):
+                entry = (number, line[1:])
+                current.added.append(entry)
+                self.added.append(entry)
+                current.new_line_numbers[number] = new_line
+                new_line += 1
+            elif line.startswith('-'):
+                entry = (number, line[1:])
+                current.removed.append(entry)
+                self.removed.append(entry)
+            elif not line.startswith('\\'):
+                # Context line
+                new_line += 1
+    
+    def line_number(self, offset: int) -> int:
+        """1-based diff line containing character offset"""
+        return bisect_right(self.line_offsets, offset)
+    
+    def file_at(self, line_number: int) -> Optional[DiffFile]:
+        """File whose section contains a diff line number"""
+        index = bisect_right(self._file_starts, line_number) - 1
+        return self.files[index] if index >= 0 else None
+    
+    def locate(self, line_number: int) -> Tuple[Optional[str], Optional[int]]:
+        """(file path, line in the new file) for a diff line; the line is None unless it was added"""
+        diff_file = self.file_at(line_number)
+        if diff_file is None:
+            return None, None
+        return diff_file.path, diff_file.new_line_numbers.get(line_number)
+    
+    @property
+    def added_count(self) -> int:
+        return len(self.added)
+    
+    @property
+    def removed_count(self) -> int:
+        return len(self.removed)
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Precompiled multi-pattern scanner for the agents' regex checks
+Each pattern is compiled once with its flags, and patterns whose required
+literal text does not occur in the diff are skipped without running the regex
+"""
+
+import re
+from fnmatch import fnmatch
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+try:
+    import re._parser as sre_parse  # Python 3.11+
+except ImportError:
+    import sre_parse
+
+from agents.parsed_diff import DiffFile, ParsedDiff
+
+# Characters Python's re matches case-insensitively with an ASCII letter but
+# that str.lower() leaves alone: long s, dotless i, Kelvin sign
+_CASE_FOLD_EXTRAS = str.maketrans({'\u017f': 's', '\u0131': 'i', '\u212a': 'k'})
+
+# Literals shorter than this are too common to be worth checking
+MIN_LITERAL_LENGTH = 2
+
+
+def required_literals(pattern: str, flags: int = 0) -> Optional[List[str]]:
+    """Literal strings one of which must occur in any text the pattern matches.
+    
+    Looks only at the top level of the pattern: runs of plain characters
+    and groups that are an alternation of such runs. Returns the most
+    selective requirement found (lower-cased for IGNORECASE patterns), or
+    None if the pattern has no usable literal and must always run.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except re.error:
+        return None
+    
+    best = _requirement(list(parsed))
+    if not best or any(not literal.isascii() for literal in best):
+        return None
+    if (flags | parsed.state.flags) & re.IGNORECASE:
+        best = [literal.lower() for literal in best]
+    return best
+
+
+def _requirement(items: Sequence) -> Optional[List[str]]:
+    """Best any-of literal set required by a sequence of parsed regex items"""
+    candidates: List[List[str]] = []
+    run: List[str] = []
+    
+    def close_run():
+        if len(run) >= MIN_LITERAL_LENGTH:
+            candidates.append([''.join(run)])
+        run.clear()
+    
+    for op, value in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(value))
+            continue
+        close_run()
+        
+        if op is sre_parse.SUBPATTERN:
+            # (group, add_flags, del_flags, items); the group itself is not
+            # optional, but scoped flags like (?i:...) change how it matches
+            if not value[1] and not value[2]:
+                inner = _requirement(list(value[-1]))
+                if inner:
+                    candidates.append(inner)
+        elif op is sre_parse.BRANCH:
+            alternatives = [_requirement(list(branch)) for branch in value[1]]
+            if all(alternatives):
+                candidates.append([literal for alt in alternatives for literal in alt])
+    close_run()
+    
+    if not candidates:
+        return None
+    # Prefer the requirement whose shortest literal is longest, then fewer alternatives
+    return max(candidates, key=lambda literals: (min(map(len, literals)), -len(literals)))
+
+
+class ScanRule:
+    """One regex check, compiled once.
+    
+    languages and files (glob patterns matched against the file path)
+    limit the rule to matching files of the diff; a rule with neither
+    scans the whole diff text. The other fields are carried through for
+    the agents that report matches.
+    """
+    
+    __slots__ = ('name', 'pattern', 'regex', 'literals', 'category', 'severity',
+                 'message', 'languages', 'files', 'doc_regex', 'doc_position')
+    
+    def __init__(self, name: str, pattern: str, flags: int = re.IGNORECASE | re.MULTILINE,
+                 category: Optional[str] = None, severity: str = 'low', message: str = '',
+                 languages: Optional[Iterable[str]] = None, files: Optional[Iterable[str]] = None,
+                 doc_pattern: Optional[str] = None, doc_position: str = 'next'):
+        self.name = name
+        self.pattern = pattern
+        self.regex = re.compile(pattern, flags)
+        self.literals = required_literals(pattern, flags)
+        self.category = category or name
+        self.severity = severity
+        self.message = message
+        self.languages = frozenset(languages) if languages else None
+        self.files = tuple(files) if files else None
+        # Documentation rules: how to tell a definition is documented
+        self.doc_regex = re.compile(doc_pattern) if doc_pattern else None
+        self.doc_position = doc_position
+    
+    @property
+    def ignore_case(self) -> bool:
+        return bool(self.regex.flags & re.IGNORECASE)
+    
+    @property
+    def scoped(self) -> bool:
+        return self.languages is not None or self.files is not None
+    
+    def applies_to(self, diff_file: DiffFile) -> bool:
+        """Whether the rule should run on a file of the diff"""
+        if self.languages is not None and diff_file.language not in self.languages:
+            return False
+        if self.files is not None and not any(fnmatch(diff_file.path, glob) for glob in self.files):
+            return False
+        return True
+
+
+class PatternMatch(NamedTuple):
+    """A rule match; line is the 1-based line in the diff text"""
+    rule: ScanRule
+    start: int
+    text: str
+    line: int
+
+
+class PatternScanner:
+    """Runs a fixed set of rules over diffs.
+    
+    Scoped rules only run over the sections of files they apply to, so a
+    Python-only rule costs nothing on the JavaScript half of a diff.
+    Matches come back in rule order and, within a rule, in text order,
+    exactly as looping re.finditer over the patterns would return them.
+    Before running a rule's regex the scanner checks that one of its
+    required literals occurs in the diff (a plain substring search), so
+    most rules cost a fast memchr-style pass instead of a regex scan on
+    diffs that cannot match them.
+    """
+    
+    def __init__(self, rules: Iterable[Union[ScanRule, Tuple[str, str]]],
+                 flags: int = re.IGNORECASE | re.MULTILINE):
+        self.rules = [rule if isinstance(rule, ScanRule) else ScanRule(rule[0], rule[1], flags)
+                      for rule in rules]
+    
+    def rules_for(self, diff_file: DiffFile) -> List[ScanRule]:
+        """Rules that apply to one file of a diff"""
+        return [rule for rule in self.rules if rule.applies_to(diff_file)]
+    
+    def scan(self, parsed: ParsedDiff) -> List[PatternMatch]:
+        text = parsed.text
+        haystacks = {}
+        matches = []
+        
+        for rule in self.rules:
+            if rule.literals:
+                haystack = haystacks.get(rule.ignore_case)
+                if haystack is None:
+                    haystack = self._fold(text) if rule.ignore_case else text
+                    haystacks[rule.ignore_case] = haystack
+                if not any(literal in haystack for literal in rule.literals):
+                    continue
+            
+            if not rule.scoped:
+                spans = [(0, len(text))]
+            else:
+                # Only the sections of files the rule applies to; positions stay
+                # offsets into the whole diff so line numbers are unaffected
+                spans = [(f.start, f.end) for f in parsed.files if rule.applies_to(f)]
+            
+            for start, end in spans:
+                for match in rule.regex.finditer(text, start, end):
+                    matches.append(PatternMatch(rule, match.start(), match.group(0),
+                                                parsed.line_number(match.start())))
+        return matches
+    
+    @staticmethod
+    def _fold(text: str) -> str:
+        """Lower-case text so a substring test agrees with IGNORECASE matching"""
+        folded = text.lower()
+        if not text.isascii():
+            folded = folded.translate(_CASE_FOLD_EXTRAS)
+        return folded
@@ -0,0 +1,56 @@
+"""
+Progress events for the Electron UI
+Emitted on stdout as one JSON object per line
+"""
+
+import os
+import sys
+import json
+import time
+import threading
+from typing import Any
+
+
+class ProgressReporter:
+    """Writes timestamped JSON-line progress events to stdout.
+    
+    Every event carries "type": "progress" so the UI can tell them apart
+    from the human-readable lines printed by main(), and "elapsed_ms" since
+    the reporter was created (roughly process start) so time-to-first-token
+    can be shown without clock sync.
+    """
+    
+    def __init__(self, enabled: bool = True, stream=None):
+        self.enabled = enabled
+        self.stream = stream or sys.stdout
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+    
+    @classmethod
+    def from_env(cls) -> 'ProgressReporter':
+        """Enabled by PROGRESS_EVENTS, which defaults to SUMMARY_STREAMING"""
+        default = os.getenv('SUMMARY_STREAMING', 'false')
+        return cls(os.getenv('PROGRESS_EVENTS', default).lower() == 'true')
+    
+    def elapsed_ms(self) -> int:
+        """Milliseconds since the reporter was created"""
+        return int((time.monotonic() - self.started) * 1000)
+    
+    def emit(self, event: str, **fields: Any) -> None:
+        """Write one event line; a no-op when disabled"""
+        if not self.enabled:
+            return
+        
+        line = json.dumps({
+            'type': 'progress',
+            'event': event,
+            'elapsed_ms': self.elapsed_ms(),
+            **fields
+        }, default=str)
+        with self._lock:
+            try:
+                self.stream.write(line + '\n')
+                self.stream.flush()
+            except (OSError, ValueError):
+                # The UI went away; progress is best effort
+                pass
@@ -4,38 +4,11 @@ Code Quality Analyzer Agent
 Analyzes code changes for quality issues, best practices, and maintainability
 """
 
-import re
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from agents.base_agent import SpecializedAgent, AgentState
-
-# Code quality patterns to check
-QUALITY_PATTERNS = {
-    "long_functions": {
-        "pattern": r"def\s+\w+\s*\([^)]*\):[^\n]*\n(?:.*\n){50,}",
-        "message": "Function appears to be very long (50+ lines)"
-    },
-    "complex_conditions": {
-        "pattern": r"if\s+[^:]+(?:and|or)[^:]+(?:and|or)[^:]+:",
-        "message": "Complex conditional with multiple and/or operators"
-    },
-    "magic_numbers": {
-        "pattern": r"(?<!['\"])\b(?:86400|3600|1024|255|100|1000)\b(?!['\"])",
-        "message": "Magic number detected - consider using named constant"
-    },
-    "todo_fixme": {
-        "pattern": r"#\s*(?:TODO|FIXME|HACK|XXX)",
-        "message": "TODO/FIXME comment found"
-    },
-    "print_statements": {
-        "pattern": r"^\s*print\s*\(",
-        "message": "Print statement found - consider using logging"
-    },
-    "bare_except": {
-        "pattern": r"except\s*:",
-        "message": "Bare except clause - should catch specific exceptions"
-    },
-}
+from agents.parsed_diff import ParsedDiff
+from agents.rule_packs import get_rule_packs
 
 QUALITY_PROMPT = """You are a code quality expert analyzing code changes for best practices and maintainability.
 
@@ -91,23 +64,25 @@ class QualityAgent(SpecializedAgent):
     def analyze(self, state: AgentState) -> AgentState:
         """Analyze code for quality issues"""
         # First, do pattern-based analysis
-        git_diff = state.get("git_diff", "")
-        pattern_results = self._analyze_patterns(git_diff)
+        parsed = self.get_parsed_diff(state)
+        pattern_results = self._analyze_patterns(parsed)
         
         # Calculate quick metrics
-        metrics = self._calculate_metrics(git_diff)
+        metrics = self._calculate_metrics(parsed)
         
-        # If patterns found issues or diff is substantial, use LLM
-        if pattern_results["issues_found"] > 2 or len(git_diff) > 500:
+        # More than a couple of pattern hits go to the LLM; otherwise the gate decides
+        decision = self.gate_llm(state, pattern_results["issues_found"])
+        if decision.use_llm:
             # Call parent analyze method for LLM analysis
             state = super().analyze(state)
+            self.record_llm_verdict(state, decision)
             
             # Merge pattern results with LLM results
             if "agent_quality" in state and "analysis" in state["agent_quality"]:
                 state["agent_quality"]["pattern_analysis"] = pattern_results
                 state["agent_quality"]["quick_metrics"] = metrics
         else:
-            # Just use pattern analysis for small changes
+            # Static results were conclusive; skip the LLM
             state = self.update_state(state, {
                 "analysis": {
                     "quality_score": 100 - (pattern_results["issues_found"] * 10),
@@ -124,24 +99,19 @@ class QualityAgent(SpecializedAgent):
             
         return state
     
-    def _analyze_patterns(self, diff: str) -> Dict[str, Any]:
+    def _analyze_patterns(self, parsed: ParsedDiff) -> Dict[str, Any]:
         """Quick pattern-based quality analysis"""
         issues = []
         
-        for check_name, check_data in QUALITY_PATTERNS.items():
-            pattern = check_data["pattern"]
-            matches = re.finditer(pattern, diff, re.IGNORECASE | re.MULTILINE)
-            
-            for match in matches:
-                # Find line number in diff
-                line_num = diff[:match.start()].count('\n') + 1
-                issues.append({
-                    "type": check_name,
-                    "severity": "medium" if check_name in ["bare_except", "long_functions"] else "low",
-                    "description": check_data["message"],
-                    "location": f"line:{line_num}",
-                    "match": match.group(0)[:50] + "..." if len(match.group(0)) > 50 else match.group(0)
-                })
+        # Checks live in rules/quality.yaml plus any packs from RULE_PACK_PATHS
+        for match in get_rule_packs().get("quality").scanner.scan(parsed):
+            issues.append({
+                "type": match.rule.category,
+                "severity": match.rule.severity,
+                "description": match.rule.message,
+                "location": f"line:{match.line}",
+                "match": match.text[:50] + "..." if len(match.text) > 50 else match.text
+            })
         
         return {
             "issues_found": len(issues),
@@ -149,16 +119,14 @@ class QualityAgent(SpecializedAgent):
             "checks_triggered": list(set(issue["type"] for issue in issues))
         }
     
-    def _calculate_metrics(self, diff: str) -> Dict[str, str]:
+    def _calculate_metrics(self, parsed: ParsedDiff) -> Dict[str, str]:
         """Calculate quick code metrics"""
-        lines = diff.split('\n')
-        
         # Count various elements
-        added_lines = sum(1 for line in lines if line.startswith('+') and not line.startswith('+++'))
-        comment_lines = sum(1 for line in lines if line.strip().startswith('#') and line.startswith('+'))
+        added_lines = parsed.added_count
+        comment_lines = sum(1 for _, text in parsed.added if text.strip().startswith('#'))
         
         # Simple complexity estimation
-        complexity_indicators = sum(1 for line in lines if any(keyword in line for keyword in ['if', 'for', 'while', 'try']))
+        complexity_indicators = sum(1 for line in parsed.lines if any(keyword in line for keyword in ['if', 'for', 'while', 'try']))
         
         # Determine ratings
         complexity = "high" if complexity_indicators > 10 else "medium" if complexity_indicators > 5 else "low"
@@ -174,6 +142,12 @@ class QualityAgent(SpecializedAgent):
             "comment_ratio": f"{comment_ratio:.2%}"
         }
     
+    def llm_verdict_clean(self, analysis: Dict[str, Any]) -> Optional[bool]:
+        score = analysis.get("quality_score")
+        if not isinstance(score, (int, float)):
+            return None
+        return score >= 70
+    
     def process_response(self, response: str) -> Dict[str, Any]:
         """Process and validate quality analysis response"""
         try:
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Repository access layer for Auto-Brainlift
+One GitPython Repo per project per process; commits are read through git's
+persistent cat-file process instead of a new Repo per lookup
+"""
+
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+
+import git
+
+logger = logging.getLogger(__name__)
+
+# git's well-known empty tree, the parent side of a first commit's diff
+EMPTY_TREE_SHA = '4b825dc642cb6eb9a060e54bf8d69288fbee4904'
+
+
+class Repository:
+    """Shared access to one Git repository.
+    
+    GitPython keeps `git cat-file --batch` running per Repo and reads every
+    commit, tree and blob through it, so reading objects costs no process
+    spawns. Those pipes are not safe to use from several threads at once,
+    so all object reads go through one lock.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self.repo = git.Repo(self.path)
+        self._lock = threading.RLock()
+        
+        self.stats = {
+            'commits_read': 0,
+            'git_subprocess_diffs': 0
+        }
+    
+    def commit(self, rev: Optional[str] = None) -> git.Commit:
+        """Commit for rev (HEAD if None) with its metadata already loaded"""
+        with self._lock:
+            commit = self.repo.commit(rev) if rev else self.repo.head.commit
+            # Parse the object now so later attribute access needs no lock
+            _ = commit.message, commit.author, commit.committed_date, commit.parents
+            self.stats['commits_read'] += 1
+            return commit
+    
+    def head_sha(self) -> str:
+        """Hex SHA of HEAD"""
+        with self._lock:
+            return self.repo.head.commit.hexsha
+    
+    def commit_diff(self, commit: git.Commit) -> str:
+        """`git diff --full-index` of a commit against its first parent.
+        
+        The first commit is diffed against the empty tree. git's own diff
+        keeps its hunks, function context and rename detection, and one
+        `git diff` costs far less than the Repo and cat-file processes the
+        old per-commit path started.
+        """
+        parent = commit.parents[0].hexsha if commit.parents else EMPTY_TREE_SHA
+        return self._git_diff(parent, commit.hexsha, '--full-index')
+    
+    def wip_diff(self, *args: str) -> str:
+        """`git diff <args>` for working-tree changes"""
+        return self._git_diff(*args)
+    
+    def _git_diff(self, *args: str) -> str:
+        # A separate git process, so it runs outside the cat-file lock
+        with self._lock:
+            self.stats['git_subprocess_diffs'] += 1
+        return self.repo.git.diff(*args)
+    
+    def close(self) -> None:
+        """Stop the persistent git processes"""
+        with self._lock:
+            self.repo.close()
+
+
+_repositories: Dict[Path, Repository] = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(path: Union[str, Path]) -> Repository:
+    """The process-wide Repository for path (created on first use)"""
+    key = Path(path).resolve()
+    with _repositories_lock:
+        repository = _repositories.get(key)
+        if repository is None:
+            repository = Repository(key)
+            _repositories[key] = repository
+            logger.debug(f"Opened repository {key}")
+        return repository
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Declarative rule packs for the pattern-based agents
+Packs are YAML or JSON files of regex rules with severity and language or
+file-glob scoping; they are loaded and compiled once per process
+"""
+
+import os
+import re
+import json
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+from agents.pattern_scanner import PatternScanner, ScanRule
+
+logger = logging.getLogger(__name__)
+
+# Packs shipped with the app
+BUILTIN_RULES_DIR = Path(__file__).parent.parent / "rules"
+
+PACK_SUFFIXES = ('.yaml', '.yml', '.json')
+SEVERITIES = ('high', 'medium', 'low', 'info')
+FLAG_NAMES = {
+    'ignorecase': 'IGNORECASE',
+    'multiline': 'MULTILINE',
+    'dotall': 'DOTALL',
+    'verbose': 'VERBOSE'
+}
+
+
+class RulePackError(ValueError):
+    """A rule pack file that cannot be loaded"""
+    pass
+
+
+class RulePack:
+    """The rules of one pack (e.g. "security") and the scanner compiled from them"""
+    
+    def __init__(self, name: str, rules: List[ScanRule], sources: List[str]):
+        self.name = name
+        self.rules = rules
+        self.sources = sources
+        self.scanner = PatternScanner(rules)
+    
+    def rules_for(self, diff_file) -> List[ScanRule]:
+        return self.scanner.rules_for(diff_file)
+    
+    def __len__(self) -> int:
+        return len(self.rules)
+
+
+def _flags(names: List[str], source: str) -> int:
+    flags = 0
+    for name in names:
+        attr = FLAG_NAMES.get(str(name).lower())
+        if attr is None:
+            raise RulePackError(f"{source}: unknown regex flag '{name}'")
+        flags |= getattr(re, attr)
+    return flags
+
+
+def _read_pack_file(path: Path) -> Dict[str, Any]:
+    """Parse one pack file into its raw mapping"""
+    try:
+        with open(path) as f:
+            data = json.load(f) if path.suffix == '.json' else yaml.safe_load(f)
+    except (OSError, json.JSONDecodeError, yaml.YAMLError) as e:
+        raise RulePackError(f"{path}: {e}") from e
+    
+    if not isinstance(data, dict) or not isinstance(data.get('rules'), list):
+        raise RulePackError(f"{path}: expected a mapping with a 'rules' list")
+    return data
+
+
+def _compile_rule(raw: Dict[str, Any], defaults: Dict[str, Any], source: str) -> ScanRule:
+    """Validate one rule entry (with the pack's defaults applied) and compile it"""
+    entry = {**defaults, **raw}
+    rule_id = entry.get('id')
+    if not rule_id or not entry.get('pattern'):
+        raise RulePackError(f"{source}: every rule needs an id and a pattern ({raw})")
+    
+    severity = entry.get('severity', 'low')
+    if severity not in SEVERITIES:
+        raise RulePackError(f"{source}: rule {rule_id} has severity '{severity}', expected one of {SEVERITIES}")
+    
+    try:
+        return ScanRule(
+            rule_id,
+            entry['pattern'],
+            flags=_flags(entry.get('flags', ['ignorecase', 'multiline']), source),
+            category=entry.get('category'),
+            severity=severity,
+            message=entry.get('message', ''),
+            languages=entry.get('languages'),
+            files=entry.get('files'),
+            doc_pattern=entry.get('doc_pattern'),
+            doc_position=entry.get('doc_position', 'next')
+        )
+    except re.error as e:
+        raise RulePackError(f"{source}: rule {rule_id} does not compile: {e}") from e
+
+
+def _pack_paths(directory: Path) -> List[Path]:
+    if directory.is_file():
+        return [directory]
+    if not directory.is_dir():
+        return []
+    return sorted(p for p in directory.iterdir() if p.suffix in PACK_SUFFIXES)
+
+
+class RulePackRegistry:
+    """All rule packs, by name.
+    
+    Built-in packs load first, then every directory or file listed in
+    RULE_PACK_PATHS (separated like PATH). A later file with the same pack
+    name extends it: rules with a new id are appended, an existing id is
+    replaced, and `enabled: false` drops the rule. Errors in built-in
+    packs raise; a broken extra pack is logged and skipped so a typo in a
+    team's rules can't stop summaries.
+    """
+    
+    def __init__(self, builtin_dir: Path = BUILTIN_RULES_DIR,
+                 extra_paths: Optional[List[Path]] = None):
+        rules: Dict[str, Dict[str, ScanRule]] = {}
+        sources: Dict[str, List[str]] = {}
+        
+        for path in _pack_paths(builtin_dir):
+            self._merge(path, rules, sources)
+        
+        for extra in extra_paths or []:
+            for path in _pack_paths(Path(extra)):
+                try:
+                    self._merge(path, rules, sources)
+                except RulePackError as e:
+                    logger.error(f"Skipping rule pack {e}")
+        
+        self.packs = {name: RulePack(name, list(pack_rules.values()), sources[name])
+                      for name, pack_rules in rules.items()}
+        summary = ", ".join(f"{name} ({len(pack)})" for name, pack in self.packs.items())
+        logger.info(f"Loaded rule packs: {summary}")
+    
+    @staticmethod
+    def _merge(path: Path, rules: Dict[str, Dict[str, ScanRule]],
+               sources: Dict[str, List[str]]) -> None:
+        data = _read_pack_file(path)
+        name = data.get('pack') or path.stem
+        defaults = data.get('defaults') or {}
+        
+        # Compile the whole file before touching the registry so a bad rule
+        # leaves the pack as it was
+        compiled = []
+        for raw in data['rules']:
+            if not isinstance(raw, dict):
+                raise RulePackError(f"{path}: rule entries must be mappings")
+            if raw.get('enabled', True) is False:
+                compiled.append((raw.get('id'), None))
+            else:
+                compiled.append((raw.get('id'), _compile_rule(raw, defaults, str(path))))
+        
+        pack_rules = rules.setdefault(name, {})
+        for rule_id, rule in compiled:
+            if rule is None:
+                pack_rules.pop(rule_id, None)
+            else:
+                pack_rules[rule_id] = rule
+        sources.setdefault(name, []).append(str(path))
+    
+    def get(self, name: str) -> RulePack:
+        """A pack by name; an empty pack if none was loaded"""
+        pack = self.packs.get(name)
+        if pack is None:
+            pack = RulePack(name, [], [])
+        return pack
+
+
+_registry: Optional[RulePackRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_rule_packs() -> RulePackRegistry:
+    """The process-wide registry, loaded on first use"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            extra = [Path(p) for p in os.getenv('RULE_PACK_PATHS', '').split(os.pathsep) if p]
+            _registry = RulePackRegistry(extra_paths=extra)
+        return _registry
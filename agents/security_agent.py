@@ -4,37 +4,11 @@ Security Scanner Agent
 Analyzes code changes for potential security vulnerabilities
 """
 
-import re
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from agents.base_agent import SpecializedAgent, AgentState
-
-# Security patterns to check
-SECURITY_PATTERNS = {
-    "hardcoded_secrets": [
-        r"api[_-]?key\s*=\s*['\"][^'\"]+['\"]",
-        r"password\s*=\s*['\"][^'\"]+['\"]",
-        r"secret\s*=\s*['\"][^'\"]+['\"]",
-        r"token\s*=\s*['\"][^'\"]+['\"]",
-    ],
-    "sql_injection": [
-        r"execute\s*\(\s*['\"].*%s.*['\"].*%",
-        r"cursor\.execute\s*\(\s*f['\"]",
-        r"query\s*=\s*['\"].*\+.*['\"]",
-    ],
-    "unsafe_deserialization": [
-        r"pickle\.loads?\s*\(",
-        r"eval\s*\(",
-        r"exec\s*\(",
-    ],
-    "insecure_random": [
-        r"random\.\w+\s*\(",  # Using random instead of secrets
-    ],
-    "command_injection": [
-        r"os\.system\s*\(",
-        r"subprocess\.\w+\s*\([^,]+shell\s*=\s*True",
-    ],
-}
+from agents.parsed_diff import ParsedDiff
+from agents.rule_packs import get_rule_packs
 
 SECURITY_PROMPT = """You are a security expert analyzing code changes for potential vulnerabilities.
 
@@ -82,19 +56,20 @@ class SecurityAgent(SpecializedAgent):
     def analyze(self, state: AgentState) -> AgentState:
         """Analyze code for security issues"""
         # First, do pattern-based analysis
-        git_diff = state.get("git_diff", "")
-        pattern_results = self._analyze_patterns(git_diff)
+        pattern_results = self._analyze_patterns(self.get_parsed_diff(state))
         
-        # If patterns found issues or diff is substantial, use LLM
-        if pattern_results["issues_found"] or len(git_diff) > 500:
+        # Any pattern hit goes to the LLM; otherwise the gate decides
+        decision = self.gate_llm(state, len(pattern_results["pattern_matches"]))
+        if decision.use_llm:
             # Call parent analyze method for LLM analysis
             state = super().analyze(state)
+            self.record_llm_verdict(state, decision)
             
             # Merge pattern results with LLM results
             if "agent_security" in state and "analysis" in state["agent_security"]:
                 state["agent_security"]["pattern_analysis"] = pattern_results
         else:
-            # Just use pattern analysis for small changes
+            # Static results were conclusive; skip the LLM
             state = self.update_state(state, {
                 "analysis": {
                     "severity": "none",
@@ -109,22 +84,22 @@ class SecurityAgent(SpecializedAgent):
             
         return state
     
-    def _analyze_patterns(self, diff: str) -> Dict[str, Any]:
+    def _analyze_patterns(self, parsed: ParsedDiff) -> Dict[str, Any]:
         """Quick pattern-based security analysis"""
         issues = []
         
-        for category, patterns in SECURITY_PATTERNS.items():
-            for pattern in patterns:
-                matches = re.finditer(pattern, diff, re.IGNORECASE | re.MULTILINE)
-                for match in matches:
-                    # Find line number in diff
-                    line_num = diff[:match.start()].count('\n') + 1
-                    issues.append({
-                        "category": category,
-                        "pattern": pattern,
-                        "match": match.group(0),
-                        "line": line_num
-                    })
+        # Checks live in rules/security.yaml plus any packs from RULE_PACK_PATHS
+        for match in get_rule_packs().get("security").scanner.scan(parsed):
+            file_path, _ = parsed.locate(match.line)
+            issues.append({
+                "category": match.rule.category,
+                "rule": match.rule.name,
+                "severity": match.rule.severity,
+                "pattern": match.rule.pattern,
+                "match": match.text,
+                "line": match.line,
+                "file": file_path
+            })
         
         return {
             "issues_found": len(issues) > 0,
@@ -132,6 +107,12 @@ class SecurityAgent(SpecializedAgent):
             "categories_triggered": list(set(issue["category"] for issue in issues))
         }
     
+    def llm_verdict_clean(self, analysis: Dict[str, Any]) -> Optional[bool]:
+        severity = analysis.get("severity")
+        if severity is None:
+            return None
+        return severity in ("none", "low")
+    
     def process_response(self, response: str) -> Dict[str, Any]:
         """Process and validate security analysis response"""
         try:
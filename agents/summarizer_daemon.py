@@ -0,0 +1,376 @@
+#!/usr/bin/env python3
+"""
+Resident summarizer daemon for Auto-Brainlift
+Keeps one warm GitCommitSummarizer per project and takes jobs over a Unix socket
+"""
+
+import os
+import sys
+import json
+import time
+import queue
+import socket
+import hashlib
+import logging
+import tempfile
+import threading
+import itertools
+import socketserver
+import subprocess
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+logger = logging.getLogger(__name__)
+
+# Job statuses streamed back to clients, one JSON object per line
+QUEUED, RUNNING, DONE, ERROR = 'queued', 'running', 'done', 'error'
+FINAL_STATUSES = (DONE, ERROR)
+
+
+def project_path_from_env() -> Path:
+    """Project the summarizer works on (same rule as GitCommitSummarizer)"""
+    return Path(os.getenv("PROJECT_PATH") or Path.cwd()).resolve()
+
+
+def socket_path_for(project_path: Path) -> Path:
+    """Per-project socket in the temp dir, short enough for AF_UNIX path limits"""
+    digest = hashlib.md5(str(Path(project_path).resolve()).encode()).hexdigest()[:12]
+    return Path(tempfile.gettempdir()) / f"auto-brainlift-{digest}.sock"
+
+
+def daemon_supported() -> bool:
+    """Unix sockets are required (not available on older Windows Pythons)"""
+    return hasattr(socket, 'AF_UNIX')
+
+
+class Job:
+    """A queued summarizer request and the clients waiting on it"""
+    
+    _ids = itertools.count(1)
+    
+    def __init__(self, kind: str, args: Dict[str, Any]):
+        self.id = next(self._ids)
+        self.kind = kind
+        self.args = args
+        self.status = QUEUED
+        self.last_message: Dict[str, Any] = {}
+        self.subscribers: List['queue.Queue[Dict[str, Any]]'] = []
+        self.lock = threading.Lock()
+    
+    @property
+    def key(self) -> str:
+        """Identical requests share one job"""
+        return f"{self.kind}:{json.dumps(self.args, sort_keys=True)}"
+    
+    def subscribe(self) -> 'queue.Queue[Dict[str, Any]]':
+        """Receive this job's status updates, starting with the latest one"""
+        updates: 'queue.Queue[Dict[str, Any]]' = queue.Queue()
+        with self.lock:
+            if self.last_message:
+                updates.put(self.last_message)
+            if self.status not in FINAL_STATUSES:
+                self.subscribers.append(updates)
+        return updates
+    
+    def publish(self, status: str, **fields) -> None:
+        """Record a status change and send it to every subscriber"""
+        message = {'job_id': self.id, 'kind': self.kind, 'status': status, **fields}
+        with self.lock:
+            self.status = status
+            self.last_message = message
+            subscribers = list(self.subscribers)
+            if status in FINAL_STATUSES:
+                self.subscribers.clear()
+        for updates in subscribers:
+            updates.put(message)
+
+
+class SummarizerDaemon:
+    """Runs summarizer jobs one at a time against a single warm GitCommitSummarizer"""
+    
+    def __init__(self, project_path: Path, idle_timeout: float = 1800):
+        self.project_path = Path(project_path)
+        self.socket_path = socket_path_for(self.project_path)
+        self.idle_timeout = idle_timeout
+        
+        self.jobs: 'queue.Queue[Job]' = queue.Queue()
+        self.active: Dict[str, Job] = {}
+        self.active_lock = threading.Lock()
+        self.last_activity = time.monotonic()
+        self.completed = 0
+        self.failed = 0
+        
+        self.summarizer = None
+        self.server: Optional[socketserver.BaseServer] = None
+        self._stop = threading.Event()
+    
+    def submit(self, kind: str, args: Dict[str, Any]) -> Job:
+        """Queue a job, or return the queued/running job for the same request"""
+        job = Job(kind, args)
+        with self.active_lock:
+            existing = self.active.get(job.key)
+            if existing is not None:
+                return existing
+            self.active[job.key] = job
+            position = self.jobs.qsize() + 1
+            job.publish(QUEUED, position=position)
+            self.jobs.put(job)
+        self.last_activity = time.monotonic()
+        return job
+    
+    def _worker(self) -> None:
+        """Process jobs in order until the daemon stops"""
+        while not self._stop.is_set():
+            try:
+                job = self.jobs.get(timeout=1)
+            except queue.Empty:
+                if self.idle_timeout and time.monotonic() - self.last_activity > self.idle_timeout:
+                    logger.info("Summarizer daemon idle, shutting down")
+                    self.stop()
+                continue
+            
+            job.publish(RUNNING)
+            started = time.monotonic()
+            try:
+                result = self._run(job)
+                self.completed += 1
+                job.publish(
+                    DONE,
+                    output_files=result.get('output_files', {}),
+                    cache_hit=bool(result.get('cache_hit')),
+                    elapsed_seconds=round(time.monotonic() - started, 3)
+                )
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Summarizer job {job.id} failed: {e}")
+                job.publish(ERROR, error=str(e), elapsed_seconds=round(time.monotonic() - started, 3))
+            finally:
+                with self.active_lock:
+                    self.active.pop(job.key, None)
+                self.last_activity = time.monotonic()
+    
+    def _run(self, job: Job) -> Dict[str, Any]:
+        """Dispatch a job to the warm summarizer"""
+        if job.kind == 'commit':
+            return self.summarizer.process_commit(job.args.get('commit_hash'))
+        if job.kind == 'wip':
+            return self.summarizer.process_wip(job.args.get('mode', 'all'))
+        raise ValueError(f"Unknown job type: {job.kind}")
+    
+    def status(self) -> Dict[str, Any]:
+        """Daemon health for the status command"""
+        return {
+            'status': 'ok',
+            'pid': os.getpid(),
+            'project_path': str(self.project_path),
+            'queued': self.jobs.qsize(),
+            'completed': self.completed,
+            'failed': self.failed
+        }
+    
+    def serve_forever(self) -> None:
+        """Warm up the summarizer, bind the socket and serve until stopped"""
+        if is_daemon_running(self.socket_path):
+            logger.info(f"Summarizer daemon already running at {self.socket_path}")
+            return
+        if self.socket_path.exists():
+            # Left over from a daemon that did not shut down cleanly
+            self.socket_path.unlink()
+        
+        started = time.monotonic()
+        os.environ.setdefault("PROJECT_PATH", str(self.project_path))
+        from agents.langgraph_agent import GitCommitSummarizer
+        self.summarizer = GitCommitSummarizer()
+        logger.info(f"Warmed up summarizer in {time.monotonic() - started:.2f}s")
+        
+        daemon = self
+        
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                try:
+                    request = json.loads(self.rfile.readline() or b'{}')
+                except json.JSONDecodeError:
+                    self._send({'status': ERROR, 'error': 'Invalid request'})
+                    return
+                daemon.last_activity = time.monotonic()
+                
+                kind = request.get('type')
+                if kind == 'ping':
+                    self._send(daemon.status())
+                    return
+                if kind == 'shutdown':
+                    self._send({'status': 'stopping'})
+                    threading.Thread(target=daemon.stop, daemon=True).start()
+                    return
+                if kind not in ('commit', 'wip'):
+                    self._send({'status': ERROR, 'error': f"Unknown request type: {kind}"})
+                    return
+                
+                job = daemon.submit(kind, {k: v for k, v in request.items() if k != 'type'})
+                updates = job.subscribe()
+                while True:
+                    message = updates.get()
+                    if not self._send(message) or message['status'] in FINAL_STATUSES:
+                        break
+            
+            def _send(self, message: Dict[str, Any]) -> bool:
+                try:
+                    self.wfile.write((json.dumps(message) + '\n').encode())
+                    self.wfile.flush()
+                    return True
+                except OSError:
+                    # Client went away; the job keeps running for others
+                    return False
+        
+        self.server = socketserver.ThreadingUnixStreamServer(str(self.socket_path), Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o600)
+        
+        worker = threading.Thread(target=self._worker, name='summarizer-worker', daemon=True)
+        worker.start()
+        
+        logger.info(f"Summarizer daemon listening on {self.socket_path} (pid {os.getpid()})")
+        try:
+            self.server.serve_forever()
+        finally:
+            self.server.server_close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+            if self.summarizer is not None and self.summarizer.cache_manager:
+                self.summarizer.cache_manager.close()
+            logger.info("Summarizer daemon stopped")
+    
+    def stop(self) -> None:
+        """Stop accepting jobs and shut the server down"""
+        self._stop.set()
+        if self.server is not None:
+            self.server.shutdown()
+
+
+def _request(socket_path: Path, message: Dict[str, Any],
+             timeout: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """Send one request and yield status lines until the server closes the connection"""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(str(socket_path))
+        sock.settimeout(timeout)
+        sock.sendall((json.dumps(message) + '\n').encode())
+        with sock.makefile('rb') as reader:
+            for line in reader:
+                yield json.loads(line)
+
+
+def is_daemon_running(socket_path: Optional[Path] = None) -> bool:
+    """Whether a daemon answers on the project's socket"""
+    if not daemon_supported():
+        return False
+    socket_path = socket_path or socket_path_for(project_path_from_env())
+    if not socket_path.exists():
+        return False
+    try:
+        return any(reply.get('status') == 'ok' for reply in _request(socket_path, {'type': 'ping'}, timeout=5))
+    except (OSError, ValueError):
+        return False
+
+
+def submit_job(kind: str, timeout: Optional[float] = 600,
+               socket_path: Optional[Path] = None, **args) -> Optional[Dict[str, Any]]:
+    """Run a job on the daemon and return its final status.
+    
+    Returns None when no daemon is reachable so callers can fall back to
+    running the summarizer themselves.
+    """
+    if not daemon_supported():
+        return None
+    socket_path = socket_path or socket_path_for(project_path_from_env())
+    if not socket_path.exists():
+        return None
+    
+    final = None
+    try:
+        for message in _request(socket_path, {'type': kind, **args}, timeout=timeout):
+            logger.info(f"Daemon job {message.get('job_id')}: {message.get('status')}")
+            final = message
+    except (ConnectionRefusedError, FileNotFoundError):
+        return None
+    except (OSError, ValueError) as e:
+        if final is None:
+            return None
+        return {'status': ERROR, 'error': f"Lost connection to summarizer daemon: {e}"}
+    
+    if final is None or final.get('status') not in FINAL_STATUSES:
+        return {'status': ERROR, 'error': 'Summarizer daemon closed the connection before the job finished'}
+    return final
+
+
+def start_daemon_process() -> bool:
+    """Launch a detached daemon for the current project"""
+    if not daemon_supported():
+        return False
+    
+    venv_python = Path(__file__).parent.parent / "venv" / "bin" / "python"
+    python_cmd = str(venv_python) if venv_python.exists() else sys.executable
+    
+    log_dir = Path(__file__).parent.parent / "logs"
+    log_dir.mkdir(exist_ok=True)
+    with open(log_dir / "summarizer_daemon.out", 'a') as out:
+        subprocess.Popen(
+            [python_cmd, str(Path(__file__).resolve()), 'start'],
+            stdin=subprocess.DEVNULL,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,  # Survive the hook process exiting
+            env={**os.environ, 'PROJECT_PATH': str(project_path_from_env())}
+        )
+    return True
+
+
+def main():
+    """Command line entry point: start | stop | status"""
+    from dotenv import load_dotenv
+    load_dotenv()
+    
+    log_dir = Path(__file__).parent.parent / "logs"
+    log_dir.mkdir(exist_ok=True)
+    logging.basicConfig(
+        level=logging.INFO,
+        format='[%(asctime)s] %(levelname)s: %(message)s',
+        handlers=[
+            logging.FileHandler(log_dir / "summarizer_daemon.log"),
+            logging.StreamHandler()
+        ]
+    )
+    
+    command = sys.argv[1] if len(sys.argv) > 1 else 'start'
+    socket_path = socket_path_for(project_path_from_env())
+    
+    if not daemon_supported():
+        print("❌ The summarizer daemon needs Unix domain sockets, which this platform does not support")
+        sys.exit(1)
+    
+    if command == 'start':
+        idle_timeout = float(os.getenv('SUMMARIZER_DAEMON_IDLE_TIMEOUT', '1800'))
+        SummarizerDaemon(project_path_from_env(), idle_timeout=idle_timeout).serve_forever()
+    elif command == 'stop':
+        try:
+            for reply in _request(socket_path, {'type': 'shutdown'}, timeout=5):
+                print(f"Daemon: {reply.get('status')}")
+        except OSError:
+            print("No summarizer daemon running")
+    elif command == 'status':
+        try:
+            for reply in _request(socket_path, {'type': 'ping'}, timeout=5):
+                print(json.dumps(reply, indent=2))
+        except OSError:
+            print("No summarizer daemon running")
+            sys.exit(1)
+    else:
+        print(f"Usage: {Path(__file__).name} [start|stop|status]")
+        sys.exit(2)
+
+
+if __name__ == "__main__":
+    main()
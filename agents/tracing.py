@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+Tracing for Auto-Brainlift
+Records one JSON-lines span per graph node, agent run and workflow, with
+wall time, queue wait, tokens and cache outcome, and optionally mirrors
+them to OpenTelemetry
+"""
+
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:  # OpenTelemetry export is optional
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+# Same directory the agents log to
+DEFAULT_TRACE_FILE = Path(__file__).parent.parent / "logs" / "traces.jsonl"
+
+# The span file is rotated to traces.jsonl.1 once it grows past this
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+_current_span: contextvars.ContextVar[Optional['Span']] = contextvars.ContextVar('current_span', default=None)
+
+
+class Span:
+    """One timed unit of work.
+    
+    Tokens can be added from any thread (map-reduce workers report into
+    the condense_diff span), so the counters are guarded by a lock.
+    """
+    
+    def __init__(self, name: str, kind: str, trace_id: str,
+                 parent: Optional['Span'] = None,
+                 queue_wait_ms: Optional[float] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent = parent
+        self.queue_wait_ms = queue_wait_ms
+        self.attributes = dict(attributes or {})
+        self.tokens = 0
+        self.cache: Optional[str] = None
+        self.status = 'ok'
+        self.error: Optional[str] = None
+        
+        self.start_time = time.time()
+        self._started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self._otel = None
+        self._lock = threading.Lock()
+    
+    def set(self, **attributes: Any) -> None:
+        """Attach attributes (chunk counts, model, diff size...)"""
+        with self._lock:
+            self.attributes.update(attributes)
+    
+    def add_tokens(self, tokens: int) -> None:
+        """Count tokens spent by an LLM call made inside this span"""
+        with self._lock:
+            self.tokens += tokens
+    
+    def set_cache(self, outcome: Optional[str]) -> None:
+        """Cache outcome for the span: 'hit', 'miss' or None when no cache applies"""
+        self.cache = outcome
+    
+    def fail(self, error: str) -> None:
+        """Mark the span as failed without raising (e.g. an agent that returned an error)"""
+        self.status = 'error'
+        self.error = error
+    
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'type': 'span',
+                'trace_id': self.trace_id,
+                'span_id': self.span_id,
+                'parent_id': self.parent.span_id if self.parent else None,
+                'name': self.name,
+                'kind': self.kind,
+                'start': self.start_time,
+                'duration_ms': self.duration_ms,
+                'queue_wait_ms': self.queue_wait_ms,
+                'tokens': self.tokens,
+                'cache': self.cache,
+                'status': self.status,
+                'error': self.error,
+                'attributes': dict(self.attributes)
+            }
+
+
+class Tracer:
+    """Writes finished spans as JSON lines, one per line, to a shared file.
+    
+    Spans are appended under a lock as soon as they end, so a crashed run
+    still leaves the spans that completed. With otel=True and the
+    opentelemetry API installed every span is also started as an
+    OpenTelemetry span; which exporter receives them is up to the SDK
+    configuration of the process.
+    """
+    
+    def __init__(self, path: Optional[Path] = DEFAULT_TRACE_FILE, enabled: bool = True,
+                 otel: bool = False, max_bytes: int = DEFAULT_MAX_BYTES,
+                 resource: Optional[Dict[str, Any]] = None):
+        self.path = Path(path) if path else None
+        self.enabled = enabled
+        self.max_bytes = max_bytes
+        # Fields added to every span, e.g. the project name
+        self.resource = dict(resource or {})
+        self._lock = threading.Lock()
+        
+        self.otel_tracer = None
+        if enabled and otel:
+            if otel_trace is None:
+                logger.warning("TRACING_OTEL is set but opentelemetry is not installed; writing JSON spans only")
+            else:
+                self.otel_tracer = otel_trace.get_tracer("auto-brainlift")
+        
+        if self.enabled and self.path:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+    
+    @classmethod
+    def from_env(cls) -> 'Tracer':
+        """Configured by TRACING_ENABLED, TRACE_FILE, TRACE_MAX_BYTES and TRACING_OTEL"""
+        return cls(
+            path=Path(os.getenv('TRACE_FILE', str(DEFAULT_TRACE_FILE))),
+            enabled=os.getenv('TRACING_ENABLED', 'true').lower() == 'true',
+            otel=os.getenv('TRACING_OTEL', 'false').lower() == 'true',
+            max_bytes=int(os.getenv('TRACE_MAX_BYTES', str(DEFAULT_MAX_BYTES))),
+            resource={'project': os.getenv('PROJECT_NAME') or Path(os.getenv('PROJECT_PATH', os.getcwd())).name}
+        )
+    
+    @contextmanager
+    def span(self, name: str, kind: str = 'internal', parent: Optional[Span] = None,
+             trace_id: Optional[str] = None, queue_wait_ms: Optional[float] = None,
+             **attributes: Any) -> Iterator[Span]:
+        """Time the enclosed block as a span.
+        
+        The parent defaults to the span current in this thread (or context);
+        spans started on other threads pass parent explicitly. A span with
+        no parent starts a new trace unless trace_id is given.
+        """
+        if parent is None:
+            parent = _current_span.get()
+        if trace_id is None:
+            trace_id = parent.trace_id if parent else uuid.uuid4().hex
+        
+        span = Span(name, kind, trace_id, parent, queue_wait_ms, attributes)
+        if self.otel_tracer is not None:
+            self._start_otel(span)
+        
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.fail(f"{type(e).__name__}: {e}")
+            raise
+        finally:
+            _current_span.reset(token)
+            span.duration_ms = round((time.perf_counter() - span._started) * 1000, 3)
+            self._finish(span)
+    
+    def _start_otel(self, span: Span) -> None:
+        context = None
+        if span.parent is not None and span.parent._otel is not None:
+            context = otel_trace.set_span_in_context(span.parent._otel)
+        span._otel = self.otel_tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+    
+    def _finish(self, span: Span) -> None:
+        record = span.to_dict()
+        record.update(self.resource)
+        
+        if span._otel is not None:
+            try:
+                span._otel.set_attributes(self._otel_attributes(record))
+                if span.status == 'error' and span.error:
+                    span._otel.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, span.error))
+                span._otel.end(end_time=int((span.start_time + span.duration_ms / 1000) * 1e9))
+            except Exception as e:
+                logger.debug(f"Failed to export span {span.name} to OpenTelemetry: {e}")
+        
+        if not self.enabled or not self.path:
+            return
+        
+        line = json.dumps(record, default=str)
+        with self._lock:
+            try:
+                if self.max_bytes and self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                    self.path.replace(self.path.with_name(self.path.name + '.1'))
+                with open(self.path, 'a') as f:
+                    f.write(line + '\n')
+            except OSError as e:
+                # Tracing must never fail a commit
+                logger.debug(f"Failed to write span {span.name}: {e}")
+    
+    @staticmethod
+    def _otel_attributes(record: Dict[str, Any]) -> Dict[str, Any]:
+        """Flatten a span record into OpenTelemetry attribute types"""
+        attributes = {f"brainlift.{k}": v for k, v in record['attributes'].items()
+                      if isinstance(v, (str, bool, int, float))}
+        for key in ('kind', 'tokens', 'cache', 'queue_wait_ms', 'project'):
+            if record.get(key) is not None:
+                attributes[f"brainlift.{key}"] = record[key]
+        return attributes
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """The process-wide Tracer (configured from the environment on first use)"""
+    global _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer.from_env()
+        return _tracer
+
+
+def current_span() -> Optional[Span]:
+    """The span enclosing the caller, if any"""
+    return _current_span.get()
+
+
+def add_tokens(tokens: int) -> None:
+    """Attribute tokens to the current span; a no-op outside one"""
+    span = _current_span.get()
+    if span is not None:
+        span.add_tokens(tokens)
+
+
+def annotate(**attributes: Any) -> None:
+    """Attach attributes to the current span; a no-op outside one"""
+    span = _current_span.get()
+    if span is not None:
+        span.set(**attributes)
+
+
+def record_cache(outcome: str) -> None:
+    """Record the current span's cache outcome ('hit' or 'miss')"""
+    span = _current_span.get()
+    if span is not None:
+        span.set_cache(outcome)
+
+
+def bind_context(fn: Callable) -> Callable:
+    """Wrap fn so it runs under the caller's current span on another thread.
+    
+    Thread pools don't carry context variables over; each call gets its
+    own copy so the wrapper can run on several workers at once.
+    """
+    context = contextvars.copy_context()
+    
+    def run(*args: Any, **kwargs: Any) -> Any:
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of values (which must be non-empty)"""
+    ordered = sorted(values)
+    index = max(int(round(pct / 100 * len(ordered))) - 1, 0)
+    return ordered[min(index, len(ordered) - 1)]
+
+
+def summarize(path: Path) -> List[Dict[str, Any]]:
+    """Latency percentiles, tokens and cache hit rate per span name"""
+    by_name: Dict[str, List[Dict[str, Any]]] = {}
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if record.get('type') == 'span' and record.get('duration_ms') is not None:
+                by_name.setdefault(record['name'], []).append(record)
+    
+    rows = []
+    for name, records in sorted(by_name.items()):
+        durations = [r['duration_ms'] for r in records]
+        waits = [r['queue_wait_ms'] for r in records if r.get('queue_wait_ms') is not None]
+        cached = [r for r in records if r.get('cache') in ('hit', 'miss')]
+        rows.append({
+            'name': name,
+            'count': len(records),
+            'p50_ms': percentile(durations, 50),
+            'p95_ms': percentile(durations, 95),
+            'p99_ms': percentile(durations, 99),
+            'wait_p95_ms': percentile(waits, 95) if waits else None,
+            'tokens': sum(r.get('tokens', 0) for r in records),
+            'cache_hit_rate': (sum(r['cache'] == 'hit' for r in cached) / len(cached)) if cached else None,
+            'errors': sum(r.get('status') == 'error' for r in records)
+        })
+    return rows
+
+
+def main():
+    path = Path(sys.argv[1]) if len(sys.argv) > 1 else Path(os.getenv('TRACE_FILE', str(DEFAULT_TRACE_FILE)))
+    if not path.exists():
+        print(f"No spans recorded at {path}")
+        return 1
+    
+    print(f"{'span':<26} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'wait p95':>9} {'tokens':>9} {'cache hit':>9} {'errors':>6}")
+    for row in summarize(path):
+        wait = f"{row['wait_p95_ms']:9.1f}" if row['wait_p95_ms'] is not None else f"{'-':>9}"
+        hit_rate = f"{row['cache_hit_rate']:9.0%}" if row['cache_hit_rate'] is not None else f"{'-':>9}"
+        print(f"{row['name']:<26} {row['count']:>6} {row['p50_ms']:9.1f} {row['p95_ms']:9.1f} "
+              f"{row['p99_ms']:9.1f} {wait} {row['tokens']:>9} {hit_rate} {row['errors']:>6}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
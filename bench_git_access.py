@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Benchmark per-commit Git overhead: a fresh Repo plus `git diff` per commit
+(the old parse_git_diff path) against the shared repository access layer
+
+Usage: python bench_git_access.py [repo_path] [commit_count]
+"""
+
+import sys
+import time
+from pathlib import Path
+
+import git
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents.repository import Repository
+
+
+def old_path(repo_path, sha):
+    """What parse_git_diff and process_commit did for every commit"""
+    git.Repo(repo_path).commit(sha)  # process_commit's cache key lookup
+    repo = git.Repo(repo_path)
+    commit = repo.commit(sha)
+    if commit.parents:
+        return repo.git.diff(commit.parents[0].hexsha, commit.hexsha, '--full-index')
+    return repo.git.show(commit.hexsha, '--full-index')
+
+
+def new_path(repository, sha):
+    """The same work through one shared Repository"""
+    repository.commit(sha)
+    return repository.commit_diff(repository.commit(sha))
+
+
+def bench(label, fn, shas):
+    start = time.perf_counter()
+    diffs = [fn(sha) for sha in shas]
+    elapsed = time.perf_counter() - start
+    per_commit = elapsed / len(shas) * 1000
+    print(f"{label:<28} {elapsed:8.3f}s total  {per_commit:8.2f}ms/commit")
+    return diffs, elapsed
+
+
+def main():
+    repo_path = Path(sys.argv[1] if len(sys.argv) > 1 else '.').resolve()
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+
+    shas = [c.hexsha for c in git.Repo(repo_path).iter_commits('HEAD', max_count=count)]
+    print(f"⏱️  Git access benchmark: {len(shas)} commits in {repo_path}\n")
+
+    old_diffs, old_elapsed = bench("Repo + git diff per commit", lambda sha: old_path(repo_path, sha), shas)
+
+    repository = Repository(repo_path)
+    new_diffs, new_elapsed = bench("Shared Repo + git diff", lambda sha: new_path(repository, sha), shas)
+    repository.close()
+
+    # The old path used `git show` for a first commit, which adds the commit header
+    mismatched = [sha[:8] for sha, old, new in zip(shas, old_diffs, new_diffs)
+                  if old != new and not old.endswith(new)]
+
+    print(f"\n🚀 Speedup: {old_elapsed / new_elapsed:.1f}x")
+    print(f"📊 Repository stats: {repository.stats}")
+    if mismatched:
+        print(f"⚠️  Diffs differ for: {', '.join(mismatched)}")
+    else:
+        print("✅ Both paths produce the same diff for every commit")
+
+
+if __name__ == "__main__":
+    main()
@@ -165,8 +165,13 @@ ipcMain.handle('generate-summary', async (event, commitHash) => {
           // Pass budget settings
           BUDGET_ENABLED: currentProject.settings.budgetEnabled ? 'true' : 'false',
           COMMIT_TOKEN_LIMIT: String(currentProject.settings.commitTokenLimit || 10000),
+          // Pass cache settings
+          EMBEDDING_PROVIDER: currentProject.settings.embeddingProvider || 'openai',
           // Pass multi-agent settings
           AGENT_EXECUTION_MODE: currentProject.settings.agentExecutionMode || 'parallel',
+          AGENT_DEADLINE_SECONDS: String(currentProject.settings.agentDeadlineSeconds || 10),
+          // Stream summaries into their files and report progress as JSON lines
+          SUMMARY_STREAMING: currentProject.settings.streamSummaries !== false ? 'true' : 'false',
           CURSOR_CHAT_AGENT_ENABLED: currentProject.settings.agents?.cursor_chat?.enabled !== false ? 'true' : 'false',
           CURSOR_CHAT_AGENT_MODEL: currentProject.settings.agents?.cursor_chat?.model || 'gpt-4-turbo',
           SECURITY_AGENT_ENABLED: currentProject.settings.agents?.security?.enabled !== false ? 'true' : 'false',
@@ -185,10 +190,18 @@ ipcMain.handle('generate-summary', async (event, commitHash) => {
       
       let output = '';
       let errorOutput = '';
+      const handleProgress = createProgressParser((event) => {
+        mainWindow.webContents.send('summary-progress', {
+          ...event,
+          status: 'progress',
+          message: describeProgressEvent(event)
+        });
+      });
       
       pythonProcess.stdout.on('data', (data) => {
         output += data.toString();
         logToFile(`Python stdout: ${data.toString().trim()}`);
+        handleProgress(data);
       });
       
       pythonProcess.stderr.on('data', (data) => {
@@ -343,8 +356,13 @@ ipcMain.handle('analyze-wip', async (event, mode) => {
           // Pass budget settings
           BUDGET_ENABLED: currentProject.settings.budgetEnabled ? 'true' : 'false',
           COMMIT_TOKEN_LIMIT: String(currentProject.settings.commitTokenLimit || 10000),
+          // Pass cache settings
+          EMBEDDING_PROVIDER: currentProject.settings.embeddingProvider || 'openai',
           // Pass multi-agent settings
           AGENT_EXECUTION_MODE: currentProject.settings.agentExecutionMode || 'parallel',
+          AGENT_DEADLINE_SECONDS: String(currentProject.settings.agentDeadlineSeconds || 10),
+          // Stream summaries into their files and report progress as JSON lines
+          SUMMARY_STREAMING: currentProject.settings.streamSummaries !== false ? 'true' : 'false',
           CURSOR_CHAT_AGENT_ENABLED: currentProject.settings.agents?.cursor_chat?.enabled !== false ? 'true' : 'false',
           CURSOR_CHAT_AGENT_MODEL: currentProject.settings.agents?.cursor_chat?.model || 'gpt-4-turbo',
           SECURITY_AGENT_ENABLED: currentProject.settings.agents?.security?.enabled !== false ? 'true' : 'false',
@@ -365,10 +383,18 @@ ipcMain.handle('analyze-wip', async (event, mode) => {
       
       let output = '';
       let errorOutput = '';
+      const handleProgress = createProgressParser((event) => {
+        mainWindow.webContents.send('summary-progress', {
+          ...event,
+          status: 'progress',
+          message: describeProgressEvent(event)
+        });
+      });
       
       pythonProcess.stdout.on('data', (data) => {
         output += data.toString();
         logToFile(`Python stdout: ${data.toString().trim()}`);
+        handleProgress(data);
       });
       
       pythonProcess.stderr.on('data', (data) => {
@@ -1658,6 +1684,50 @@ function logToFile(message) {
   }
 }
 
+// Build a stdout handler that picks JSON-line progress events out of the Python output
+function createProgressParser(onEvent) {
+  let pending = '';
+  return (data) => {
+    pending += data.toString();
+    const lines = pending.split('\n');
+    pending = lines.pop();
+    
+    for (const line of lines) {
+      const trimmed = line.trim();
+      if (!trimmed.startsWith('{')) continue;
+      try {
+        const event = JSON.parse(trimmed);
+        if (event.type === 'progress') {
+          onEvent(event);
+        }
+      } catch (error) {
+        // Not a progress event
+      }
+    }
+  };
+}
+
+// Human-readable status line for a progress event
+function describeProgressEvent(event) {
+  const seconds = (ms) => `${(ms / 1000).toFixed(1)}s`;
+  switch (event.event) {
+    case 'diff_parsed':
+      return 'Analyzing changes...';
+    case 'cache_hit':
+      return 'Serving summary from cache...';
+    case 'summary_started':
+      return `Generating ${event.summary} summary...`;
+    case 'first_token':
+      return `Writing ${event.summary} summary (first token after ${seconds(event.ttft_ms)})`;
+    case 'summary_complete':
+      return `Finished ${event.summary} summary in ${seconds(event.duration_ms)}`;
+    case 'output_written':
+      return 'Saving summaries...';
+    default:
+      return event.event;
+  }
+}
+
 // Parse brainlift content to extract scores and issues
 function parseBrainliftContent(content) {
   const data = {
@@ -1921,6 +1991,7 @@ ipcMain.handle('cache:get-stats', async () => {
           misses: 0,
           sets: 0,
           evictions: 0,
+          rejected_admissions: 0,
           hit_rate: 0
         },
         semantic_cache: {
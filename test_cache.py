@@ -9,11 +9,11 @@ import time
 import hashlib
 from pathlib import Path
 
-# Add the agents directory to the Python path
-sys.path.insert(0, str(Path(__file__).parent / 'agents'))
+# Add the project root to the Python path
+sys.path.insert(0, str(Path(__file__).parent))
 
-from cache import CacheManager
-from budget_manager import BudgetManager
+from agents.cache import CacheManager
+from agents.budget_manager import BudgetManager
 
 def test_cache_system():
     """Test the caching system with sample data"""
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Tests for agents that miss the pipelined deadline
+"""
+
+import sys
+import time
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents.agent_orchestrator import AgentOrchestrator, PendingAnalysis
+from agents.langgraph_agent import GitCommitSummarizer
+
+GRACE_SECONDS = 0.5
+
+
+class RecordingProgress:
+    """Records when each progress event was emitted"""
+    
+    def __init__(self):
+        self.events = {}
+    
+    def emit(self, event, **fields):
+        self.events[event] = time.monotonic()
+
+
+class RecordingResultCache:
+    def __init__(self):
+        self.put_at = None
+    
+    def put(self, subject, **fields):
+        self.put_at = time.monotonic()
+
+
+class FakeCacheManager:
+    """The parts of CacheManager write_output uses"""
+    
+    def __init__(self):
+        self.result_cache = RecordingResultCache()
+        self.stats_aggregator = type('Aggregator', (), {'mark_dirty': lambda self: None})()
+    
+    def get_cache_stats(self):
+        return {'overall': {'hit_rate': 0.0, 'total_requests': 0}}
+
+
+class TestLateAgents:
+    """Late agents share one grace period and never hold up the outputs"""
+    
+    @pytest.fixture
+    def hung_agents(self):
+        """Two agent futures that don't finish until the test is over"""
+        release = threading.Event()
+        executor = ThreadPoolExecutor(max_workers=2)
+        futures = [(name, executor.submit(release.wait)) for name in ('security', 'quality')]
+        yield futures
+        release.set()
+        executor.shutdown(wait=True)
+    
+    @pytest.fixture
+    def summarizer(self, tmp_path, monkeypatch):
+        """A summarizer writing to tmp_path, without git, LLM or cache set up"""
+        monkeypatch.setenv('OPENAI_API_KEY', 'test')
+        summarizer = GitCommitSummarizer.__new__(GitCommitSummarizer)
+        summarizer.base_dir = tmp_path
+        summarizer.context_dir = tmp_path / 'context_logs'
+        summarizer.output_dir = tmp_path / 'brainlifts'
+        summarizer.context_dir.mkdir()
+        summarizer.output_dir.mkdir()
+        summarizer.progress = RecordingProgress()
+        summarizer.cache_manager = FakeCacheManager()
+        summarizer.budget_manager = None
+        summarizer.agent_orchestrator = AgentOrchestrator('test', {'late_agent_grace': GRACE_SECONDS})
+        return summarizer
+    
+    def pending(self, futures):
+        pending = PendingAnalysis({'metrics': AgentOrchestrator._new_metrics()}, futures, datetime.now())
+        pending.late = [name for name, _ in futures]
+        return pending
+    
+    def test_collect_late_waits_once_for_all(self, summarizer, hung_agents):
+        started = time.monotonic()
+        results = summarizer.agent_orchestrator.collect_late(self.pending(hung_agents))
+        elapsed = time.monotonic() - started
+        
+        assert GRACE_SECONDS <= elapsed < 2 * GRACE_SECONDS
+        assert set(results) == {'security', 'quality'}
+        assert all('Timed out' in result['error'] for result in results.values())
+    
+    def test_write_output_returns_within_one_grace_period(self, summarizer, hung_agents):
+        state = {
+            'output_stem': '20260101_000000_abc123',
+            'context_summary': 'context',
+            'brainlift_summary': 'brainlift',
+            'cache_subject': 'abc123',
+            'pending_agents': self.pending(hung_agents),
+            'multi_agent_results': {'agents': {
+                name: {'error': 'Missed the 10s deadline', 'late': True} for name, _ in hung_agents
+            }}
+        }
+        
+        started = time.monotonic()
+        state = summarizer.write_output(state)
+        elapsed = time.monotonic() - started
+        
+        assert elapsed < 2 * GRACE_SECONDS
+        # Outputs were announced and cached before waiting on the late agents
+        assert summarizer.progress.events['output_written'] - started < GRACE_SECONDS
+        assert summarizer.cache_manager.result_cache.put_at - started < GRACE_SECONDS
+        
+        error_log = Path(state['output_files']['error_log']).read_text()
+        assert 'Late Agent Results' in error_log
+        assert f'Timed out after {GRACE_SECONDS}s past the deadline' in error_log
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Tests for the batched LLM call shared by the diff agents
+"""
+
+import sys
+import json
+import threading
+from pathlib import Path
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents.llm_batch import LLMBatch
+
+
+class FakeResponse:
+    def __init__(self, content):
+        self.content = content
+
+
+class FakeLLM:
+    """Returns a canned response (or raises) and records every prompt"""
+    
+    def __init__(self, response):
+        self.response = response
+        self.prompts = []
+    
+    def invoke(self, messages):
+        self.prompts.append(messages[0].content)
+        if isinstance(self.response, Exception):
+            raise self.response
+        return FakeResponse(self.response)
+
+
+class FakeAgent:
+    """The parts of BaseAgent the batch uses"""
+    
+    cost_per_1k_tokens = 0.01
+    
+    def __init__(self, name, llm):
+        self.name = name
+        self.llm = llm
+        self.prompt_template = f"{name} review of {{commit_hash}} ({{commit_message}}):\n{{git_diff}}"
+    
+    def process_response(self, response):
+        return {"agent": self.name, **json.loads(response)}
+
+
+STATE = {
+    "commit_info": {"commit_hash": "abc123", "commit_message": "Add login"},
+    "git_diff": "+def login(): pass\n"
+}
+
+
+def submit_all(batch, agents):
+    """Submit every agent from its own thread, as the orchestrator's pool does"""
+    results, errors = {}, {}
+    
+    def run(agent):
+        try:
+            results[agent.name] = batch.submit(agent)
+        except Exception as e:
+            errors[agent.name] = e
+    
+    threads = [threading.Thread(target=run, args=(agent,)) for agent in agents]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+    return results, errors
+
+
+class TestLLMBatch:
+    """One combined call, and the fallbacks to per-agent calls"""
+    
+    def make(self, response, names=("security", "quality"), timeout=5):
+        llm = FakeLLM(response)
+        agents = [FakeAgent(name, llm) for name in names]
+        return LLMBatch(list(names), STATE, timeout=timeout), agents, llm
+    
+    def test_one_call_split_by_section(self):
+        response = json.dumps({"security": {"risk_level": "low"}, "quality": {"score": 8}})
+        batch, agents, llm = self.make(f"```json\n{response}\n```")
+        
+        results, errors = submit_all(batch, agents)
+        
+        assert not errors
+        assert len(llm.prompts) == 1
+        assert llm.prompts[0].count("+def login(): pass") == 1
+        assert results["security"][0] == {"agent": "security", "risk_level": "low"}
+        assert results["quality"][0] == {"agent": "quality", "score": 8}
+        tokens, cost = results["security"][1:]
+        assert tokens > 0 and cost == pytest.approx(tokens / 1000 * 0.01)
+    
+    def test_unparseable_response_falls_back(self):
+        batch, agents, llm = self.make("Sorry, I can't answer in JSON.")
+        
+        results, errors = submit_all(batch, agents)
+        
+        assert not errors
+        assert len(llm.prompts) == 1
+        assert results == {"security": None, "quality": None}
+    
+    def test_non_object_response_falls_back(self):
+        batch, agents, llm = self.make('["security", "quality"]')
+        
+        results, _ = submit_all(batch, agents)
+        
+        assert results == {"security": None, "quality": None}
+    
+    def test_missing_section_falls_back_for_that_agent(self):
+        response = json.dumps({"security": {"risk_level": "high"}, "quality": "looks fine"})
+        batch, agents, llm = self.make(response)
+        
+        results, _ = submit_all(batch, agents)
+        
+        assert results["security"][0]["risk_level"] == "high"
+        assert results["quality"] is None
+    
+    def test_failed_call_falls_back(self):
+        batch, agents, llm = self.make(RuntimeError("rate limited"))
+        
+        results, errors = submit_all(batch, agents)
+        
+        assert not errors
+        assert results == {"security": None, "quality": None}
+    
+    def test_single_submitter_calls_llm_itself(self):
+        batch, agents, llm = self.make("{}")
+        batch.done("quality")
+        
+        results, _ = submit_all(batch, agents[:1])
+        
+        assert results == {"security": None}
+        assert not llm.prompts
+    
+    def test_gives_up_when_collector_stops_waiting(self):
+        batch, agents, llm = self.make("{}", names=("security", "quality", "documentation"), timeout=0.2)
+        
+        # documentation never arrives, so the set is never complete
+        results, errors = submit_all(batch, agents[:2])
+        
+        assert not results
+        assert all(isinstance(e, TimeoutError) for e in errors.values()) and len(errors) == 2
+        assert not llm.prompts
+    
+    def test_non_member_is_not_batched(self):
+        batch, agents, llm = self.make("{}")
+        
+        assert batch.submit(FakeAgent("cursor_chat", llm)) is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Tests for the LLM gate: file classification, rule order and agent thresholds
+"""
+
+import sys
+from collections import deque
+from pathlib import Path
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents.parsed_diff import ParsedDiff
+from agents.llm_gate import (
+    LLMGate, POLICIES, MIN_HISTORY, HISTORY_WINDOW, DiffProfile, classify_file
+)
+
+
+def file_diff(path, added, old_path=None):
+    """A one-file unified diff adding the given lines"""
+    old_path = old_path or path
+    lines = [
+        f"diff --git a/{old_path} b/{path}",
+        f"--- a/{old_path}",
+        f"+++ b/{path}",
+        f"@@ -0,0 +1,{len(added)} @@"
+    ] + [f"+{line}" for line in added]
+    return "\n".join(lines) + "\n"
+
+
+def rename_diff(old_path, path):
+    return (
+        f"diff --git a/{old_path} b/{path}\n"
+        "similarity index 100%\n"
+        f"rename from {old_path}\n"
+        f"rename to {path}\n"
+    )
+
+
+def only_file(text):
+    parsed = ParsedDiff.parse(text)
+    assert len(parsed.files) == 1
+    return parsed.files[0]
+
+
+class TestClassifyFile:
+    """What kind of change each file is"""
+    
+    def test_code(self):
+        assert classify_file(only_file(file_diff("app/login.py", ["def login():", "    pass"]))) == 'code'
+    
+    @pytest.mark.parametrize("path", ["package-lock.json", "frontend/yarn.lock", "poetry.lock", "go.sum"])
+    def test_lockfile(self, path):
+        assert classify_file(only_file(file_diff(path, ['"version": "1.0.0"']))) == 'lockfile'
+    
+    @pytest.mark.parametrize("path", ["static/app.min.js", "proto/user_pb2.py", "dist/bundle.js",
+                                      "web/build/main.css", "__snapshots__/view.snap"])
+    def test_generated_by_path(self, path):
+        assert classify_file(only_file(file_diff(path, ["x = 1"]))) == 'generated'
+    
+    def test_generated_by_marker(self):
+        added = ["// Code generated by protoc-gen-go. DO NOT EDIT.", "package user"]
+        assert classify_file(only_file(file_diff("api/user.go", added))) == 'generated'
+    
+    def test_marker_past_first_lines_is_code(self):
+        added = ["package user"] * 5 + ["// DO NOT EDIT below this line"]
+        assert classify_file(only_file(file_diff("api/user.go", added))) == 'code'
+    
+    def test_rename(self):
+        assert classify_file(only_file(rename_diff("agents/old_name.py", "agents/new_name.py"))) == 'rename'
+    
+    @pytest.mark.parametrize("path", ["README.md", "docs/guide.rst", "NOTES.txt"])
+    def test_docs(self, path):
+        assert classify_file(only_file(file_diff(path, ["Some words"]))) == 'docs'
+    
+    def test_profile_of_mixed_non_code(self):
+        text = file_diff("README.md", ["Usage"]) + file_diff("package-lock.json", ["{}"])
+        profile = DiffProfile(ParsedDiff.parse(text))
+        assert profile.summary == 'non_code'
+        assert profile.code_chars == 0
+    
+    def test_profile_with_code_counts_code_only(self):
+        code = file_diff("app.py", ["x = 1"])
+        profile = DiffProfile(ParsedDiff.parse(file_diff("README.md", ["Usage" * 100]) + code))
+        assert profile.summary == 'code'
+        assert profile.code_chars == len(code)
+
+
+class TestPolicies:
+    """The thresholds the agents hard-coded before the gate existed"""
+    
+    def test_security(self):
+        assert (POLICIES['security'].max_clean_chars, POLICIES['security'].max_findings) == (500, 0)
+    
+    def test_quality(self):
+        assert (POLICIES['quality'].max_clean_chars, POLICIES['quality'].max_findings) == (500, 2)
+    
+    def test_documentation(self):
+        policy = POLICIES['documentation']
+        assert (policy.max_clean_chars, policy.max_findings) == (500, 2)
+    
+    def test_cursor_chat(self):
+        policy = POLICIES['cursor_chat']
+        assert policy.max_clean_chars == 200
+        assert not policy.skip_non_code and not policy.learn
+    
+    @pytest.mark.parametrize("agent,chars,use_llm", [
+        ('security', 500, False), ('security', 501, True),
+        ('cursor_chat', 200, False), ('cursor_chat', 201, True)
+    ])
+    def test_size_boundary(self, agent, chars, use_llm):
+        gate = LLMGate(mode='static', log_path=None, history_path=None)
+        assert gate.decide(agent, 0, chars, chars).use_llm is use_llm
+    
+    @pytest.mark.parametrize("agent,findings,use_llm", [
+        ('security', 1, True), ('quality', 2, False), ('quality', 3, True), ('documentation', 3, True)
+    ])
+    def test_findings_boundary(self, agent, findings, use_llm):
+        gate = LLMGate(mode='static', log_path=None, history_path=None)
+        assert gate.decide(agent, findings, 100, 100).use_llm is use_llm
+
+
+class TestRuleOrder:
+    """static_findings > non_code > small_clean > history"""
+    
+    LARGE_CODE = file_diff("app/service.py", ["value = compute()"] * 100)
+    
+    def gate(self, verdicts=None, **kwargs):
+        gate = LLMGate(log_path=None, history_path=None, **kwargs)
+        if verdicts is not None:
+            gate.history['quality'] = deque(verdicts, maxlen=HISTORY_WINDOW)
+        return gate
+    
+    def decide(self, gate, findings, text, commit='abc123'):
+        return gate.decide('quality', findings, len(text), len(text), ParsedDiff.parse(text), commit)
+    
+    def test_findings_beat_non_code(self):
+        decision = self.decide(self.gate(), 3, file_diff("README.md", ["Usage"]))
+        assert (decision.use_llm, decision.rule) == (True, 'static_findings')
+    
+    def test_non_code_beats_small_clean(self):
+        decision = self.decide(self.gate(), 0, file_diff("yarn.lock", ["x"]))
+        assert (decision.use_llm, decision.rule, decision.diff_kind) == (False, 'non_code', 'lockfile_only')
+    
+    def test_small_clean_beats_history(self):
+        decision = self.decide(self.gate(verdicts=[False] * MIN_HISTORY), 0, file_diff("app.py", ["x = 1"]))
+        assert (decision.use_llm, decision.rule) == (False, 'small_clean')
+    
+    def test_learning_until_enough_history(self):
+        decision = self.decide(self.gate(verdicts=[True] * (MIN_HISTORY - 1)), 0, self.LARGE_CODE)
+        assert (decision.use_llm, decision.rule) == (True, 'learning')
+    
+    def test_disagreement(self):
+        verdicts = [True] * (MIN_HISTORY - 3) + [False] * 3
+        decision = self.decide(self.gate(verdicts=verdicts), 0, self.LARGE_CODE)
+        assert (decision.use_llm, decision.rule) == (True, 'disagreement')
+    
+    def test_agreement_skips_except_audit_sample(self):
+        gate = self.gate(verdicts=[True] * MIN_HISTORY, audit_every=4)
+        rules = {self.decide(gate, 0, self.LARGE_CODE, commit=f"c{i}").rule for i in range(40)}
+        assert rules == {'agreement', 'audit'}
+    
+    def test_audit_is_deterministic_per_commit(self):
+        gate = self.gate(verdicts=[True] * MIN_HISTORY, audit_every=4)
+        first = [self.decide(gate, 0, self.LARGE_CODE, commit=f"c{i}").rule for i in range(10)]
+        again = [self.decide(gate, 0, self.LARGE_CODE, commit=f"c{i}").rule for i in range(10)]
+        assert first == again
+    
+    def test_static_mode_ignores_history(self):
+        decision = self.decide(self.gate(verdicts=[True] * MIN_HISTORY, mode='static'), 0, self.LARGE_CODE)
+        assert (decision.use_llm, decision.rule) == (True, 'large')
+    
+    def test_off_always_calls(self):
+        decision = self.decide(self.gate(mode='off'), 0, file_diff("README.md", ["Usage"]))
+        assert (decision.use_llm, decision.rule) == (True, 'disabled')
+    
+    def test_only_static_clean_calls_teach_the_gate(self):
+        gate = self.gate()
+        gate.record_verdict(self.decide(gate, 3, self.LARGE_CODE), llm_clean=False)
+        gate.record_verdict(self.decide(gate, 0, self.LARGE_CODE), llm_clean=None)
+        assert not gate.history.get('quality')
+        
+        gate.record_verdict(self.decide(gate, 0, self.LARGE_CODE), llm_clean=True)
+        assert list(gate.history['quality']) == [True]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for the resident summarizer daemon and the git hook's use of it
+"""
+
+import sys
+import time
+import types
+import threading
+from pathlib import Path
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent))
+
+from agents import summarizer_daemon
+from agents.summarizer_daemon import SummarizerDaemon, submit_job, is_daemon_running
+
+pytestmark = pytest.mark.skipif(not summarizer_daemon.daemon_supported(),
+                                reason="Unix domain sockets not available")
+
+
+class FakeSummarizer:
+    """Stands in for GitCommitSummarizer so no LLM or git access is needed"""
+    
+    def __init__(self):
+        self.cache_manager = None
+        self.commits = []
+    
+    def process_commit(self, commit_hash):
+        self.commits.append(commit_hash)
+        return {'output_files': {'brainlift': f"brainlifts/{commit_hash[:8]}.md"}, 'cache_hit': False}
+    
+    def process_wip(self, mode='all'):
+        raise RuntimeError(f"no changes for {mode}")
+
+
+class TestSummarizerDaemon:
+    """Round trips over the daemon's Unix socket"""
+    
+    @pytest.fixture
+    def daemon(self, tmp_path, monkeypatch):
+        """A daemon serving on its own socket with a fake summarizer"""
+        monkeypatch.setenv('PROJECT_PATH', str(tmp_path))
+        fake_module = types.ModuleType('agents.langgraph_agent')
+        fake_module.GitCommitSummarizer = FakeSummarizer
+        monkeypatch.setitem(sys.modules, 'agents.langgraph_agent', fake_module)
+        
+        daemon = SummarizerDaemon(tmp_path, idle_timeout=0)
+        thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+        thread.start()
+        
+        deadline = time.monotonic() + 5
+        while not is_daemon_running(daemon.socket_path):
+            assert time.monotonic() < deadline, "daemon did not start"
+            time.sleep(0.05)
+        
+        yield daemon
+        
+        daemon.stop()
+        thread.join(timeout=5)
+        assert not daemon.socket_path.exists()
+    
+    def test_commit_job_round_trip(self, daemon):
+        result = submit_job('commit', timeout=10, socket_path=daemon.socket_path, commit_hash='abc123def456')
+        
+        assert result['status'] == 'done'
+        assert result['kind'] == 'commit'
+        assert result['output_files'] == {'brainlift': 'brainlifts/abc123de.md'}
+        assert result['cache_hit'] is False
+        assert daemon.summarizer.commits == ['abc123def456']
+        assert daemon.completed == 1
+    
+    def test_failed_job_reports_error(self, daemon):
+        result = submit_job('wip', timeout=10, socket_path=daemon.socket_path, mode='staged')
+        
+        assert result['status'] == 'error'
+        assert 'no changes for staged' in result['error']
+        assert daemon.failed == 1
+    
+    def test_no_daemon_returns_none(self, tmp_path):
+        assert submit_job('commit', socket_path=tmp_path / 'missing.sock', commit_hash='abc') is None
+
+
+class TestHookDaemonOptIn:
+    """The git hook only uses the daemon when asked to"""
+    
+    def test_disabled_by_default(self, monkeypatch):
+        from agents import git_hook_handler
+        monkeypatch.delenv('SUMMARIZER_DAEMON_ENABLED', raising=False)
+        monkeypatch.setattr(summarizer_daemon, 'submit_job', lambda *a, **k: pytest.fail("daemon used"))
+        monkeypatch.setattr(summarizer_daemon, 'start_daemon_process', lambda: pytest.fail("daemon started"))
+        
+        assert git_hook_handler._run_via_daemon('abc123') is None
+    
+    def test_no_autostart_by_default(self, monkeypatch):
+        from agents import git_hook_handler
+        monkeypatch.setenv('SUMMARIZER_DAEMON_ENABLED', 'true')
+        monkeypatch.delenv('SUMMARIZER_DAEMON_AUTOSTART', raising=False)
+        monkeypatch.setattr(summarizer_daemon, 'submit_job', lambda *a, **k: None)
+        monkeypatch.setattr(summarizer_daemon, 'start_daemon_process', lambda: pytest.fail("daemon started"))
+        
+        assert git_hook_handler._run_via_daemon('abc123') is None
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])